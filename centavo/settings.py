@@ -7,6 +7,7 @@ from pathlib import Path
 from datetime import timedelta
 import os
 import dj_database_url
+from corsheaders.defaults import default_headers
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -62,6 +63,9 @@ if DEBUG:
         "http://127.0.0.1:5173",
     ])
 
+# Cabecera de idempotencia que envía el frontend en los POST de producción y compras.
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
+
 CSRF_TRUSTED_ORIGINS = []
 if WEBSITE_HOSTNAME:
     CSRF_TRUSTED_ORIGINS.append(f"https://{WEBSITE_HOSTNAME}")
@@ -152,6 +156,26 @@ DJANGO_VITE = {
     }
 }
 
+# ==============================================================================
+# PRODUCCIÓN
+# ==============================================================================
+# Motor de asignación FIFO (production/allocation.py):
+#   'auto'   -> funciones de ventana + UPDATE ... FROM si la BD lo soporta; si no, 'python'.
+#   'window' -> fuerza el motor SQL.  'python' -> fuerza el recorrido en memoria.
+PRODUCTION_FIFO_ENGINE = os.environ.get("PRODUCTION_FIFO_ENGINE", "auto")
+# Bloqueo de la producción (production/locking.py): 'rows' (SELECT ... FOR UPDATE),
+# 'advisory' (advisory locks de PostgreSQL por materia prima; en SQLite usa 'rows') u
+# 'optimistic' (UPDATE condicionales sin bloqueos previos, con reintentos acotados).
+PRODUCTION_LOCKING = os.environ.get("PRODUCTION_LOCKING", "rows")
+PRODUCTION_OPTIMISTIC_RETRIES = int(os.environ.get("PRODUCTION_OPTIMISTIC_RETRIES", "3"))
+# Vigencia (segundos) de las respuestas guardadas por `Idempotency-Key` (tenants/idempotency.py).
+IDEMPOTENCY_KEY_TTL = int(os.environ.get("IDEMPOTENCY_KEY_TTL", str(24 * 60 * 60)))
+# Plazo (segundos) de una reserva de `Idempotency-Key` sin respuesta; debe superar la
+# duración máxima de una petición. Pasado el plazo, la clave se puede volver a usar.
+IDEMPOTENCY_IN_PROGRESS_LEASE = int(os.environ.get("IDEMPOTENCY_IN_PROGRESS_LEASE", "60"))
+# Vigencia (segundos) en la caché de Django de las series reducidas con `?max_points=` (production/rollups.py).
+PRODUCTION_SERIES_CACHE_TTL = int(os.environ.get("PRODUCTION_SERIES_CACHE_TTL", str(60 * 60)))
+
 # ==============================================================================
 # CONFIGURACIONES DE TERCEROS
 # ==============================================================================
@@ -0,0 +1,102 @@
+# inventory/fields.py
+"""
+Campos relacionales limitados a la empresa del usuario, con resolución en bloque
+para las listas anidadas (`many=True`).
+
+Un `PrimaryKeyRelatedField` ejecuta un `queryset.get(pk=...)` por cada elemento
+de la lista y, si luego se valida la empresa del objeto, otra consulta más por
+cada acceso a `obj.tenant`. Con `TenantPrimaryKeyRelatedField` en el serializer
+hijo y `BulkResolvingListSerializer` como su `list_serializer_class`, la lista
+resuelve todos los IDs de cada campo con UNA consulta
+(`WHERE id IN (...) AND tenant_id = ...`) y reporta juntos todos los IDs
+inexistentes o de otra empresa.
+
+Uso:
+
+    class IngredientSerializer(serializers.Serializer):
+        raw_material = TenantPrimaryKeyRelatedField(queryset=RawMaterial.objects.all())
+
+        class Meta:
+            list_serializer_class = BulkResolvingListSerializer
+"""
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+
+class TenantPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    `PrimaryKeyRelatedField` cuyo queryset se limita a la empresa del usuario de la
+    petición (vacío si no tiene). Dentro de un `BulkResolvingListSerializer` toma
+    los objetos ya resueltos en bloque en lugar de consultar uno por uno.
+    """
+    default_error_messages = {
+        'does_not_exist': 'El ID "{pk_value}" no existe o no pertenece a tu empresa.',
+    }
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._resolved = None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        tenant = getattr(getattr(request, 'user', None), 'tenant', None)
+        if tenant is None:
+            return queryset.none()
+        return queryset.filter(tenant=tenant)
+
+    def to_internal_value(self, data):
+        if self._resolved is None:
+            return super().to_internal_value(data)
+        try:
+            return self._resolved[self.queryset.model._meta.pk.to_python(data)]
+        except (KeyError, DjangoValidationError):
+            # Formato inválido o ID no resuelto: se deja el error habitual del campo.
+            return super().to_internal_value(data)
+
+
+class BulkResolvingListSerializer(serializers.ListSerializer):
+    """
+    `ListSerializer` que, antes de validar cada elemento, resuelve en una consulta
+    por campo todos los IDs de los `TenantPrimaryKeyRelatedField` del hijo. Si
+    alguno no existe o es de otra empresa, la lista se rechaza con un único error
+    que los enumera todos.
+    """
+
+    def _bulk_fields(self):
+        return {
+            name: field for name, field in self.child.fields.items()
+            if isinstance(field, TenantPrimaryKeyRelatedField) and not field.read_only
+        }
+
+    def to_internal_value(self, data):
+        fields = self._bulk_fields()
+        if not fields or not isinstance(data, list):
+            return super().to_internal_value(data)
+
+        errors = []
+        for name, field in fields.items():
+            pk_field = field.queryset.model._meta.pk
+            requested = set()
+            for item in data:
+                value = item.get(name) if isinstance(item, dict) else None
+                if value is None:
+                    continue
+                try:
+                    requested.add(pk_field.to_python(value))
+                except DjangoValidationError:
+                    continue  # El campo reportará el formato inválido en su elemento.
+            field._resolved = field.get_queryset().in_bulk(requested) if requested else {}
+            missing = sorted(requested - set(field._resolved))
+            if missing:
+                errors.append(f"'{name}': IDs no encontrados o que no pertenecen a tu empresa: {missing}.")
+
+        try:
+            if errors:
+                raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: errors})
+            return super().to_internal_value(data)
+        finally:
+            for field in fields.values():
+                field._resolved = None
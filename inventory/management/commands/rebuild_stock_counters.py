@@ -0,0 +1,54 @@
+# inventory/management/commands/rebuild_stock_counters.py
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+
+from inventory.models import RawMaterial, PurchaseBatch
+
+
+class Command(BaseCommand):
+    help = (
+        'Verifies and rebuilds the denormalized RawMaterial.total_stock counters '
+        'from the quantity_remaining of their PurchaseBatches.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='Only process raw materials of this tenant ID.')
+        parser.add_argument('--check', action='store_true',
+                            help='Only verify the counters; exit with an error if any of them has drifted.')
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        materials = RawMaterial.objects.select_for_update().order_by('id')
+        batches = PurchaseBatch.objects.all()
+        if options.get('tenant'):
+            materials = materials.filter(tenant_id=options['tenant'])
+            batches = batches.filter(tenant_id=options['tenant'])
+
+        # Una única consulta agrupada con el stock real de cada materia prima.
+        actual_by_rm = dict(
+            batches.order_by().values('raw_material_id').annotate(
+                total=Sum('quantity_remaining')
+            ).values_list('raw_material_id', 'total')
+        )
+
+        drifted = []
+        for material in materials:
+            actual = actual_by_rm.get(material.id) or Decimal('0.00')
+            if material.total_stock != actual:
+                self.stdout.write(self.style.WARNING(
+                    f'  {material.name} (ID {material.id}): counter={material.total_stock} batches={actual}'
+                ))
+                material.total_stock = actual
+                drifted.append(material)
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('All stock counters match their batches.'))
+            return
+
+        if options.get('check'):
+            raise CommandError(f'{len(drifted)} stock counter(s) out of sync. Run without --check to rebuild them.')
+
+        RawMaterial.objects.bulk_update(drifted, ['total_stock'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(drifted)} stock counter(s).'))
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:14
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+# --- Función para inicializar el contador total_stock a partir de los lotes ---
+def backfill_total_stock(apps, schema_editor):
+    RawMaterial = apps.get_model('inventory', 'RawMaterial')
+    PurchaseBatch = apps.get_model('inventory', 'PurchaseBatch')
+    remaining = PurchaseBatch.objects.filter(raw_material=OuterRef('pk')).order_by().values(
+        'raw_material'
+    ).annotate(total=Sum('quantity_remaining')).values('total')
+    RawMaterial.objects.update(
+        total_stock=Coalesce(Subquery(remaining), Value(Decimal('0.00')), output_field=models.DecimalField())
+    )
+# --- Fin de la función ---
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_purchasebatch_quantity_remaining'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rawmaterial',
+            name='total_stock',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='Stock Total'),
+        ),
+        migrations.RunPython(backfill_total_stock, migrations.RunPython.noop),
+    ]
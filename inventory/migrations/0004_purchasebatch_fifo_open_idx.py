@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_rawmaterial_total_stock'),
+        ('tenants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchasebatch',
+            index=models.Index(condition=models.Q(('quantity_remaining__gt', 0)), fields=['tenant', 'raw_material', 'purchase_date', 'id'], name='purchasebatch_fifo_open_idx'),
+        ),
+    ]
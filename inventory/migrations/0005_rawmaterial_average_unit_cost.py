@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:21
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+# --- Función para inicializar el costo promedio con el stock restante de cada lote ---
+def backfill_average_unit_cost(apps, schema_editor):
+    RawMaterial = apps.get_model('inventory', 'RawMaterial')
+    PurchaseBatch = apps.get_model('inventory', 'PurchaseBatch')
+    totals = {}
+    for rm_id, remaining, quantity, total_cost in PurchaseBatch.objects.filter(
+        quantity_remaining__gt=0, quantity__gt=0
+    ).values_list('raw_material_id', 'quantity_remaining', 'quantity', 'total_cost').iterator():
+        stock, value = totals.get(rm_id, (Decimal('0'), Decimal('0')))
+        totals[rm_id] = (stock + remaining, value + remaining * total_cost / quantity)
+
+    materials = list(RawMaterial.objects.filter(id__in=totals.keys()))
+    for material in materials:
+        stock, value = totals[material.id]
+        material.average_unit_cost = (value / stock).quantize(Decimal('0.000001'))
+    RawMaterial.objects.bulk_update(materials, ['average_unit_cost'], batch_size=500)
+# --- Fin de la función ---
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_purchasebatch_fifo_open_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rawmaterial',
+            name='average_unit_cost',
+            field=models.DecimalField(decimal_places=6, default=Decimal('0.00'), max_digits=16, verbose_name='Costo Unitario Promedio'),
+        ),
+        migrations.RunPython(backfill_average_unit_cost, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_rawmaterial_average_unit_cost'),
+        ('tenants', '0003_tenant_allocation_strategy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchasebatch',
+            name='expiry_date',
+            field=models.DateField(blank=True, null=True, verbose_name='Fecha de Vencimiento'),
+        ),
+        migrations.AddField(
+            model_name='rawmaterial',
+            name='allocation_strategy',
+            field=models.CharField(blank=True, choices=[('fifo', 'FIFO (Primero en Entrar, Primero en Salir)'), ('fefo', 'FEFO (Primero en Vencer, Primero en Salir)'), ('lifo', 'LIFO (Último en Entrar, Primero en Salir)')], default='', max_length=10, verbose_name='Estrategia de Consumo de Lotes'),
+        ),
+        migrations.AddIndex(
+            model_name='purchasebatch',
+            index=models.Index(condition=models.Q(('quantity_remaining__gt', 0)), fields=['tenant', 'raw_material', 'expiry_date', 'purchase_date', 'id'], name='purchasebatch_fefo_open_idx'),
+        ),
+    ]
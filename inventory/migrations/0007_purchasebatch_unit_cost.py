@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:42
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+# --- Función para calcular el costo unitario guardado de los lotes existentes ---
+def backfill_unit_cost(apps, schema_editor):
+    PurchaseBatch = apps.get_model('inventory', 'PurchaseBatch')
+    pending = []
+    for batch in PurchaseBatch.objects.filter(quantity__gt=0).only('id', 'quantity', 'total_cost').iterator():
+        batch.unit_cost = (batch.total_cost / batch.quantity).quantize(Decimal('0.000001'))
+        pending.append(batch)
+        if len(pending) >= 2000:
+            PurchaseBatch.objects.bulk_update(pending, ['unit_cost'])
+            pending = []
+    PurchaseBatch.objects.bulk_update(pending, ['unit_cost'])
+# --- Fin de la función ---
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_allocation_strategies'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchasebatch',
+            name='unit_cost',
+            field=models.DecimalField(decimal_places=6, default=Decimal('0.00'), editable=False, max_digits=16, verbose_name='Costo Unitario'),
+        ),
+        migrations.RunPython(backfill_unit_cost, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_purchasebatch_unit_cost'),
+        ('tenants', '0003_tenant_allocation_strategy'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchasebatch',
+            index=models.Index(condition=models.Q(('quantity_remaining__gt', 0)), fields=['tenant', 'unit_cost', 'quantity_remaining', 'raw_material'], name='purchasebatch_valuation_idx'),
+        ),
+    ]
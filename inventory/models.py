@@ -1,5 +1,8 @@
 # inventory/models.py
-from django.db import models
+from decimal import Decimal
+from django.db import models, transaction
+from django.db.models import Case, ExpressionWrapper, F, Q, Value, When
+from django.utils import timezone
 from tenants.models import Tenant
 
 
@@ -9,6 +12,33 @@ class RawMaterial(models.Model):
     unit_of_measure = models.CharField(max_length=50, verbose_name="Unidad de Medida")
     description = models.TextField(blank=True, verbose_name="Descripción")
 
+    # // Contador desnormalizado: suma de 'quantity_remaining' de todos sus lotes.
+    # // Se mantiene en la misma transacción que crea, edita o consume un lote, de modo
+    # // que consultar el stock es O(1). Se puede reconstruir con `rebuild_stock_counters`.
+    total_stock = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name="Stock Total"
+    )
+    # // Costo unitario promedio ponderado (móvil) del stock actual. Se recalcula con cada
+    # // compra o corrección de lote; el consumo no lo modifica. Lo usan las empresas con
+    # // costing_method = 'average' para costear la producción sin recorrer lotes.
+    average_unit_cost = models.DecimalField(
+        max_digits=16,
+        decimal_places=6,
+        default=Decimal('0.00'),
+        verbose_name="Costo Unitario Promedio"
+    )
+    # // Estrategia de consumo de lotes propia de esta materia prima. Vacía = la de la empresa.
+    allocation_strategy = models.CharField(
+        max_length=10,
+        choices=Tenant.AllocationStrategy.choices,
+        blank=True,
+        default='',
+        verbose_name="Estrategia de Consumo de Lotes"
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -21,15 +51,72 @@ class RawMaterial(models.Model):
     def __str__(self):
         return f"{self.name} ({self.unit_of_measure})"
 
+    @classmethod
+    def adjust_total_stock(cls, deltas, value_deltas=None):
+        """
+        Aplica incrementos (o decrementos) al contador de stock de varias materias
+        primas con un único UPDATE relativo (F), seguro frente a escrituras concurrentes.
+
+        Si se indican `value_deltas`, el mismo UPDATE recalcula el costo promedio
+        ponderado: (stock * promedio + valor) / (stock + cantidad). Si el stock
+        resultante no es positivo, se conserva el último promedio conocido.
+
+        :param deltas: Dict {raw_material_id: Decimal} con la variación de cantidad.
+        :param value_deltas: Dict {raw_material_id: Decimal} con la variación de valor (costo).
+        """
+        value_deltas = {rm_id: value for rm_id, value in (value_deltas or {}).items() if value}
+        deltas = {rm_id: delta for rm_id, delta in deltas.items() if delta}
+        affected = deltas.keys() | value_deltas.keys()
+        if not affected:
+            return
+
+        stock_field = models.DecimalField(max_digits=12, decimal_places=2)
+        cost_field = models.DecimalField(max_digits=16, decimal_places=6)
+        updates = {
+            'total_stock': F('total_stock') + Case(
+                *[When(pk=rm_id, then=Value(delta)) for rm_id, delta in deltas.items()],
+                default=Value(Decimal('0.00')),
+                output_field=stock_field
+            ),
+            # update() no aplica auto_now por sí solo.
+            'updated_at': timezone.now(),
+        }
+        if value_deltas:
+            averages = []
+            for rm_id in value_deltas:
+                delta = deltas.get(rm_id, Decimal('0.00'))
+                new_average = ExpressionWrapper(
+                    (F('total_stock') * F('average_unit_cost') + Value(value_deltas[rm_id]))
+                    / (F('total_stock') + Value(delta)),
+                    output_field=cost_field
+                )
+                averages.append(When(Q(pk=rm_id) & Q(total_stock__gt=-delta), then=new_average))
+            updates['average_unit_cost'] = Case(*averages, default=F('average_unit_cost'), output_field=cost_field)
+        cls.objects.filter(pk__in=affected).update(**updates)
+
 
 class PurchaseBatch(models.Model):
     tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name="purchase_batches")
     raw_material = models.ForeignKey(RawMaterial, on_delete=models.CASCADE, related_name="batches")
     purchase_date = models.DateField(verbose_name="Fecha de Compra")
+    # // Opcional: necesaria para consumir por FEFO (primero en vencer). Los lotes sin
+    # // vencimiento se consumen después de todos los que sí lo tienen.
+    expiry_date = models.DateField(null=True, blank=True, verbose_name="Fecha de Vencimiento")
 
     # // Usamos DecimalField para evitar errores de punto flotante en cálculos financieros y de inventario.
     quantity = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Cantidad")
     total_cost = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Costo Total")
+    # // Costo unitario (total_cost / quantity) redondeado a 6 decimales. Se guarda en
+    # // save() para que el costeo FIFO y la valoración de inventario sean simples
+    # // multiplicaciones y sumas en SQL, sin dividir lote por lote. Las altas en bloque
+    # // (bulk_create) deben calcularlo con `compute_unit_cost`.
+    unit_cost = models.DecimalField(
+        max_digits=16,
+        decimal_places=6,
+        default=Decimal('0.00'),
+        editable=False,
+        verbose_name="Costo Unitario"
+    )
 
     # --- NUEVO CAMPO: quantity_remaining ---
     # Este campo es crucial para el seguimiento FIFO.
@@ -49,16 +136,115 @@ class PurchaseBatch(models.Model):
         ordering = ['-purchase_date']
         verbose_name = "Lote de Compra"
         verbose_name_plural = "Lotes de Compra"
+        indexes = [
+            # // Índice parcial para la búsqueda FIFO de la producción: solo incluye lotes con
+            # // stock, así los lotes agotados (la gran mayoría con el tiempo) no se recorren.
+            # // Sus columnas siguen el filtro y el orden de la consulta (tenant, materia prima,
+            # // fecha de compra, id). PostgreSQL y SQLite soportan índices parciales.
+            models.Index(
+                fields=['tenant', 'raw_material', 'purchase_date', 'id'],
+                condition=Q(quantity_remaining__gt=0),
+                name='purchasebatch_fifo_open_idx',
+            ),
+            # // Índice parcial equivalente para FEFO: mismo filtro, ordenado por vencimiento.
+            # // Sus NULL (lotes sin vencimiento) van al final en PostgreSQL, como pide FEFO;
+            # // SQLite los guarda primero, aunque su planificador resuelve igual `NULLS LAST`.
+            # // LIFO no necesita uno propio: invierte todas las columnas del orden (también la
+            # // materia prima) y recorre `purchasebatch_fifo_open_idx` hacia atrás.
+            models.Index(
+                fields=['tenant', 'raw_material', 'expiry_date', 'purchase_date', 'id'],
+                condition=Q(quantity_remaining__gt=0),
+                name='purchasebatch_fefo_open_idx',
+            ),
+            # // Índice parcial para la valoración de inventario: contiene todas las columnas
+            # // que suma la consulta, así PostgreSQL la resuelve sin leer la tabla
+            # // (index-only scan) y sin visitar los lotes agotados. La materia prima va al
+            # // final para no competir con los índices de consumo, que la necesitan ordenada.
+            models.Index(
+                fields=['tenant', 'unit_cost', 'quantity_remaining', 'raw_material'],
+                condition=Q(quantity_remaining__gt=0),
+                name='purchasebatch_valuation_idx',
+            ),
+        ]
+
+    # Campos que determinan cuánto (y a qué costo) aporta el lote al stock de su materia prima.
+    _STOCK_STATE_FIELDS = ('raw_material_id', 'quantity_remaining', 'unit_cost')
+    UNIT_COST_PRECISION = Decimal('0.000001')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Recordamos el estado cargado para calcular la variación del contador de stock al guardar.
+        instance._remember_stock_state()
+        return instance
+
+    def _remember_stock_state(self):
+        self._loaded_stock_state = tuple(self.__dict__.get(field) for field in self._STOCK_STATE_FIELDS)
+
+    @classmethod
+    def compute_unit_cost(cls, quantity, total_cost):
+        """Costo unitario del lote, redondeado a la precisión de `unit_cost`."""
+        quantity = Decimal(str(quantity))
+        if quantity <= 0:
+            return Decimal('0.000000')
+        return (Decimal(str(total_cost)) / quantity).quantize(cls.UNIT_COST_PRECISION)
+
+    @staticmethod
+    def _stock_contribution(raw_material_id, quantity_remaining, unit_cost):
+        """Devuelve (materia prima, cantidad, valor) que el lote aporta al stock."""
+        quantity_remaining = Decimal(str(quantity_remaining))
+        return raw_material_id, quantity_remaining, quantity_remaining * Decimal(str(unit_cost))
 
     # --- INICIO DE LA CORRECCIÓN DE INDENTACIÓN ---
     # El método 'save' debe estar aquí, al mismo nivel que '__str__' y 'Meta'.
     def save(self, *args, **kwargs):
         # Si el objeto es nuevo (no tiene pk), inicializamos quantity_remaining.
-        if not self.pk:
+        is_new = not self.pk
+        if is_new:
             self.quantity_remaining = self.quantity
-        super().save(*args, **kwargs)  # Llama al método save original
+        self.unit_cost = self.compute_unit_cost(self.quantity, self.total_cost)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'quantity', 'total_cost'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'unit_cost'}
+
+        # El lote, el contador de stock y el costo promedio de su materia prima se
+        # actualizan en la misma transacción. La materia prima se escribe ANTES que el
+        # lote, en el mismo orden que la producción en todos sus modos de bloqueo (contador
+        # de la materia prima y luego lotes, ver production/services.py) y que `delete()`,
+        # para que editar un lote durante una producción de la misma materia prima no
+        # pueda producir un deadlock.
+        with transaction.atomic():
+            deltas, value_deltas = {}, {}
+            if not is_new:
+                previous = getattr(self, '_loaded_stock_state', None)
+                if previous is None or None in previous:
+                    # Instancia no cargada desde la BD (o con campos diferidos): leemos el estado previo.
+                    previous = PurchaseBatch.objects.filter(pk=self.pk).values_list(
+                        *self._STOCK_STATE_FIELDS
+                    ).first()
+                if previous:
+                    rm_id, quantity, value = self._stock_contribution(*previous)
+                    deltas[rm_id], value_deltas[rm_id] = -quantity, -value
+
+            rm_id, quantity, value = self._stock_contribution(
+                self.raw_material_id, self.quantity_remaining, self.unit_cost
+            )
+            deltas[rm_id] = deltas.get(rm_id, Decimal('0.00')) + quantity
+            value_deltas[rm_id] = value_deltas.get(rm_id, Decimal('0.00')) + value
+            RawMaterial.adjust_total_stock(deltas, value_deltas)
+
+            super().save(*args, **kwargs)  # Llama al método save original
+        self._remember_stock_state()
     # --- FIN DE LA CORRECCIÓN DE INDENTACIÓN ---
 
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            rm_id, quantity, value = self._stock_contribution(
+                self.raw_material_id, self.quantity_remaining, self.unit_cost
+            )
+            RawMaterial.adjust_total_stock({rm_id: -quantity}, {rm_id: -value})
+            return super().delete(*args, **kwargs)
+
 
     def __str__(self):
         return f"Lote de {self.raw_material.name} - {self.purchase_date} ({self.quantity_remaining}/{self.quantity})"
\ No newline at end of file
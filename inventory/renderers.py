@@ -0,0 +1,27 @@
+# inventory/renderers.py
+
+import csv
+import io
+
+from rest_framework.renderers import BaseRenderer
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Renderiza una lista de filas (dicts planos) como CSV, usando las claves de la
+    primera fila como encabezado. Se elige con `?format=csv` o `Accept: text/csv`.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, list):
+            # Errores (dicts) y respuestas vacías: una fila por clave.
+            data = [{"field": key, "detail": value} for key, value in (data or {}).items()]
+        output = io.StringIO()
+        if data:
+            writer = csv.DictWriter(output, fieldnames=list(data[0].keys()))
+            writer.writeheader()
+            writer.writerows(data)
+        return output.getvalue().encode(self.charset)
@@ -2,19 +2,21 @@
 
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
+from .fields import TenantPrimaryKeyRelatedField
 from .models import RawMaterial, PurchaseBatch, Tenant  # Importamos Tenant para el PrimaryKeyRelatedField
-from django.db.models import Sum
 from django.utils.dateparse import parse_date
 from datetime import datetime
-from decimal import Decimal  # Importamos Decimal para el manejo preciso de números
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 class RawMaterialSerializer(serializers.ModelSerializer):
-    # Campo calculado para el stock total
-    total_stock = serializers.SerializerMethodField(read_only=True)
+    # Stock total: contador desnormalizado mantenido al crear, editar o consumir lotes.
+    # Antes se calculaba con un aggregate(Sum('quantity_remaining')) por cada fila.
+    total_stock = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    # Costo unitario promedio ponderado del stock actual (se recalcula con cada lote).
+    average_unit_cost = serializers.DecimalField(max_digits=16, decimal_places=6, read_only=True)
 
     # --- CAMPO TENANT PARA VALIDACIÓN DE UNICIDAD ---
     # Este campo es de escritura solamente, se espera en los datos de entrada
@@ -31,7 +33,8 @@ class RawMaterialSerializer(serializers.ModelSerializer):
     class Meta:
         model = RawMaterial
         # Asegúrate de que 'total_stock' y 'tenant' estén en los fields
-        fields = ['id', 'tenant', 'name', 'unit_of_measure', 'description', 'created_at', 'total_stock']
+        fields = ['id', 'tenant', 'name', 'unit_of_measure', 'description', 'created_at', 'total_stock',
+                  'average_unit_cost', 'allocation_strategy']
 
         # Validador para asegurar que el nombre de la materia prima es único para un tenant dado.
         validators = [
@@ -42,31 +45,13 @@ class RawMaterialSerializer(serializers.ModelSerializer):
             )
         ]
 
-    def get_total_stock(self, obj):
-        """
-        Calcula el stock total sumando la CANTIDAD RESTANTE de todos los lotes asociados.
-        """
-        logger.info(f"Calculando total_stock para RawMaterial ID: {obj.id}")
-
-        # --- INICIO DE LA CORRECCIÓN DEL BUG ---
-        # ANTES (Incorrecto): Sumaba 'quantity', el total histórico de compras, no el stock real.
-        # total = obj.batches.aggregate(total_quantity=Sum('quantity'))['total_quantity']
-        #
-        # AHORA (Correcto): Suma 'quantity_remaining', que es el stock real disponible.
-        # Esto soluciona el bug de que el stock total no disminuía.
-        total = obj.batches.aggregate(total_quantity=Sum('quantity_remaining'))['total_quantity']
-        # --- FIN DE LA CORRECCIÓN DEL BUG ---
-
-        # Nos aseguramos de devolver un Decimal para mantener la consistencia con el modelo.
-        return total if total is not None else Decimal('0.00')
-
 
 class PurchaseBatchSerializer(serializers.ModelSerializer):
     raw_material_name = serializers.CharField(source='raw_material.name', read_only=True)
 
-    # --- CAMPO raw_material CON FILTRADO POR TENANT EN INIT ---
-    raw_material = serializers.PrimaryKeyRelatedField(
-        queryset=RawMaterial.objects.all(),  # Queryset inicial amplio, se filtra en __init__
+    # --- CAMPO raw_material LIMITADO A LA EMPRESA DEL USUARIO ---
+    raw_material = TenantPrimaryKeyRelatedField(
+        queryset=RawMaterial.objects.all(),  # El campo lo filtra por el tenant de la petición.
         error_messages={'does_not_exist': 'La materia prima especificada no existe o no pertenece a tu empresa.'}
     )
 
@@ -86,26 +71,13 @@ class PurchaseBatchSerializer(serializers.ModelSerializer):
         # AHORA (Correcto): Añadimos 'quantity_remaining'. Ahora la API expondrá
         # el stock real y restante de cada lote de compra.
         fields = [
-            'id', 'raw_material', 'raw_material_name', 'purchase_date',
-            'quantity', 'quantity_remaining', 'total_cost', 'created_at'
+            'id', 'raw_material', 'raw_material_name', 'purchase_date', 'expiry_date',
+            'quantity', 'quantity_remaining', 'total_cost', 'unit_cost', 'created_at'
         ]
+        # Costo unitario guardado (total_cost / quantity): lo calcula el modelo al guardar.
+        read_only_fields = ['unit_cost']
         # --- FIN DE LA CORRECCIÓN DEL BUG ---
 
-    def __init__(self, *args, **kwargs):
-        """
-        Sobrescribimos el init para filtrar dinámicamente el queryset de raw_material
-        basado en el tenant del usuario que realiza la petición.
-        """
-        super().__init__(*args, **kwargs)
-        request = self.context.get('request', None)
-        if request and hasattr(request, 'user') and hasattr(request.user, 'tenant'):
-            tenant = request.user.tenant
-            self.fields['raw_material'].queryset = RawMaterial.objects.filter(tenant=tenant)
-        else:
-            # Si no hay usuario/tenant válido, el queryset debe estar vacío
-            # para prevenir que se seleccionen materias primas.
-            self.fields['raw_material'].queryset = RawMaterial.objects.none()
-
     def validate(self, data):
         """
         Realiza la limpieza y validación de formatos para 'quantity', 'total_cost' y 'purchase_date'.
@@ -140,5 +112,11 @@ class PurchaseBatchSerializer(serializers.ModelSerializer):
                         {"purchase_date": "El formato de fecha debe ser MM/DD/YYYY (ej. 09/21/2025)."})
             data['purchase_date'] = parsed_date
 
+        # 4. El vencimiento (opcional, usado por FEFO) no puede ser anterior a la compra
+        purchase_date = data.get('purchase_date', getattr(self.instance, 'purchase_date', None))
+        if data.get('expiry_date') and purchase_date and data['expiry_date'] < purchase_date:
+            raise serializers.ValidationError(
+                {"expiry_date": "La fecha de vencimiento no puede ser anterior a la fecha de compra."})
+
         # Llama a la validación original de ModelSerializer al final
         return super().validate(data)
\ No newline at end of file
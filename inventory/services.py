@@ -0,0 +1,45 @@
+# inventory/services.py
+
+from decimal import Decimal
+
+from django.db.models import DecimalField, F, Sum
+
+from .models import PurchaseBatch
+
+
+def inventory_valuation(tenant):
+    """
+    Valor actual del stock restante por materia prima y en total, según el costo de
+    cada lote (FIFO): SUM(quantity_remaining * unit_cost).
+
+    Es una única consulta agrupada sobre los lotes con stock, que recorre el índice
+    parcial `purchasebatch_valuation_idx` (los lotes agotados no se leen).
+
+    :param tenant: Empresa sobre la que se opera.
+    :return: Dict con el valor total y el desglose por materia prima, ordenado por nombre.
+    """
+    rows = PurchaseBatch.objects.filter(tenant=tenant, quantity_remaining__gt=0).values(
+        'raw_material_id', 'raw_material__name', 'raw_material__unit_of_measure'
+    ).annotate(
+        stock=Sum('quantity_remaining'),
+        value=Sum(F('quantity_remaining') * F('unit_cost'),
+                  output_field=DecimalField(max_digits=28, decimal_places=8))
+    ).order_by('raw_material__name', 'raw_material_id')
+
+    materials = []
+    total_value = Decimal('0.0')
+    for row in rows:
+        total_value += row['value']
+        materials.append({
+            "raw_material": {
+                "id": row['raw_material_id'],
+                "name": row['raw_material__name'],
+                "unit_of_measure": row['raw_material__unit_of_measure'],
+            },
+            "quantity": f"{row['stock']:.2f}",
+            "value": f"{row['value'].quantize(Decimal('0.01')):.2f}",
+        })
+    return {
+        "total_value": f"{total_value.quantize(Decimal('0.01')):.2f}",
+        "materials": materials,
+    }
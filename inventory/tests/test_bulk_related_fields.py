@@ -0,0 +1,89 @@
+# Fichero: inventory/tests/test_bulk_related_fields.py
+# Test Suite para la resolución en bloque de IDs en listas anidadas (inventory/fields.py).
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from users.models import User
+from tenants.models import Tenant
+from inventory.models import RawMaterial
+from products.models import Product, RecipeIngredient
+from decimal import Decimal
+
+
+class BulkResolvingRelatedFieldTests(APITestCase):
+    """
+    Valida que las recetas y los registros masivos resuelvan todos sus IDs con una
+    consulta por campo, limitada a la empresa, y que reporten juntos los IDs inválidos.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Carpintería Norte")
+        self.user = User.objects.create_user(
+            email='user@norte.com', password='password123', tenant=self.tenant,
+            first_name='Usuario', last_name='A'
+        )
+        self.other_tenant = Tenant.objects.create(name="Otra Empresa")
+        self.client.force_authenticate(user=self.user)
+
+        self.materials = [
+            RawMaterial.objects.create(tenant=self.tenant, name=f"Material {i}", unit_of_measure='u')
+            for i in range(6)
+        ]
+        self.foreign_material = RawMaterial.objects.create(tenant=self.other_tenant, name="Ajena",
+                                                           unit_of_measure='u')
+
+    def test_recipe_ingredients_are_resolved_with_one_query(self):
+        # Arrange
+        payload = {'name': "Mesa", 'recipe_ingredients': [
+            {'raw_material': material.id, 'quantity': '1'} for material in self.materials
+        ]}
+
+        # Act
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('products-list'), payload, format='json')
+
+        # Assert: la validación (todo lo previo al primer INSERT) hace un solo SELECT
+        # de materias primas, filtrado por empresa
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        statements = [q['sql'] for q in queries]
+        validation = statements[:next(i for i, sql in enumerate(statements) if sql.startswith('INSERT'))]
+        lookups = [sql for sql in validation if 'FROM "inventory_rawmaterial"' in sql]
+        self.assertEqual(len(lookups), 1)
+        self.assertIn('"tenant_id" =', lookups[0])
+        self.assertEqual(RecipeIngredient.objects.filter(product_id=response.data['id']).count(), 6)
+
+    def test_foreign_and_missing_ids_are_reported_together(self):
+        # Arrange
+        payload = {'name': "Mesa", 'recipe_ingredients': [
+            {'raw_material': self.materials[0].id, 'quantity': '1'},
+            {'raw_material': self.foreign_material.id, 'quantity': '1'},
+            {'raw_material': 999999, 'quantity': '1'},
+        ]}
+
+        # Act
+        response = self.client.post(reverse('products-list'), payload, format='json')
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        message = response.data['recipe_ingredients']['non_field_errors'][0]
+        self.assertIn(f"[{self.foreign_material.id}, 999999]", message)
+        self.assertFalse(Product.objects.filter(tenant=self.tenant, name="Mesa").exists())
+
+    def test_bulk_production_rejects_products_of_other_tenant(self):
+        # Arrange
+        own = Product.objects.create(tenant=self.tenant, name="Silla")
+        foreign = Product.objects.create(tenant=self.other_tenant, name="Silla Ajena")
+        RecipeIngredient.objects.create(product=own, raw_material=self.materials[0], quantity=Decimal('1'))
+
+        # Act
+        response = self.client.post(reverse('production-log-bulk-create'), {'items': [
+            {'product_id': own.id, 'quantity_produced': '1'},
+            {'product_id': foreign.id, 'quantity_produced': '1'},
+        ]}, format='json')
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(f"[{foreign.id}]", response.data['items']['non_field_errors'][0])
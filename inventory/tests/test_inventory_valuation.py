@@ -0,0 +1,71 @@
+# Fichero: inventory/tests/test_inventory_valuation.py
+# Test Suite para el endpoint de valoración de inventario (/api/v1/inventory/valuation/).
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from users.models import User
+from tenants.models import Tenant
+from inventory.models import RawMaterial, PurchaseBatch
+from decimal import Decimal
+
+
+class InventoryValuationTests(APITestCase):
+    """
+    Valida SUM(quantity_remaining * unit_cost) por materia prima, la salida CSV,
+    el aislamiento por tenant y que todo se resuelva en una sola consulta.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Carpintería Norte")
+        self.user = User.objects.create_user(
+            email='user@norte.com', password='password123', tenant=self.tenant,
+            first_name='Usuario', last_name='A'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('inventory-valuation')
+
+        self.wood = RawMaterial.objects.create(tenant=self.tenant, name="Madera", unit_of_measure='m²')
+        self.glue = RawMaterial.objects.create(tenant=self.tenant, name="Cola", unit_of_measure='l')
+        # Madera: 10 a 2.00 (quedan 4) y 5 a 3.00. Cola: un lote agotado.
+        first = PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.wood, purchase_date='2025-01-01',
+                                             quantity=Decimal('10'), total_cost=Decimal('20'))
+        PurchaseBatch.objects.filter(pk=first.pk).update(quantity_remaining=Decimal('4'))
+        PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.wood, purchase_date='2025-02-01',
+                                     quantity=Decimal('5'), total_cost=Decimal('15'))
+        empty = PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.glue, purchase_date='2025-01-01',
+                                             quantity=Decimal('3'), total_cost=Decimal('9'))
+        PurchaseBatch.objects.filter(pk=empty.pk).update(quantity_remaining=Decimal('0'))
+
+        other_tenant = Tenant.objects.create(name="Otra Empresa")
+        other_wood = RawMaterial.objects.create(tenant=other_tenant, name="Madera", unit_of_measure='m²')
+        PurchaseBatch.objects.create(tenant=other_tenant, raw_material=other_wood, purchase_date='2025-01-01',
+                                     quantity=Decimal('100'), total_cost=Decimal('1000'))
+
+    def test_valuation_sums_remaining_stock_at_batch_cost(self):
+        # Act
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+
+        # Assert: 4 × 2.00 + 5 × 3.00; la cola agotada no aparece
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_value'], "23.00")
+        self.assertEqual([(m['raw_material']['name'], m['quantity'], m['value']) for m in response.data['materials']],
+                         [("Madera", "9.00", "23.00")])
+        self.assertEqual(len(queries), 1)
+
+    def test_valuation_can_be_downloaded_as_csv(self):
+        # Act
+        response = self.client.get(self.url, {'format': 'csv'})
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment;', response['Content-Disposition'])
+        self.assertEqual(response.content.decode().splitlines(), [
+            "raw_material_id,raw_material,unit_of_measure,quantity,value",
+            f"{self.wood.id},Madera,m²,9.00,23.00",
+            ",TOTAL,,,23.00",
+        ])
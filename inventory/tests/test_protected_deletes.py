@@ -0,0 +1,59 @@
+# Fichero: inventory/tests/test_protected_deletes.py
+# Test Suite para el borrado de lotes y materias primas con historial de producción.
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.urls import reverse
+from users.models import User
+from tenants.models import Tenant
+from inventory.models import RawMaterial, PurchaseBatch
+from products.models import Product, RecipeIngredient
+from production.services import register_production_batch
+from decimal import Decimal
+
+
+class ProtectedDeleteTests(APITestCase):
+    """
+    Los lotes y materias primas que figuran en el libro de consumos no se pueden
+    borrar: el API responde 409 con un mensaje, sin tocar el stock.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Panadería Central")
+        self.user = User.objects.create_user(
+            email='user@central.com', password='password123', tenant=self.tenant,
+            first_name='Usuario', last_name='A'
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.flour = RawMaterial.objects.create(tenant=self.tenant, name="Harina", unit_of_measure='kg')
+        self.batch = PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.flour,
+                                                  purchase_date='2025-01-01', quantity=Decimal('10'),
+                                                  total_cost=Decimal('20'))
+        self.bread = Product.objects.create(tenant=self.tenant, name="Pan")
+        self.ingredient = RecipeIngredient.objects.create(product=self.bread, raw_material=self.flour,
+                                                          quantity=Decimal('1'))
+        register_production_batch(self.user, self.bread.id, Decimal('2'))
+
+    def test_consumed_batch_cannot_be_deleted(self):
+        # Act
+        response = self.client.delete(reverse('purchase-batch-detail', kwargs={'pk': self.batch.pk}))
+
+        # Assert: el lote y el contador de stock quedan intactos
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertIn("libro de consumos", response.data['detail'])
+        self.assertTrue(PurchaseBatch.objects.filter(pk=self.batch.pk).exists())
+        self.flour.refresh_from_db()
+        self.assertEqual(self.flour.total_stock, Decimal('8.00'))
+
+    def test_raw_material_with_ledger_history_cannot_be_deleted(self):
+        # Arrange: ya no está en ninguna receta, pero tiene consumos registrados
+        self.ingredient.delete()
+
+        # Act
+        response = self.client.delete(reverse('raw-material-detail', kwargs={'pk': self.flour.pk}))
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertIn("consumos registrados", response.data['detail'])
+        self.assertTrue(RawMaterial.objects.filter(pk=self.flour.pk).exists())
@@ -0,0 +1,132 @@
+# Fichero: inventory/tests/test_stock_counter.py
+# Test Suite para el contador desnormalizado RawMaterial.total_stock.
+
+from io import StringIO
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from users.models import User
+from tenants.models import Tenant
+from inventory.models import RawMaterial, PurchaseBatch
+from products.models import Product, RecipeIngredient
+from decimal import Decimal
+
+
+class StockCounterTests(APITestCase):
+    """
+    Valida que el contador de stock se mantenga al crear, editar, borrar y consumir
+    lotes, y que el comando de reconstrucción detecte y corrija desviaciones.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Finca Las Nubes")
+        self.user = User.objects.create_user(
+            email='user@nubes.com', password='password123', tenant=self.tenant,
+            first_name='Usuario', last_name='A'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.coffee = RawMaterial.objects.create(tenant=self.tenant, name="Café", unit_of_measure='kg')
+        self.sugar = RawMaterial.objects.create(tenant=self.tenant, name="Azúcar", unit_of_measure='kg')
+
+    def _stock(self, material):
+        material.refresh_from_db()
+        return material.total_stock
+
+    def test_counter_follows_batch_create_edit_and_delete(self):
+        # Create (vía API)
+        response = self.client.post(reverse('purchase-batch-list'), {
+            'raw_material': self.coffee.pk, 'purchase_date': '2025-09-05',
+            'quantity': '150.75', 'total_cost': '300.00'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self._stock(self.coffee), Decimal('150.75'))
+
+        # Edit: mover el lote a otra materia prima traslada su stock restante
+        detail_url = reverse('purchase-batch-detail', kwargs={'pk': response.data['id']})
+        response = self.client.patch(detail_url, {'raw_material': self.sugar.pk}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._stock(self.coffee), Decimal('0.00'))
+        self.assertEqual(self._stock(self.sugar), Decimal('150.75'))
+
+        # Delete
+        response = self.client.delete(detail_url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self._stock(self.sugar), Decimal('0.00'))
+
+    def test_batch_edit_writes_raw_material_before_batch(self):
+        # Arrange
+        batch = PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.coffee,
+                                             purchase_date='2025-09-05', quantity=Decimal('10'),
+                                             total_cost=Decimal('20'))
+        batch = PurchaseBatch.objects.get(pk=batch.pk)
+
+        # Act
+        batch.total_cost = Decimal('30')
+        with CaptureQueriesContext(connection) as queries:
+            batch.save()
+
+        # Assert: mismo orden de bloqueo que la producción (materia prima y luego lote)
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 2)
+        self.assertIn('"inventory_rawmaterial"', updates[0])
+        self.assertIn('"inventory_purchasebatch"', updates[1])
+        self.assertEqual(self._stock(self.coffee), Decimal('10.00'))
+
+    def test_unit_cost_is_stored_and_follows_cost_corrections(self):
+        # Arrange: 3 kg por 10.00
+        response = self.client.post(reverse('purchase-batch-list'), {
+            'raw_material': self.coffee.pk, 'purchase_date': '2025-09-05',
+            'quantity': '3', 'total_cost': '10.00', 'unit_cost': '99'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Decimal(response.data['unit_cost']), Decimal('3.333333'))  # Solo lectura
+
+        # Act: se corrige la factura a 12.00
+        batch = PurchaseBatch.objects.get(pk=response.data['id'])
+        batch.total_cost = Decimal('12.00')
+        batch.save(update_fields=['total_cost'])
+
+        # Assert: el costo unitario y el valor del stock siguen a la corrección
+        batch.refresh_from_db()
+        self.assertEqual(batch.unit_cost, Decimal('4.000000'))
+        self.coffee.refresh_from_db()
+        self.assertEqual(self.coffee.average_unit_cost, Decimal('4.000000'))
+
+    def test_counter_is_exposed_and_consumed_by_production(self):
+        # Arrange
+        PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.coffee, purchase_date='2025-01-01',
+                                     quantity=Decimal('10'), total_cost=Decimal('100'))
+        PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.coffee, purchase_date='2025-02-01',
+                                     quantity=Decimal('5'), total_cost=Decimal('60'))
+        product = Product.objects.create(tenant=self.tenant, name="Café Tostado")
+        RecipeIngredient.objects.create(product=product, raw_material=self.coffee, quantity=Decimal('4'))
+
+        # Act
+        response = self.client.post(reverse('production-log-list-create'),
+                                    {'product_id': product.id, 'quantity_produced': '3'}, format='json')
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self._stock(self.coffee), Decimal('3.00'))
+        response = self.client.get(reverse('raw-material-detail', kwargs={'pk': self.coffee.pk}))
+        self.assertEqual(Decimal(response.data['total_stock']), Decimal('3.00'))
+
+    def test_rebuild_command_verifies_and_repairs_counters(self):
+        # Arrange: desviamos el contador a propósito
+        PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.coffee, purchase_date='2025-01-01',
+                                     quantity=Decimal('10'), total_cost=Decimal('100'))
+        RawMaterial.objects.filter(pk=self.coffee.pk).update(total_stock=Decimal('99'))
+
+        # Act / Assert: --check solo verifica y falla
+        with self.assertRaises(CommandError):
+            call_command('rebuild_stock_counters', '--check', stdout=StringIO())
+        self.assertEqual(self._stock(self.coffee), Decimal('99.00'))
+
+        # Act / Assert: sin --check reconstruye
+        call_command('rebuild_stock_counters', stdout=StringIO())
+        self.assertEqual(self._stock(self.coffee), Decimal('10.00'))
+        call_command('rebuild_stock_counters', '--check', stdout=StringIO())
@@ -1,13 +1,16 @@
 # inventory/urls.py
 
+from django.urls import path
 from rest_framework.routers import DefaultRouter
-from .views import RawMaterialViewSet, PurchaseBatchViewSet
+from .views import RawMaterialViewSet, PurchaseBatchViewSet, InventoryValuationView
 
 router = DefaultRouter()
 router.register(r'raw-materials', RawMaterialViewSet, basename='raw-material')
 router.register(r'purchase-batches', PurchaseBatchViewSet, basename='purchase-batch')
 
-urlpatterns = router.urls
+urlpatterns = [
+    path('valuation/', InventoryValuationView.as_view(), name='inventory-valuation'),
+] + router.urls
 
 # --- AÑADE ESTA LÍNEA DE DEBUG ---
 import pprint # Para una salida más legible
@@ -1,12 +1,20 @@
 # inventory/views.py
 
+from decimal import Decimal, InvalidOperation
 from rest_framework import viewsets, status, filters, exceptions # Añadimos 'filters' para búsqueda/ordenamiento
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.decorators import action  # Añadimos 'action' para métodos personalizados
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+from django.db.models import ProtectedError
+from django.utils import timezone
 
 from .models import RawMaterial, PurchaseBatch, Tenant  # Aseguramos que Tenant está importado
 from .serializers import RawMaterialSerializer, PurchaseBatchSerializer, serializers
+from .renderers import CSVRenderer
+from .services import inventory_valuation
+from tenants.idempotency import idempotent
 
 
 class BaseTenantViewSet(viewsets.ModelViewSet):
@@ -38,10 +46,27 @@ class BaseTenantViewSet(viewsets.ModelViewSet):
         # --- FIN CORRECCIÓN ---
         serializer.save(tenant=self.request.user.tenant)
 
+    # Mensaje cuando el objeto no se puede borrar porque otros registros lo referencian
+    # con on_delete=PROTECT (recetas, libro de consumos, historial de producción).
+    protected_delete_message = "No se puede eliminar: hay registros que dependen de este elemento."
+
+    def destroy(self, request, *args, **kwargs):
+        """
+        Borra el objeto, o responde 409 con un `detail` legible si está protegido
+        (`ProtectedError`) en lugar de dejar escapar un error 500.
+        """
+        try:
+            return super().destroy(request, *args, **kwargs)
+        except ProtectedError:
+            return Response({"detail": self.protected_delete_message}, status=status.HTTP_409_CONFLICT)
+
 
 class RawMaterialViewSet(BaseTenantViewSet):
     queryset = RawMaterial.objects.all().order_by('name')
     serializer_class = RawMaterialSerializer
+    protected_delete_message = (
+        "No se puede eliminar la materia prima: se usa en recetas o tiene consumos registrados en producción."
+    )
 
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'description']
@@ -53,6 +78,19 @@ class RawMaterialViewSet(BaseTenantViewSet):
         unit_of_measure = self.request.query_params.get('unit_of_measure')
         if unit_of_measure:
             queryset = queryset.filter(unit_of_measure=unit_of_measure)
+
+        # Filtros por rango de stock (?min_stock= / ?max_stock=). Se resuelven en SQL sobre
+        # el contador 'total_stock', igual que el ordenamiento (?ordering=total_stock).
+        for param, lookup in (('min_stock', 'total_stock__gte'), ('max_stock', 'total_stock__lte')):
+            value = self.request.query_params.get(param)
+            if value:
+                try:
+                    bound = Decimal(value)
+                except InvalidOperation:
+                    bound = None
+                if bound is None or not bound.is_finite():
+                    raise serializers.ValidationError({param: "Debe ser un número válido."})
+                queryset = queryset.filter(**{lookup: bound})
         return queryset
 
     def create(self, request, *args, **kwargs):
@@ -114,6 +152,9 @@ class PurchaseBatchViewSet(BaseTenantViewSet):
     """
     queryset = PurchaseBatch.objects.all()
     serializer_class = PurchaseBatchSerializer
+    protected_delete_message = (
+        "No se puede eliminar el lote: ya fue consumido en producción y figura en el libro de consumos."
+    )
 
     # Habilitamos el ordenamiento
     filter_backends = [filters.OrderingFilter]
@@ -128,4 +169,39 @@ class PurchaseBatchViewSet(BaseTenantViewSet):
         material_id = self.request.query_params.get('material_id')
         if material_id:
             queryset = queryset.filter(raw_material_id=material_id)
-        return queryset
\ No newline at end of file
+        return queryset
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        # Con `Idempotency-Key`, un reintento devuelve el lote ya creado en lugar de duplicar la compra.
+        return super().create(request, *args, **kwargs)
+
+class InventoryValuationView(APIView):
+    """
+    Valor FIFO del stock restante por materia prima y en total, a la fecha de hoy.
+
+    Con `?format=csv` (o `Accept: text/csv`) devuelve el mismo desglose como CSV,
+    con una última fila de total, listo para contabilidad.
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, CSVRenderer]
+
+    def get(self, request, *args, **kwargs):
+        valuation = inventory_valuation(request.user.tenant)
+        if request.accepted_renderer.format != CSVRenderer.format:
+            return Response(valuation)
+
+        rows = [
+            {
+                "raw_material_id": material["raw_material"]["id"],
+                "raw_material": material["raw_material"]["name"],
+                "unit_of_measure": material["raw_material"]["unit_of_measure"],
+                "quantity": material["quantity"],
+                "value": material["value"],
+            }
+            for material in valuation["materials"]
+        ]
+        rows.append({"raw_material_id": "", "raw_material": "TOTAL", "unit_of_measure": "", "quantity": "",
+                     "value": valuation["total_value"]})
+        filename = f"inventory-valuation-{timezone.localdate().isoformat()}.csv"
+        return Response(rows, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
@@ -0,0 +1,252 @@
+# production/allocation.py
+"""
+Motores de asignación: deciden de qué lotes de compra sale cada cantidad
+consumida por la producción y aplican los descuentos, en el orden que marque la
+estrategia de cada materia prima (FIFO, FEFO o LIFO, ver production/strategies.py).
+
+- `window`: calcula en la base de datos cuánto se toma de cada lote con un
+  `SUM(quantity_remaining) OVER (PARTITION BY materia prima ORDER BY <estrategia>)`
+  y aplica los descuentos con un `UPDATE ... FROM` por estrategia involucrada.
+- `python`: el recorrido clásico en memoria sobre los lotes bloqueados, con los
+  descuentos en un único UPDATE relativo. Se usa como alternativa en motores sin
+  funciones de ventana o sin `UPDATE ... FROM`.
+
+Ambos motores asumen que el llamador ya bloqueó las materias primas y verificó
+que hay stock suficiente; solo se ocupan de repartir y descontar.
+"""
+
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, DecimalField, F, Q, Value, When
+from django.utils import timezone
+
+from inventory.models import PurchaseBatch
+from .locking import ROWS, OPTIMISTIC
+from .strategies import FIFO
+
+
+class StockConflict(Exception):
+    """Otro proceso consumió el stock leído antes de descontarlo (modo optimista)."""
+
+
+class Consumption(NamedTuple):
+    """Cantidad tomada de un lote concreto, con el costo unitario de ese lote."""
+    batch_id: int
+    raw_material_id: int
+    quantity: Decimal
+    unit_cost: Decimal
+
+
+def _unit_cost(value):
+    """Costo unitario guardado del lote (los cursores de SQLite lo devuelven como float)."""
+    return Decimal(str(value)).quantize(PurchaseBatch.UNIT_COST_PRECISION)
+
+
+def supports_window_allocation():
+    """
+    Indica si el motor de base de datos actual soporta funciones de ventana y
+    `UPDATE ... FROM` (PostgreSQL, o SQLite >= 3.33).
+    """
+    if not connection.features.supports_over_clause:
+        return False
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 33, 0)
+    return False
+
+
+def consume_stock(tenant, needs, strategies=None, locking=ROWS):
+    """
+    Descuenta `needs` de los lotes con stock de cada materia prima, en el orden de
+    su estrategia de consumo.
+
+    El motor se elige con `settings.PRODUCTION_FIFO_ENGINE` ('auto', 'window' o 'python'),
+    salvo en modo optimista, que siempre descuenta con UPDATE condicionales.
+
+    :param tenant: Empresa sobre la que se opera.
+    :param needs: Dict {raw_material_id: Decimal} con la cantidad total a descontar.
+    :param strategies: Dict {raw_material_id: AllocationStrategy}. Por defecto, FIFO.
+    :param locking: Modo de bloqueo efectivo (ver production/locking.py).
+    :return: Dict {raw_material_id: [Consumption, ...]} en el orden de consumo.
+    :raises StockConflict: En modo optimista, si el stock leído ya no está disponible.
+    """
+    needs = {rm_id: need for rm_id, need in needs.items() if need > 0}
+    if not needs:
+        return {}
+    engine = getattr(settings, 'PRODUCTION_FIFO_ENGINE', 'auto')
+    if locking == OPTIMISTIC:
+        consume = _consume_optimistically
+    elif engine == 'window' or (engine == 'auto' and supports_window_allocation()):
+        consume = _consume_with_window
+    else:
+        consume = _consume_in_python
+
+    # Una pasada por estrategia (normalmente solo una): cada una ordena distinto.
+    by_strategy = {}
+    for rm_id, need in needs.items():
+        strategy = (strategies or {}).get(rm_id, FIFO)
+        by_strategy.setdefault(strategy, {})[rm_id] = need
+    consumptions = {}
+    for strategy, strategy_needs in by_strategy.items():
+        consumptions.update(consume(tenant, strategy_needs, strategy, locking))
+    return consumptions
+
+
+def _consume_in_python(tenant, needs, strategy, locking):
+    """
+    Motor de respaldo: bloquea los lotes con una única consulta, los recorre en
+    memoria y aplica los descuentos con un único UPDATE relativo. Con advisory locks
+    los lotes no se bloquean: el lock de su materia prima ya serializa a los
+    consumidores, y el descuento relativo no pisa una edición concurrente del lote.
+    """
+    batches = strategy.open_batches(tenant, needs.keys())
+    if locking == ROWS:
+        batches = batches.select_for_update()
+
+    consumptions = {rm_id: [] for rm_id in needs}
+    remaining = dict(needs)
+    takes = {}
+    for batch in batches:
+        rm_id = batch.raw_material_id
+        if remaining[rm_id] <= 0:
+            continue
+        amount_to_take = min(remaining[rm_id], batch.quantity_remaining)
+        remaining[rm_id] -= amount_to_take
+        takes[batch.id] = amount_to_take
+        consumptions[rm_id].append(
+            Consumption(batch.id, rm_id, amount_to_take, batch.unit_cost)
+        )
+
+    _deduct_batches(takes)
+    return consumptions
+
+
+def _deduct_batches(takes, guarded=False):
+    """
+    Descuenta de cada lote su cantidad con un único UPDATE relativo (`F()`).
+
+    :param takes: Dict {batch_id: Decimal} con la cantidad a tomar de cada lote.
+    :param guarded: Si es True, solo se descuentan los lotes que aún tienen esa cantidad.
+    :return: Número de lotes actualizados.
+    """
+    if not takes:
+        return 0
+    condition = Q()
+    for batch_id, amount in takes.items():
+        condition |= Q(pk=batch_id, quantity_remaining__gte=amount) if guarded else Q(pk=batch_id)
+    return PurchaseBatch.objects.filter(condition).update(
+        quantity_remaining=F('quantity_remaining') - Case(
+            *[When(pk=batch_id, then=Value(amount)) for batch_id, amount in takes.items()],
+            output_field=DecimalField(max_digits=10, decimal_places=2)
+        ),
+        updated_at=timezone.now()
+    )
+
+
+def _window_allocation_cte(tenant, needs, strategy):
+    """
+    CTE que calcula, en la base de datos, la cantidad a tomar de cada lote. Un lote
+    participa si el stock acumulado ANTES de él no cubre aún la necesidad.
+    `position` conserva el orden de consumo de la estrategia.
+    """
+    order = strategy.sql_order('b')
+    table = PurchaseBatch._meta.db_table
+    values = ", ".join(["(%s, CAST(%s AS NUMERIC))"] * len(needs))
+    sql = f"""
+        WITH needs (raw_material_id, need) AS (VALUES {values}),
+        ranked AS (
+            SELECT b.id, b.quantity_remaining, n.need,
+                   SUM(b.quantity_remaining) OVER (
+                       PARTITION BY b.raw_material_id ORDER BY {order}
+                   ) AS running_total,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY b.raw_material_id ORDER BY {order}
+                   ) AS position
+            FROM {table} b
+            JOIN needs n ON n.raw_material_id = b.raw_material_id
+            WHERE b.tenant_id = %s AND b.quantity_remaining > 0
+        ),
+        takes AS (
+            SELECT id, position,
+                   ROUND(CASE WHEN running_total <= need THEN quantity_remaining
+                              ELSE need - (running_total - quantity_remaining) END, 2) AS take
+            FROM ranked
+            WHERE running_total - quantity_remaining < need
+        )
+    """
+    params = [value for rm_id, need in needs.items() for value in (rm_id, need)]
+    return sql, [*params, tenant.id]
+
+
+def _consume_with_window(tenant, needs, strategy, locking):
+    """
+    Motor basado en funciones de ventana. En PostgreSQL todo ocurre en una sola
+    sentencia (`UPDATE ... FROM ... RETURNING`). SQLite no permite devolver columnas
+    de la tabla auxiliar en `RETURNING`, así que primero lee las cantidades con la
+    misma CTE y luego aplica el mismo `UPDATE ... FROM`.
+    """
+    table = PurchaseBatch._meta.db_table
+    cte, params = _window_allocation_cte(tenant, needs, strategy)
+    update = f"""
+        UPDATE {table}
+        SET quantity_remaining = ROUND({table}.quantity_remaining - takes.take, 2), updated_at = %s
+        FROM takes WHERE {table}.id = takes.id
+    """
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                f"{cte} {update} RETURNING {table}.id, {table}.raw_material_id, takes.position, "
+                f"takes.take, {table}.unit_cost",
+                [*params, now]
+            )
+            rows = cursor.fetchall()
+        else:
+            cursor.execute(
+                f"{cte} SELECT b.id, b.raw_material_id, takes.position, takes.take, b.unit_cost "
+                f"FROM takes JOIN {table} b ON b.id = takes.id",
+                params
+            )
+            rows = cursor.fetchall()
+            cursor.execute(f"{cte} {update}", [*params, now])
+
+    consumptions = {rm_id: [] for rm_id in needs}
+    for batch_id, rm_id, position, take, unit_cost in sorted(rows, key=lambda r: (r[1], r[2])):
+        consumptions[rm_id].append(Consumption(
+            batch_id, rm_id, Decimal(str(take)).quantize(Decimal('0.01')), _unit_cost(unit_cost)
+        ))
+    return consumptions
+
+
+def _consume_optimistically(tenant, needs, strategy, locking):
+    """
+    Modo optimista: lee los lotes sin bloquearlos, reparte en memoria y aplica todos
+    los descuentos con un único UPDATE condicional por lote
+    (`quantity_remaining >= cantidad`). Si alguna fila no se actualiza, otro proceso
+    se adelantó y se lanza `StockConflict` para que el llamador reintente.
+    """
+    consumptions = {rm_id: [] for rm_id in needs}
+    remaining = dict(needs)
+    takes = {}
+    for batch in strategy.open_batches(tenant, needs.keys()):
+        rm_id = batch.raw_material_id
+        if remaining[rm_id] <= 0:
+            continue
+        amount_to_take = min(remaining[rm_id], batch.quantity_remaining)
+        remaining[rm_id] -= amount_to_take
+        takes[batch.id] = amount_to_take
+        consumptions[rm_id].append(
+            Consumption(batch.id, rm_id, amount_to_take, batch.unit_cost)
+        )
+    if any(quantity > 0 for quantity in remaining.values()):
+        # El contador decía que había stock, pero los lotes ya fueron consumidos.
+        raise StockConflict()
+
+    if _deduct_batches(takes, guarded=True) != len(takes):
+        raise StockConflict()
+    return consumptions
@@ -0,0 +1,54 @@
+# production/downsampling.py
+"""
+Reducción de series largas para gráficos con LTTB (Largest-Triangle-Three-Buckets).
+
+Con años de datos diarios, una serie puede tener miles de puntos que el frontend
+no necesita dibujar. LTTB conserva el primer y el último punto y, de cada tramo
+intermedio, el punto que forma el triángulo de mayor área con el punto elegido
+antes y el promedio del tramo siguiente: se mantienen los picos, los valles y la
+forma general con solo `max_points` puntos.
+
+Los períodos de las series están equiespaciados (día, semana o mes), así que el
+eje X es la posición de cada punto.
+"""
+
+import numpy as np
+
+
+def lttb_indices(values, max_points):
+    """
+    Índices (en orden) de los puntos que conserva LTTB.
+
+    :param values: Valores de la serie (números o Decimal), en orden cronológico.
+    :param max_points: Máximo de puntos a devolver (al menos 3).
+    :return: Lista de índices; todos si la serie ya cabe en `max_points`.
+    """
+    total = len(values)
+    if total <= max_points:
+        return list(range(total))
+    if max_points < 3:
+        raise ValueError("LTTB necesita al menos 3 puntos.")
+
+    y = np.fromiter((float(value) for value in values), dtype=np.float64, count=total)
+    x = np.arange(total, dtype=np.float64)
+    # Los puntos intermedios (sin el primero ni el último) se reparten en max_points - 2 tramos.
+    bucket_size = (total - 2) / (max_points - 2)
+
+    selected = [0]
+    previous = 0
+    for bucket in range(max_points - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        # Promedio del tramo siguiente; para el último tramo, el punto final.
+        next_end = min(int((bucket + 2) * bucket_size) + 1, total)
+        average_x = x[end:next_end].mean()
+        average_y = y[end:next_end].mean()
+
+        areas = np.abs(
+            (x[previous] - average_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (average_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected.append(previous)
+    selected.append(total - 1)
+    return selected
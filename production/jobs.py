@@ -0,0 +1,128 @@
+# production/jobs.py
+"""
+Cola de producción persistente en la propia base de datos (sin broker externo).
+
+En horas pico la API solo inserta un `ProductionJob` (respuesta 202 inmediata) y
+el comando `python manage.py run_production_worker` lo registra después con los
+mismos servicios que el registro síncrono. El cliente consulta el estado en
+`/api/v1/production-logs/jobs/<id>/` o lee los `ProductionLog` resultantes.
+
+Ejecución en serie por empresa:
+
+- Un worker toma la solicitud pendiente más antigua con
+  `SELECT ... FOR UPDATE SKIP LOCKED` sobre la solicitud Y sobre la fila de su
+  empresa (`FOR NO KEY UPDATE` en PostgreSQL, que no bloquea los INSERT que
+  referencian a la empresa). Mientras la procesa, los demás workers saltan todas
+  las solicitudes de esa empresa y atienden a otras: las producciones de una misma
+  empresa nunca compiten entre sí por los bloqueos de stock.
+- La producción y el cambio de estado de la solicitud van en la misma transacción:
+  si el worker muere a mitad de camino, todo se revierte y la solicitud sigue
+  pendiente para el siguiente worker. Ninguna solicitud se registra dos veces.
+
+En SQLite no existe `FOR UPDATE` (Django lo omite), pero SQLite ya serializa a
+todos los escritores, así que la garantía se mantiene.
+"""
+
+import logging
+import threading
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import ProductionJob
+from .services import InsufficientStockError, _produce_atomically, load_products
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_production(user, items):
+    """
+    Encola una o varias producciones para registrarlas en segundo plano.
+
+    :param user: El usuario que solicita la producción (para obtener el tenant).
+    :param items: Lista de tuplas (product_id, quantity_to_produce: Decimal).
+    :return: La instancia del ProductionJob creado (pendiente).
+    """
+    return ProductionJob.objects.create(
+        tenant=user.tenant,
+        created_by=user,
+        items=[
+            {"product_id": product_id, "quantity_produced": f"{quantity:.2f}"}
+            for product_id, quantity in items
+        ],
+    )
+
+
+def _run_job(job):
+    """
+    Registra las producciones de la solicitud y guarda el resultado. Debe llamarse
+    dentro de la transacción que tiene bloqueadas la solicitud y su empresa.
+    """
+    items = [(entry["product_id"], Decimal(entry["quantity_produced"])) for entry in job.items]
+    production_logs = []
+    try:
+        # Punto de guardado: si la producción falla, se revierte solo ella y el
+        # estado de la solicitud se actualiza igualmente.
+        with transaction.atomic():
+            products = load_products(job.tenant, [product_id for product_id, _ in items])
+            production_logs = _produce_atomically(job.tenant, products, items)
+    except InsufficientStockError as e:
+        job.error = e.details
+    except ValueError as e:
+        job.error = {"detail": str(e)}
+    except Exception:
+        # Una solicitud que falla siempre no debe bloquear la cola de su empresa.
+        logger.exception("Error inesperado al procesar la producción encolada %s.", job.id)
+        job.error = {"detail": "Error inesperado al registrar la producción."}
+
+    job.status = ProductionJob.Status.FAILED if job.error else ProductionJob.Status.DONE
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+    if production_logs:
+        job.production_logs.add(*production_logs)
+
+
+def process_next_job():
+    """
+    Toma y procesa la solicitud pendiente más antigua de una empresa que no esté
+    siendo atendida por otro worker.
+
+    :return: El ProductionJob procesado, o None si no hay solicitudes disponibles.
+    """
+    with transaction.atomic():
+        job = (
+            ProductionJob.objects.filter(status=ProductionJob.Status.PENDING)
+            .select_related('tenant')
+            .select_for_update(
+                skip_locked=True, of=('self', 'tenant'),
+                no_key=connection.features.has_select_for_no_key_update
+            )
+            .order_by('id')
+            .first()
+        )
+        if job is None:
+            return None
+        _run_job(job)
+    return job
+
+
+def run_worker(stop_event=None, poll_interval=1.0, exit_when_idle=False):
+    """
+    Bucle de un worker: procesa solicitudes hasta que se active `stop_event`.
+
+    :param stop_event: threading.Event que detiene el worker (o None).
+    :param poll_interval: Segundos de espera cuando la cola está vacía.
+    :param exit_when_idle: Si es True, termina en cuanto no quedan solicitudes disponibles.
+    :return: Número de solicitudes procesadas.
+    """
+    stop_event = stop_event or threading.Event()
+    processed = 0
+    while not stop_event.is_set():
+        if process_next_job() is not None:
+            processed += 1
+        elif exit_when_idle:
+            break
+        else:
+            stop_event.wait(poll_interval)
+    return processed
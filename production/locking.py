@@ -0,0 +1,91 @@
+# production/locking.py
+"""
+Estrategias de bloqueo para la producción. Se elige con `settings.PRODUCTION_LOCKING`:
+
+- `rows` (por defecto): `SELECT ... FOR UPDATE` sobre las materias primas (en orden
+  de id). Lo que pasa con los lotes depende del motor de asignación
+  (production/allocation.py). Con `window` no se bloquea ningún lote por adelantado:
+  el bloqueo de la materia prima serializa a los consumidores, y el `UPDATE ... FROM`
+  solo toma los bloqueos de escritura de los lotes que descuenta. Con `python`,
+  además se bloquean con `FOR UPDATE` los lotes con stock de esas materias primas
+  antes de recorrerlos.
+- `advisory`: en PostgreSQL, un advisory lock de transacción por cada par
+  (tenant_id, raw_material_id) plegado al rango de `integer` (ver `advisory_key`),
+  tomados en orden ascendente en una sola sentencia.
+  No se bloquea ninguna fila: dos producciones solo se esperan si comparten una
+  materia prima, y nunca por los lotes. Los locks se liberan solos al terminar la
+  transacción (commit o rollback).
+- `optimistic`: no se bloquea nada al leer. Los lotes se descuentan con un UPDATE
+  condicional (`quantity_remaining >= cantidad`) y se verifica el número de filas
+  afectadas; si otro proceso consumió ese stock primero, se reintenta toda la
+  asignación con espera exponencial acotada y, agotados los reintentos, se usa
+  el camino `rows` (ver production/services.py).
+
+Fallback en SQLite: no existen advisory locks ni `FOR UPDATE` (Django lo omite);
+SQLite serializa a todos los escritores con su bloqueo de base de datos, así que
+en modo `advisory` se usa silenciosamente el camino `rows`, que es igual de seguro.
+
+En los modos `advisory` y `optimistic` los descuentos de stock deben ser relativos
+(`F()`), ya que las filas no quedan bloqueadas frente a otras escrituras.
+"""
+
+from django.conf import settings
+from django.db import connection
+
+from inventory.models import RawMaterial
+
+ROWS = 'rows'
+ADVISORY = 'advisory'
+OPTIMISTIC = 'optimistic'
+
+
+def locking_mode():
+    """Modo de bloqueo efectivo según la configuración y el motor actual."""
+    mode = getattr(settings, 'PRODUCTION_LOCKING', ROWS)
+    if mode == ADVISORY and connection.vendor != 'postgresql':
+        return ROWS
+    return mode
+
+
+def uses_advisory_locks():
+    """Indica si la configuración y el motor actual usan advisory locks."""
+    return locking_mode() == ADVISORY
+
+
+def advisory_key(tenant_id, raw_material_id):
+    """
+    Clave de dos enteros (tenant, materia prima) para `pg_advisory_xact_lock(int, int)`.
+
+    Los ids son `bigint`; los que no caben en un `integer` se pliegan a su rango
+    (módulo 2^32). Dos materias primas con la misma clave solo se esperan entre sí
+    sin necesidad, nunca se dejan de serializar.
+    """
+    return tuple((value + 2 ** 31) % 2 ** 32 - 2 ** 31 for value in (tenant_id, raw_material_id))
+
+
+def lock_raw_materials(tenant, raw_material_ids, mode=ROWS):
+    """
+    Serializa las producciones que comparten materias primas y devuelve esas
+    materias primas, con su contador de stock leído después de obtener el bloqueo.
+
+    Los bloqueos se toman siempre en orden ascendente de id para que dos
+    producciones con ingredientes en común no puedan producir un deadlock.
+    En modo `optimistic` solo se leen: los conflictos se detectan al descontar.
+
+    :param tenant: Empresa sobre la que se opera.
+    :param raw_material_ids: Ids de las materias primas a bloquear.
+    :param mode: Modo de bloqueo efectivo (ver `locking_mode`).
+    :return: Dict {raw_material_id: RawMaterial}.
+    """
+    materials = RawMaterial.objects.filter(tenant=tenant, id__in=raw_material_ids).order_by('id')
+    if mode == ADVISORY:
+        keys = sorted({advisory_key(tenant.id, rm_id) for rm_id in raw_material_ids})
+        if keys:
+            # Las expresiones de la lista SELECT se evalúan en orden, así que los locks
+            # se adquieren ordenados.
+            locks = ", ".join(["pg_advisory_xact_lock(CAST(%s AS integer), CAST(%s AS integer))"] * len(keys))
+            with connection.cursor() as cursor:
+                cursor.execute(f"SELECT {locks}", [value for key in keys for value in key])
+    elif mode == ROWS:
+        materials = materials.select_for_update()
+    return {rm.id: rm for rm in materials}
@@ -0,0 +1,76 @@
+# production/management/commands/benchmark_fifo_lookup.py
+import statistics
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from tenants.models import Tenant
+from inventory.models import RawMaterial, PurchaseBatch
+from production.services import fifo_open_batches
+
+
+class _Rollback(Exception):
+    """Se lanza al final del benchmark para descartar todos los datos generados."""
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures the FIFO open-batch lookup used by production while the number of depleted '
+        'batches grows. All generated data is rolled back at the end.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--depleted', type=str, default='0,10000,50000,100000',
+                            help="Comma separated totals of depleted batches to measure (ej: '0,10000,100000').")
+        parser.add_argument('--open', type=int, default=20, help='Open batches per raw material.')
+        parser.add_argument('--materials', type=int, default=5, help='Raw materials looked up per query.')
+        parser.add_argument('--repeat', type=int, default=50, help='Lookups per measurement (the median is reported).')
+
+    def handle(self, *args, **options):
+        steps = sorted(int(x) for x in options['depleted'].split(',') if x.strip())
+        try:
+            with transaction.atomic():
+                self._run(steps, options)
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+    def _run(self, steps, options):
+        tenant = Tenant.objects.create(name=f'benchmark-fifo-{time.time_ns()}')
+        materials = [
+            RawMaterial.objects.create(tenant=tenant, name=f'Material {i}', unit_of_measure='u')
+            for i in range(options['materials'])
+        ]
+        material_ids = [m.id for m in materials]
+        start = date(2000, 1, 1)
+
+        # Lotes abiertos recientes: son los únicos que la consulta debería visitar.
+        PurchaseBatch.objects.bulk_create([
+            PurchaseBatch(tenant=tenant, raw_material=material, purchase_date=start + timedelta(days=10000 + i),
+                          quantity=Decimal('10'), quantity_remaining=Decimal('10'), total_cost=Decimal('10'),
+                          unit_cost=Decimal('1'))
+            for material in materials for i in range(options['open'])
+        ])
+
+        self.stdout.write(f"{'depleted batches':>18} | {'median ms':>10} | {'rows':>5}")
+        created = 0
+        for target in steps:
+            # Historial agotado, más antiguo que los lotes abiertos.
+            PurchaseBatch.objects.bulk_create([
+                PurchaseBatch(tenant=tenant, raw_material=materials[i % len(materials)],
+                              purchase_date=start + timedelta(days=i % 9000),
+                              quantity=Decimal('10'), quantity_remaining=Decimal('0'), total_cost=Decimal('10'),
+                              unit_cost=Decimal('1'))
+                for i in range(created, target)
+            ], batch_size=2000)
+            created = max(created, target)
+
+            timings = []
+            rows = 0
+            for _ in range(options['repeat']):
+                begin = time.perf_counter()
+                rows = len(list(fifo_open_batches(tenant, material_ids).select_for_update()))
+                timings.append((time.perf_counter() - begin) * 1000)
+            self.stdout.write(f"{created:>18} | {statistics.median(timings):>10.3f} | {rows:>5}")
@@ -0,0 +1,27 @@
+# production/management/commands/rebuild_production_rollups.py
+from django.core.management.base import BaseCommand, CommandError
+
+from tenants.models import Tenant
+from production.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the daily production rollups (ProductionRollup) from the ProductionLog rows, "
+        "grouping by day in each tenant's time zone. Run it after changing a tenant's time zone."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='Only rebuild the rollups of this tenant ID.')
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.order_by('id')
+        if options.get('tenant'):
+            tenants = tenants.filter(pk=options['tenant'])
+            if not tenants.exists():
+                raise CommandError(f"Tenant {options['tenant']} does not exist.")
+
+        for tenant in tenants:
+            rows = rebuild_rollups(tenant)
+            self.stdout.write(f"  {tenant.name} ({tenant.timezone}): {rows} product-day row(s)")
+        self.stdout.write(self.style.SUCCESS('Production rollups rebuilt.'))
@@ -0,0 +1,41 @@
+# production/management/commands/recost_production.py
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+
+from tenants.models import Tenant
+from production.recost import recost_production
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-costs past productions of a FIFO tenant whose consumed purchase batches had their "
+        "cost corrected afterwards (e.g. a corrected supplier invoice), using the consumption "
+        "ledger. Updates ProductionLog.total_cost in bulk."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, required=True, help='Tenant ID to re-cost.')
+        parser.add_argument('--raw-material', type=int, action='append', dest='raw_materials',
+                            help='Only re-cost consumptions of this raw material ID (repeatable).')
+        parser.add_argument('--since', type=date.fromisoformat,
+                            help='Only re-cost productions from this date (YYYY-MM-DD), inclusive.')
+        parser.add_argument('--dry-run', action='store_true', help='Report the changes without saving them.')
+
+    def handle(self, *args, **options):
+        try:
+            tenant = Tenant.objects.get(pk=options['tenant'])
+        except Tenant.DoesNotExist:
+            raise CommandError(f"Tenant {options['tenant']} does not exist.")
+
+        try:
+            result = recost_production(tenant, options['raw_materials'], options['since'], options['dry_run'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        for change in result['production_logs']:
+            self.stdout.write(f"  ProductionLog {change['production_log_id']}: "
+                              f"{change['previous_cost']} -> {change['new_cost']}")
+        verb = 'Would re-cost' if options['dry_run'] else 'Re-costed'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {result['recosted']} production log(s); total difference {result['total_difference']}."
+        ))
@@ -0,0 +1,67 @@
+# production/management/commands/run_production_worker.py
+import signal
+import threading
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from production.jobs import run_worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Processes queued productions (ProductionJob) with a pool of worker threads. "
+        "Each tenant's jobs run serially in arrival order, while different tenants are "
+        "processed in parallel. Uses only the database as the queue."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Concurrent worker threads.')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--exit-when-idle', action='store_true',
+                            help='Drain the queue and exit instead of waiting for new jobs (e.g. from cron).')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1.')
+        if options['workers'] > 1 and connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING(
+                'sqlite serializes every writer: extra workers only add lock waits.'
+            ))
+
+        stop_event = threading.Event()
+        # SIGTERM/SIGINT terminan la solicitud en curso y detienen el pool.
+        previous_handlers = {
+            signum: signal.signal(signum, lambda *_: stop_event.set())
+            for signum in (signal.SIGINT, signal.SIGTERM)
+        }
+        try:
+            processed = self._run_pool(options['workers'], {
+                'stop_event': stop_event,
+                'poll_interval': options['poll_interval'],
+                'exit_when_idle': options['exit_when_idle'],
+            })
+        finally:
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} production job(s)."))
+
+    def _run_pool(self, workers, worker_kwargs):
+        if workers == 1:
+            return run_worker(**worker_kwargs)
+
+        processed = [0] * workers
+
+        def work(index):
+            try:
+                processed[index] = run_worker(**worker_kwargs)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sum(processed)
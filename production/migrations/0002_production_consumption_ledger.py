@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_allocation_strategies'),
+        ('production', '0001_initial'),
+        ('tenants', '0003_tenant_allocation_strategy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductionConsumption',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('production_date', models.DateTimeField(verbose_name='Fecha de Producción')),
+                ('quantity', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Cantidad Consumida')),
+                ('unit_cost', models.DecimalField(decimal_places=6, max_digits=16, verbose_name='Costo Unitario')),
+                ('production_log', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='consumptions', to='production.productionlog', verbose_name='Registro de Producción')),
+                ('purchase_batch', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='production_consumptions', to='inventory.purchasebatch', verbose_name='Lote de Compra')),
+                ('raw_material', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='production_consumptions', to='inventory.rawmaterial', verbose_name='Materia Prima')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='production_consumptions', to='tenants.tenant', verbose_name='Empresa')),
+            ],
+            options={
+                'verbose_name': 'Consumo de Producción',
+                'verbose_name_plural': 'Consumos de Producción',
+                'indexes': [models.Index(fields=['tenant', 'production_date'], name='prodconsumption_date_idx'), models.Index(fields=['tenant', 'raw_material', 'production_date'], name='prodconsumption_rm_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:54
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('production', '0002_production_consumption_ledger'),
+        ('tenants', '0004_idempotencyrecord'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('items', models.JSONField(verbose_name='Producciones Solicitadas')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('done', 'Completada'), ('failed', 'Fallida')], default='pending', max_length=10, verbose_name='Estado')),
+                ('error', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='Error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Solicitud')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Proceso')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='production_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Solicitada por')),
+                ('production_logs', models.ManyToManyField(blank=True, related_name='jobs', to='production.productionlog', verbose_name='Registros de Producción')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='production_jobs', to='tenants.tenant', verbose_name='Empresa')),
+            ],
+            options={
+                'verbose_name': 'Producción Encolada',
+                'verbose_name_plural': 'Producciones Encoladas',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['id'], name='productionjob_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:06
+
+import zoneinfo
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+# --- Función para generar los resúmenes diarios de la producción ya registrada ---
+def backfill_rollups(apps, schema_editor):
+    Tenant = apps.get_model('tenants', 'Tenant')
+    ProductionLog = apps.get_model('production', 'ProductionLog')
+    ProductionRollup = apps.get_model('production', 'ProductionRollup')
+    for tenant in Tenant.objects.only('id', 'timezone').iterator():
+        days = (
+            ProductionLog.objects.filter(tenant_id=tenant.id)
+            .annotate(day=TruncDate('production_date', tzinfo=zoneinfo.ZoneInfo(tenant.timezone)))
+            .values('product_id', 'day')
+            .annotate(quantity=Sum('quantity_produced'), cost=Sum('total_cost'), count=Count('id'))
+            .order_by()
+        )
+        ProductionRollup.objects.bulk_create([
+            ProductionRollup(tenant_id=tenant.id, product_id=row['product_id'], day=row['day'],
+                             quantity_produced=row['quantity'], total_cost=row['cost'],
+                             production_count=row['count'])
+            for row in days
+        ], batch_size=1000)
+# --- Fin de la función ---
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('production', '0003_productionjob'),
+        ('products', '0003_multilevel_recipes'),
+        ('tenants', '0005_tenant_timezone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Día')),
+                ('quantity_produced', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Cantidad Producida')),
+                ('total_cost', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Costo Total de Producción')),
+                ('production_count', models.PositiveIntegerField(default=0, verbose_name='Registros de Producción')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='production_rollups', to='products.product', verbose_name='Producto Terminado')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='production_rollups', to='tenants.tenant', verbose_name='Empresa')),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario de Producción',
+                'verbose_name_plural': 'Resúmenes Diarios de Producción',
+                'constraints': [models.UniqueConstraint(fields=('tenant', 'product', 'day'), name='productionrollup_unique_day')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('production', '0004_productionrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productionrollup',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -2,8 +2,10 @@
 
 from django.db import models
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from tenants.models import Tenant
 from products.models import Product
+from inventory.models import RawMaterial, PurchaseBatch
 
 class ProductionLog(models.Model):
     """
@@ -48,3 +50,169 @@ class ProductionLog(models.Model):
 
     def __str__(self):
         return f"Producción de {self.quantity_produced} x {self.product.name} el {self.production_date.strftime('%Y-%m-%d')}"
+
+
+class ProductionConsumption(models.Model):
+    """
+    Libro de consumos: qué cantidad de cada lote de compra se usó en cada registro
+    de producción y a qué costo unitario. Se escribe con un único `bulk_create` por
+    producción (ver production/services.py) y permite responder "¿qué lotes entraron
+    en esta producción?" o "costo de ventas por materia prima este mes" con agregados
+    indexados, sin reconstruir el historial.
+    """
+    tenant = models.ForeignKey(
+        Tenant,
+        on_delete=models.CASCADE,
+        related_name="production_consumptions",
+        verbose_name="Empresa"
+    )
+    production_log = models.ForeignKey(
+        ProductionLog,
+        on_delete=models.CASCADE,
+        related_name="consumptions",
+        verbose_name="Registro de Producción"
+    )
+    # PRINCIPIO: Igual que con los productos, un lote con consumos registrados no se
+    # puede eliminar: es parte del historial contable.
+    purchase_batch = models.ForeignKey(
+        PurchaseBatch,
+        on_delete=models.PROTECT,
+        related_name="production_consumptions",
+        verbose_name="Lote de Compra"
+    )
+    # // Copias desnormalizadas del lote y del registro: los reportes agrupan por
+    # // materia prima y filtran por fecha sin JOIN, sobre los índices de abajo.
+    raw_material = models.ForeignKey(
+        RawMaterial,
+        on_delete=models.PROTECT,
+        related_name="production_consumptions",
+        verbose_name="Materia Prima"
+    )
+    production_date = models.DateTimeField(verbose_name="Fecha de Producción")
+    quantity = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Cantidad Consumida")
+    # // Costo unitario cargado a la producción: el del lote (FIFO) o el promedio
+    # // ponderado vigente (costo promedio), según el método de la empresa.
+    unit_cost = models.DecimalField(max_digits=16, decimal_places=6, verbose_name="Costo Unitario")
+
+    class Meta:
+        verbose_name = "Consumo de Producción"
+        verbose_name_plural = "Consumos de Producción"
+        indexes = [
+            models.Index(fields=['tenant', 'production_date'], name='prodconsumption_date_idx'),
+            models.Index(fields=['tenant', 'raw_material', 'production_date'], name='prodconsumption_rm_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} del lote {self.purchase_batch_id} en la producción {self.production_log_id}"
+
+
+class ProductionJob(models.Model):
+    """
+    Producción encolada para registrarse en segundo plano (ver production/jobs.py).
+
+    La API la crea al instante y el comando `run_production_worker` la procesa: las
+    producciones de una misma empresa se ejecutan de a una, en orden de llegada, así
+    que no compiten entre sí por los bloqueos de stock. El resultado queda en
+    `production_logs` (o el motivo del fallo en `error`).
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pendiente'
+        DONE = 'done', 'Completada'
+        FAILED = 'failed', 'Fallida'
+
+    tenant = models.ForeignKey(
+        Tenant,
+        on_delete=models.CASCADE,
+        related_name="production_jobs",
+        verbose_name="Empresa"
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="production_jobs",
+        verbose_name="Solicitada por"
+    )
+    # // Las mismas líneas que el registro masivo: [{"product_id": 1, "quantity_produced": "10.00"}, ...]
+    items = models.JSONField(verbose_name="Producciones Solicitadas")
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+        verbose_name="Estado"
+    )
+    # // Mismo formato que las respuestas 400 de la API (faltantes de stock o {"detail": ...}).
+    error = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder, verbose_name="Error")
+    production_logs = models.ManyToManyField(
+        ProductionLog,
+        blank=True,
+        related_name="jobs",
+        verbose_name="Registros de Producción"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Solicitud")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Fecha de Proceso")
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Producción Encolada"
+        verbose_name_plural = "Producciones Encoladas"
+        indexes = [
+            # // La cola: los workers buscan la solicitud pendiente más antigua.
+            models.Index(fields=['id'], name='productionjob_pending_idx', condition=models.Q(status='pending')),
+        ]
+
+    def __str__(self):
+        return f"Producción encolada {self.id} ({self.get_status_display()})"
+
+
+class ProductionRollup(models.Model):
+    """
+    Totales diarios de producción por producto, mantenidos de forma incremental:
+    cada registro de producción suma su cantidad y su costo a la fila de su día (en
+    la zona horaria de la empresa) con un único upsert (ver production/rollups.py).
+
+    Los gráficos agregan estas filas por día, semana o mes en lugar de recorrer los
+    `ProductionLog` en cada carga.
+    """
+    tenant = models.ForeignKey(
+        Tenant,
+        on_delete=models.CASCADE,
+        related_name="production_rollups",
+        verbose_name="Empresa"
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name="production_rollups",
+        verbose_name="Producto Terminado"
+    )
+    # // Día local de la empresa (Tenant.timezone), no el día UTC.
+    day = models.DateField(verbose_name="Día")
+    quantity_produced = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        verbose_name="Cantidad Producida"
+    )
+    total_cost = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        verbose_name="Costo Total de Producción"
+    )
+    production_count = models.PositiveIntegerField(default=0, verbose_name="Registros de Producción")
+    # // Última escritura de la fila. Forma parte de la clave de caché de las series
+    # // (ver production/rollups.py), así que se actualiza también en el upsert.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Resumen Diario de Producción"
+        verbose_name_plural = "Resúmenes Diarios de Producción"
+        constraints = [
+            # // Clave del upsert; su índice también sirve a las series (tenant, producto, rango de días).
+            models.UniqueConstraint(fields=['tenant', 'product', 'day'], name='productionrollup_unique_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity_produced} x producto {self.product_id} el {self.day}"
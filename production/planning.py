@@ -0,0 +1,217 @@
+# production/planning.py
+"""
+Evaluación de planes de producción (MRP) y simulación de costos (cotizaciones)
+sin bloquear ni modificar nada.
+
+Un plan se evalúa contra una foto en memoria del inventario (`InventorySnapshot`):
+las materias primas involucradas y TODOS sus lotes con stock se cargan con una
+consulta cada una, y el consumo se simula en memoria con la misma estrategia
+(FIFO, FEFO o LIFO) y el mismo método de costeo que usaría la producción real.
+"""
+
+from decimal import Decimal
+
+from inventory.models import RawMaterial, PurchaseBatch
+from tenants.models import Tenant
+from .allocation import Consumption
+from .services import load_products, sum_requirements
+from .strategies import strategy_for
+
+
+def parse_production_plan(plan_input):
+    """
+    Interpreta un plan en formato 'clave:cantidad,clave2:cantidad' (ej: 'silla:10,sofa:3').
+
+    Lo usan el comando `seed_db --production-plan` (claves = slugs) y el endpoint de
+    planes (claves = IDs de producto). Si una clave se repite, sus cantidades se suman.
+
+    :param plan_input: Texto del plan.
+    :return: Tupla (plan, errores): dict {clave: Decimal} en el orden recibido y lista
+             de las partes que no se pudieron interpretar.
+    """
+    plan, errors = {}, []
+    for part in (x.strip() for x in (plan_input or '').split(',')):
+        if not part:
+            continue
+        key, _, quantity = part.partition(':')
+        try:
+            quantity = Decimal(quantity.strip())
+        except ArithmeticError:
+            quantity = None
+        if not key.strip() or quantity is None or not quantity.is_finite() or quantity <= 0:
+            errors.append(part)
+            continue
+        plan[key.strip()] = plan.get(key.strip(), Decimal('0')) + quantity
+    return plan, errors
+
+
+class InventorySnapshot:
+    """
+    Foto en memoria, sin bloqueos, del stock de un conjunto de materias primas.
+
+    Se carga con dos consultas (materias primas y lotes con stock). `consume`
+    descuenta de la foto, no de la base de datos, así que varias evaluaciones
+    sucesivas sobre la misma foto ven el stock que dejaron las anteriores.
+    """
+
+    def __init__(self, tenant, raw_material_ids):
+        self.tenant = tenant
+        self.materials = {
+            rm.id: rm for rm in RawMaterial.objects.filter(tenant=tenant, id__in=raw_material_ids)
+        }
+        batches = {rm_id: [] for rm_id in self.materials}
+        # Lectura simple (sin FOR UPDATE) y solo de las columnas que usa la simulación.
+        for batch in PurchaseBatch.objects.filter(
+            tenant=tenant, raw_material_id__in=self.materials.keys(), quantity_remaining__gt=0
+        ).only(
+            'id', 'raw_material_id', 'purchase_date', 'expiry_date', 'quantity_remaining', 'unit_cost'
+        ).order_by():
+            batches[batch.raw_material_id].append(batch)
+        # Cada materia prima ordena sus lotes según su estrategia de consumo.
+        self.batches = {
+            rm_id: strategy_for(tenant, self.materials[rm_id]).sort_batches(rm_batches)
+            for rm_id, rm_batches in batches.items()
+        }
+
+    def available(self, rm_id):
+        """Stock restante de la materia prima en la foto."""
+        return sum((batch.quantity_remaining for batch in self.batches[rm_id]), Decimal('0.00'))
+
+    def consume(self, needs):
+        """
+        Simula el consumo de `needs` en la foto, en el orden de cada estrategia.
+
+        :param needs: Dict {raw_material_id: Decimal}.
+        :return: Tupla (consumptions, shortfalls): dict {raw_material_id: [Consumption, ...]}
+                 con lo que se pudo tomar y dict {raw_material_id: Decimal} con lo que faltó.
+        """
+        consumptions, shortfalls = {}, {}
+        for rm_id, need in needs.items():
+            remaining = need
+            consumed = consumptions.setdefault(rm_id, [])
+            for batch in self.batches[rm_id]:
+                if remaining <= 0:
+                    break
+                amount = min(remaining, batch.quantity_remaining)
+                if amount <= 0:
+                    continue
+                batch.quantity_remaining -= amount
+                remaining -= amount
+                consumed.append(Consumption(batch.id, rm_id, amount, batch.unit_cost))
+            if remaining > 0:
+                shortfalls[rm_id] = remaining
+        return consumptions, shortfalls
+
+    def unit_cost(self, consumption):
+        """
+        Costo unitario con el que se valora un consumo según el método de costeo de la
+        empresa: el del lote (FIFO) o el promedio ponderado de la materia prima.
+        """
+        if self.tenant.costing_method == Tenant.CostingMethod.AVERAGE:
+            return self.materials[consumption.raw_material_id].average_unit_cost
+        return consumption.unit_cost
+
+    def cost(self, consumptions):
+        """Costo de un consumo según el método de costeo de la empresa (ver `unit_cost`)."""
+        return sum((c.quantity * self.unit_cost(c) for consumed in consumptions.values() for c in consumed),
+                   Decimal('0.0'))
+
+
+def evaluate_production_plan(tenant, items, products=None):
+    """
+    Calcula los requerimientos agregados de un plan de producción, el stock actual,
+    el faltante por materia prima y el costo estimado, sin bloquear ni modificar nada.
+
+    El costo estimado solo cubre la parte del plan que el stock actual puede atender;
+    lo que falta se reporta en `shortfall`.
+
+    :param tenant: Empresa sobre la que se opera.
+    :param items: Lista de tuplas (product_id, quantity_to_produce: Decimal).
+    :param products: (Opcional) Dict {product_id: Product} ya cargados por el serializer.
+    :return: Dict con `feasible`, `estimated_cost` y el detalle por materia prima.
+    :raises ValueError: Si algún producto no existe o no tiene receta.
+    """
+    products = load_products(tenant, [product_id for product_id, _ in items], save_boms=False,
+                             products=products)
+    total_required, _ = sum_requirements(products, items)
+    snapshot = InventorySnapshot(tenant, total_required.keys())
+
+    available = {rm_id: snapshot.available(rm_id) for rm_id in total_required}
+    consumptions, shortfalls = snapshot.consume(total_required)
+
+    materials = []
+    for rm_id in sorted(total_required, key=lambda rm_id: snapshot.materials[rm_id].name):
+        material = snapshot.materials[rm_id]
+        materials.append({
+            "raw_material": {"id": material.id, "name": material.name, "unit_of_measure": material.unit_of_measure},
+            "quantity_required": f"{total_required[rm_id]:.2f}",
+            "quantity_available": f"{available[rm_id]:.2f}",
+            "shortfall": f"{shortfalls.get(rm_id, Decimal('0')):.2f}",
+            "estimated_cost": f"{snapshot.cost({rm_id: consumptions[rm_id]}).quantize(Decimal('0.01')):.2f}",
+        })
+
+    return {
+        "feasible": not shortfalls,
+        "estimated_cost": f"{snapshot.cost(consumptions).quantize(Decimal('0.01')):.2f}",
+        "materials": materials,
+    }
+
+
+def simulate_production(tenant, items, products=None):
+    """
+    Simula el costo de una o varias producciones a los precios de los lotes actuales,
+    sin bloquear ni modificar nada (p. ej. para cotizar "¿cuánto costarían 200 sofás?").
+
+    Cada producción consume de la foto en el orden recibido, con la misma aritmética
+    que `register_production_batch` (mismos redondeos, estrategia y método de costeo),
+    así que el resultado coincide con lo que costaría registrarlas ahora. El número
+    de consultas es constante: productos y recetas, materias primas y lotes.
+
+    :param tenant: Empresa sobre la que se opera.
+    :param items: Lista de tuplas (product_id, quantity_to_produce: Decimal).
+    :param products: (Opcional) Dict {product_id: Product} ya cargados por el serializer.
+    :return: Dict con el costo total y el desglose por producción y materia prima.
+    :raises ValueError: Si algún producto no existe o no tiene receta.
+    """
+    products = load_products(tenant, [product_id for product_id, _ in items], save_boms=False,
+                             products=products)
+    total_required, item_requirements = sum_requirements(products, items)
+    snapshot = InventorySnapshot(tenant, total_required.keys())
+
+    simulated_items = []
+    total_cost = Decimal('0.0')
+    for (product_id, quantity), requirements in zip(items, item_requirements):
+        consumptions, shortfalls = snapshot.consume(requirements)
+        item_cost = snapshot.cost(consumptions)
+        total_cost += item_cost
+        materials = []
+        for rm_id, consumed in consumptions.items():
+            material = snapshot.materials[rm_id]
+            materials.append({
+                "raw_material": {"id": material.id, "name": material.name},
+                "quantity": f"{requirements[rm_id]:.2f}",
+                "cost": f"{snapshot.cost({rm_id: consumed}).quantize(Decimal('0.01')):.2f}",
+                "shortfall": f"{shortfalls.get(rm_id, Decimal('0')):.2f}",
+                # Cada línea muestra el costo con el que se valoró (el del lote o, con costo
+                # promedio, el de la materia prima), con la precisión guardada (6 decimales).
+                "batches": [
+                    {"batch_id": c.batch_id, "quantity": f"{c.quantity:.2f}",
+                     "unit_cost": f"{snapshot.unit_cost(c):.6f}"}
+                    for c in consumed
+                ],
+            })
+        simulated_items.append({
+            "product_id": product_id,
+            "product_name": products[product_id].name,
+            "quantity": f"{quantity:.2f}",
+            "feasible": not shortfalls,
+            "total_cost": f"{item_cost.quantize(Decimal('0.01')):.2f}",
+            "unit_cost": f"{(item_cost / quantity).quantize(Decimal('0.01')):.2f}",
+            "materials": materials,
+        })
+
+    return {
+        "feasible": all(item["feasible"] for item in simulated_items),
+        "total_cost": f"{total_cost.quantize(Decimal('0.01')):.2f}",
+        "items": simulated_items,
+    }
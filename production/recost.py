@@ -0,0 +1,144 @@
+# production/recost.py
+"""
+Recálculo retroactivo del costo de producción tras corregir el costo de un lote.
+
+Cuando se corrige la factura de un proveedor cambia el `unit_cost` de un
+`PurchaseBatch` antiguo, pero los `ProductionLog.total_cost` que lo consumieron
+siguen con el costo viejo. El libro de consumos (`ProductionConsumption`) guarda,
+para cada producción, qué cantidad tomó de cada lote en el orden FIFO real, así
+que reproducir el FIFO no exige repetir la asignación: basta volver a valorar esas
+mismas cantidades con el costo corregido de cada lote.
+
+La valoración se hace con arreglos de NumPy en aritmética entera exacta (cantidades
+en centésimas, costos en millonésimas; en `int64`, o con enteros de Python si los
+valores pudieran desbordarlo), sin instanciar objetos del ORM:
+
+1. Una consulta obtiene las producciones con algún consumo cuyo costo unitario ya
+   no coincide con el de su lote (opcionalmente, solo de ciertas materias primas y
+   desde cierta fecha).
+2. Otra carga todas las líneas del libro de esas producciones con el costo actual
+   de su lote.
+3. `np.add.at` suma cantidad × costo por producción.
+4. Un UPDATE corrige el costo unitario de las líneas desactualizadas, un
+   `bulk_update` los costos totales de las producciones y un upsert los
+   resúmenes diarios de producción.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+
+from inventory.models import PurchaseBatch
+from tenants.models import Tenant
+from .models import ProductionLog, ProductionConsumption
+from .reports import consumptions_between
+from .rollups import apply_rollup_deltas, local_day
+
+# Escalas de la aritmética entera: las columnas tienen 2 y 6 decimales.
+_QUANTITY_SCALE = 100
+_COST_SCALE = 1_000_000
+
+
+def _line_values(quantities, unit_costs):
+    """
+    Cantidad × costo de cada línea, en enteros exactos (escala `_QUANTITY_SCALE * _COST_SCALE`).
+
+    Las columnas admiten valores cuyo producto (y su suma por producción) no cabe en
+    `int64`, y NumPy desbordaría en silencio. Si la cota de la suma supera `int64`,
+    se usan enteros de Python (`dtype=object`): más lento, pero exacto.
+
+    :return: Arreglo de NumPy con el valor de cada línea.
+    """
+    quantities = [int(value * _QUANTITY_SCALE) for value in quantities]
+    unit_costs = [int(value * _COST_SCALE) for value in unit_costs]
+    bound = max(map(abs, quantities)) * max(map(abs, unit_costs)) * len(quantities)
+    dtype = np.int64 if bound <= np.iinfo(np.int64).max else object
+    return np.array(quantities, dtype=dtype) * np.array(unit_costs, dtype=dtype)
+
+
+def stale_consumptions(tenant, raw_material_ids=None, since=None):
+    """
+    Líneas del libro de consumos cuyo costo unitario ya no coincide con el de su lote.
+
+    :param raw_material_ids: Limita el recálculo a estas materias primas (o None).
+    :param since: Fecha (date) desde la que se recalcula, incluida (o None).
+    """
+    consumptions = consumptions_between(tenant, date_from=since).exclude(unit_cost=F('purchase_batch__unit_cost'))
+    if raw_material_ids:
+        consumptions = consumptions.filter(raw_material_id__in=raw_material_ids)
+    return consumptions
+
+
+def recost_production(tenant, raw_material_ids=None, since=None, dry_run=False):
+    """
+    Vuelve a costear, con el costo actual de cada lote, las producciones que
+    consumieron lotes cuyo costo se corrigió después.
+
+    Solo aplica al costeo FIFO: con costo promedio, la producción se valoró con el
+    promedio vigente en ese momento, no con el costo del lote.
+
+    :param tenant: Empresa sobre la que se opera.
+    :param raw_material_ids: Limita el recálculo a estas materias primas (o None).
+    :param since: Fecha (date) desde la que se recalcula, incluida (o None).
+    :param dry_run: Si es True, calcula los cambios sin guardarlos.
+    :return: Dict con el número de producciones afectadas, la diferencia total y el
+             detalle por producción (costo anterior y nuevo).
+    :raises ValueError: Si la empresa no usa costeo FIFO.
+    """
+    if tenant.costing_method != Tenant.CostingMethod.FIFO:
+        raise ValueError("El recálculo retroactivo solo aplica a empresas con costeo FIFO.")
+
+    with transaction.atomic():
+        stale = stale_consumptions(tenant, raw_material_ids, since)
+        log_ids = sorted(set(stale.values_list('production_log_id', flat=True)))
+        if not log_ids:
+            return {"recosted": 0, "total_difference": "0.00", "production_logs": []}
+
+        # Todas las líneas de las producciones afectadas (también las de otras materias
+        # primas: el total de la producción las incluye), con el costo actual del lote.
+        rows = list(ProductionConsumption.objects.filter(production_log_id__in=log_ids).values_list(
+            'production_log_id', 'quantity', 'purchase_batch__unit_cost'
+        ).order_by())
+        row_logs, quantities, unit_costs = zip(*rows)
+
+        positions = np.searchsorted(np.array(log_ids, dtype=np.int64), np.array(row_logs, dtype=np.int64))
+        values = _line_values(quantities, unit_costs)
+        totals = np.zeros(len(log_ids), dtype=values.dtype)
+        np.add.at(totals, positions, values)
+
+        scale = Decimal(_QUANTITY_SCALE * _COST_SCALE)
+        new_costs = {
+            log_id: (Decimal(int(total)) / scale).quantize(Decimal('0.01'))
+            for log_id, total in zip(log_ids, totals)
+        }
+        logs = list(ProductionLog.objects.filter(id__in=log_ids).only(
+            'id', 'total_cost', 'product_id', 'production_date'
+        ).order_by('id'))
+        changes = [
+            {"production_log_id": log.id, "previous_cost": f"{log.total_cost:.2f}",
+             "new_cost": f"{new_costs[log.id]:.2f}"}
+            for log in logs
+        ]
+        difference = sum((new_costs[log.id] - log.total_cost for log in logs), Decimal('0.00'))
+
+        if not dry_run:
+            stale.update(unit_cost=Subquery(
+                PurchaseBatch.objects.filter(pk=OuterRef('purchase_batch_id')).values('unit_cost')[:1]
+            ))
+            # Los resúmenes diarios (gráficos) reciben la diferencia de costo de cada día.
+            rollup_deltas = defaultdict(lambda: (Decimal('0.00'), Decimal('0.00'), 0))
+            for log in logs:
+                key = (log.product_id, local_day(tenant, log.production_date))
+                rollup_deltas[key] = (Decimal('0.00'), rollup_deltas[key][1] + new_costs[log.id] - log.total_cost, 0)
+                log.total_cost = new_costs[log.id]
+            ProductionLog.objects.bulk_update(logs, ['total_cost'], batch_size=1000)
+            apply_rollup_deltas(tenant, rollup_deltas)
+
+    return {
+        "recosted": len(logs),
+        "total_difference": f"{difference:.2f}",
+        "production_logs": changes,
+    }
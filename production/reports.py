@@ -0,0 +1,80 @@
+# production/reports.py
+"""
+Reportes de consumo y costo de ventas (COGS) sobre el libro de consumos
+(`ProductionConsumption`).
+
+Cada reporte se resuelve con un agregado SQL: el filtro por empresa y rango de fechas
+coincide con los índices `prodconsumption_date_idx` y `prodconsumption_rm_idx`,
+así que el costo no depende de cuánto historial tenga la empresa fuera del rango.
+"""
+
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db.models import DecimalField, F, Sum
+from django.utils import timezone
+
+from inventory.models import RawMaterial
+from .models import ProductionConsumption
+
+
+def _day_start(tenant, day):
+    """Inicio (aware) de un día en la zona horaria de la empresa."""
+    return timezone.make_aware(datetime.combine(day, time.min), tenant.tzinfo) if day else None
+
+
+def consumptions_between(tenant, date_from=None, date_to=None):
+    """
+    Consumos de la empresa entre dos fechas (ambas incluidas, en la zona horaria de la
+    empresa, igual que los resúmenes y series de production/rollups.py).
+
+    El rango se traduce a límites de `production_date` en lugar de truncar la columna,
+    para que la consulta pueda usar los índices.
+    """
+    consumptions = ProductionConsumption.objects.filter(tenant=tenant)
+    if date_from:
+        consumptions = consumptions.filter(production_date__gte=_day_start(tenant, date_from))
+    if date_to:
+        consumptions = consumptions.filter(production_date__lt=_day_start(tenant, date_to + timedelta(days=1)))
+    return consumptions
+
+
+def consumption_report(tenant, date_from=None, date_to=None):
+    """
+    Cantidad consumida y costo de ventas por materia prima en un rango de fechas
+    (dos consultas: el agregado y los nombres de las materias primas).
+
+    :param tenant: Empresa sobre la que se opera.
+    :param date_from: Fecha inicial (date) o None.
+    :param date_to: Fecha final (date, incluida) o None.
+    :return: Dict con el costo total y el desglose por materia prima, ordenado por nombre.
+    """
+    # Se agrupa solo por la columna indexada; los nombres se leen después, en una
+    # consulta por las pocas materias primas resultantes.
+    rows = list(consumptions_between(tenant, date_from, date_to).values('raw_material_id').annotate(
+        consumed=Sum('quantity'),
+        cost=Sum(F('quantity') * F('unit_cost'), output_field=DecimalField(max_digits=26, decimal_places=8))
+    ).order_by())
+    names = {
+        rm_id: (name, unit)
+        for rm_id, name, unit in RawMaterial.objects.filter(
+            id__in=[row['raw_material_id'] for row in rows]
+        ).values_list('id', 'name', 'unit_of_measure')
+    }
+
+    materials = []
+    total_cost = Decimal('0.0')
+    for row in sorted(rows, key=lambda row: (names[row['raw_material_id']][0], row['raw_material_id'])):
+        name, unit = names[row['raw_material_id']]
+        total_cost += row['cost']
+        materials.append({
+            "raw_material": {"id": row['raw_material_id'], "name": name, "unit_of_measure": unit},
+            "quantity": f"{row['consumed']:.2f}",
+            "cost": f"{row['cost'].quantize(Decimal('0.01')):.2f}",
+        })
+    return {
+        "date_from": date_from.isoformat() if date_from else None,
+        "date_to": date_to.isoformat() if date_to else None,
+        "total_cost": f"{total_cost.quantize(Decimal('0.01')):.2f}",
+        "materials": materials,
+    }
@@ -0,0 +1,288 @@
+# production/rollups.py
+"""
+Resúmenes diarios de producción (`ProductionRollup`) y series para gráficos.
+
+Cada registro de producción suma su cantidad, su costo y un contador a la fila
+(empresa, producto, día) de su día local, en la misma transacción y con un único
+`INSERT ... ON CONFLICT DO UPDATE` para todas las producciones de la operación.
+Los días se calculan en la zona horaria de la empresa (`Tenant.timezone`), así
+que una producción a las 23:30 de Managua cuenta para ese día y no para el
+siguiente en UTC.
+
+Las series por día, semana (lunes) o mes agregan esas filas en SQL para varios
+productos en una sola consulta, en lugar de recorrer los `ProductionLog`.
+`rebuild_rollups` los reconstruye desde los registros (comando
+`rebuild_production_rollups`), p. ej. tras cambiar la zona horaria de una empresa.
+
+Con `max_points`, cada serie se reduce con LTTB (production/downsampling.py) y el
+resultado se guarda en la caché de Django por (empresa, productos, rango, puntos).
+La clave incluye además una huella de los resúmenes de esos productos, leída de la
+base de datos en una consulta (filas, registros de producción, costo total y
+última escritura). Cualquier escritura confirmada cambia la huella, sea del
+proceso que sea (otro worker de gunicorn, `run_production_worker`, un recálculo
+de costos), así que la invalidación no depende de que la caché sea compartida:
+con la caché local de cada proceso solo se calculan más series, nunca se sirven
+viejas.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .downsampling import lttb_indices
+from .models import ProductionLog, ProductionRollup
+
+DAY = 'day'
+WEEK = 'week'
+MONTH = 'month'
+GRANULARITIES = (DAY, WEEK, MONTH)
+
+# Límite de períodos por serie, para no devolver años de datos día por día. Con
+# `max_points` la respuesta ya está acotada y el límite solo protege el cálculo.
+MAX_PERIODS = 1000
+MAX_DOWNSAMPLED_PERIODS = 20000
+
+SERIES_CACHE_PREFIX = 'production-series'
+
+
+def local_day(tenant, moment):
+    """Día (date) de un instante en la zona horaria de la empresa."""
+    return timezone.localtime(moment, tenant.tzinfo).date()
+
+
+def _series_stamp(tenant, product_ids):
+    """
+    Huella de los resúmenes de los productos: cambia con cualquier escritura
+    confirmada. El contador de registros y el costo total cubren también una
+    escritura confirmada más tarde que otra pero con un `updated_at` anterior.
+    """
+    stamp = ProductionRollup.objects.filter(tenant=tenant, product_id__in=product_ids).aggregate(
+        rows=Count('id'), productions=Sum('production_count'), cost=Sum('total_cost'), updated=Max('updated_at')
+    )
+    updated = stamp['updated'].isoformat() if stamp['updated'] else None
+    return f"{stamp['rows']}-{stamp['productions']}-{stamp['cost']}-{updated}"
+
+
+def cached_series(tenant, product_ids, key_parts, compute):
+    """
+    Devuelve la serie guardada en caché para `key_parts` o la calcula con
+    `compute()` y la guarda durante `PRODUCTION_SERIES_CACHE_TTL` segundos.
+
+    :param product_ids: Productos de la serie; sus resúmenes forman la huella de la clave.
+    :param key_parts: Valores que identifican la serie (rango, granularidad, puntos...).
+    """
+    product_ids = sorted(product_ids)
+    key = ":".join(str(part) for part in (
+        SERIES_CACHE_PREFIX, tenant.id, ",".join(map(str, product_ids)), *key_parts,
+        _series_stamp(tenant, product_ids)
+    ))
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        cache.set(key, result, settings.PRODUCTION_SERIES_CACHE_TTL)
+    return result
+
+
+def downsample(periods, columns, max_points):
+    """
+    Reduce con LTTB una serie de `periods` y sus columnas de valores, eligiendo
+    los puntos según la primera columna y conservando los mismos en las demás.
+
+    :return: (períodos, columnas) reducidos.
+    """
+    indices = lttb_indices(columns[0], max_points)
+    return [periods[i] for i in indices], [[column[i] for i in indices] for column in columns]
+
+
+def _upsert_rollups(tenant, deltas):
+    table = connection.ops.quote_name(ProductionRollup._meta.db_table)
+    columns = ('tenant_id', 'product_id', 'day', 'quantity_produced', 'total_cost', 'production_count',
+               'updated_at')
+    quoted = [connection.ops.quote_name(column) for column in columns]
+    increments = ", ".join(f"{column} = {table}.{column} + EXCLUDED.{column}" for column in quoted[3:6])
+    increments += f", {quoted[6]} = EXCLUDED.{quoted[6]}"
+    placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s, %s)"] * len(deltas))
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    params = []
+    for (product_id, day), (quantity, cost, count) in sorted(deltas.items()):
+        params.extend([
+            tenant.id, product_id, connection.ops.adapt_datefield_value(day),
+            connection.ops.adapt_decimalfield_value(quantity), connection.ops.adapt_decimalfield_value(cost), count,
+            now,
+        ])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({', '.join(quoted)}) VALUES {placeholders} "
+            f"ON CONFLICT ({', '.join(quoted[:3])}) DO UPDATE SET {increments}",
+            params
+        )
+
+
+def apply_rollup_deltas(tenant, deltas):
+    """
+    Suma diferencias a los resúmenes diarios, creando las filas que falten.
+
+    En PostgreSQL y SQLite es una sola sentencia (`ON CONFLICT DO UPDATE`) con
+    incrementos relativos, segura frente a producciones concurrentes del mismo
+    producto y día. En otros motores se usa un UPDATE (y un INSERT si no existe) por fila.
+
+    :param tenant: Empresa sobre la que se opera.
+    :param deltas: Dict {(product_id, day): (cantidad, costo, registros)}.
+    """
+    if not deltas:
+        return
+    if connection.features.supports_update_conflicts_with_target:
+        _upsert_rollups(tenant, deltas)
+        return
+    for (product_id, day), (quantity, cost, count) in deltas.items():
+        updated = ProductionRollup.objects.filter(tenant=tenant, product_id=product_id, day=day).update(
+            quantity_produced=F('quantity_produced') + quantity,
+            total_cost=F('total_cost') + cost,
+            production_count=F('production_count') + count,
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            ProductionRollup.objects.create(tenant=tenant, product_id=product_id, day=day,
+                                            quantity_produced=quantity, total_cost=cost, production_count=count)
+
+
+def record_productions(tenant, production_logs):
+    """
+    Suma los registros de producción recién creados a sus resúmenes diarios.
+
+    :param production_logs: ProductionLog ya guardados (con `production_date`).
+    """
+    deltas = defaultdict(lambda: (Decimal('0.00'), Decimal('0.00'), 0))
+    for production_log in production_logs:
+        key = (production_log.product_id, local_day(tenant, production_log.production_date))
+        quantity, cost, count = deltas[key]
+        deltas[key] = (quantity + production_log.quantity_produced, cost + production_log.total_cost, count + 1)
+    apply_rollup_deltas(tenant, deltas)
+
+
+def rebuild_rollups(tenant):
+    """
+    Reconstruye los resúmenes diarios de la empresa desde sus registros de
+    producción, agrupando por día local en SQL.
+
+    :return: Número de filas (producto, día) generadas.
+    """
+    with transaction.atomic():
+        ProductionRollup.objects.filter(tenant=tenant).delete()
+        days = (
+            ProductionLog.objects.filter(tenant=tenant)
+            .annotate(day=TruncDate('production_date', tzinfo=tenant.tzinfo))
+            .values('product_id', 'day')
+            .annotate(quantity=Sum('quantity_produced'), cost=Sum('total_cost'), count=Count('id'))
+            .order_by()
+        )
+        rollups = ProductionRollup.objects.bulk_create([
+            ProductionRollup(tenant=tenant, product_id=row['product_id'], day=row['day'],
+                             quantity_produced=row['quantity'], total_cost=row['cost'],
+                             production_count=row['count'])
+            for row in days
+        ], batch_size=1000)
+    return len(rollups)
+
+
+def _period_start(day, granularity):
+    if granularity == WEEK:
+        return day - timedelta(days=day.weekday())
+    if granularity == MONTH:
+        return day.replace(day=1)
+    return day
+
+
+def _next_period(start, granularity):
+    if granularity == WEEK:
+        return start + timedelta(days=7)
+    if granularity == MONTH:
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def production_series(tenant, products, granularity=MONTH, date_from=None, date_to=None, max_points=None):
+    """
+    Series de producción (cantidad y costo) por período para varios productos, con
+    todos los períodos del rango (los vacíos en cero), listas para un gráfico.
+
+    Con `max_points`, cada serie se reduce con LTTB (según la cantidad producida) a
+    lo sumo a ese número de puntos y lleva sus propios `periods`, porque los puntos
+    conservados difieren entre productos; el resultado se guarda en caché.
+
+    :param tenant: Empresa sobre la que se opera.
+    :param products: Productos (de la empresa) a incluir, en el orden deseado.
+    :param granularity: 'day', 'week' (desde el lunes) o 'month'.
+    :param date_from: Primer día (date) incluido; por defecto, el primero con producción.
+    :param date_to: Último día (date) incluido; por defecto, hoy en la zona de la empresa.
+    :param max_points: Máximo de puntos por serie (al menos 3); sin reducción si es None.
+    :return: Dict con los períodos (inicio de cada uno) y una serie por producto.
+    :raises ValueError: Si el rango supera `MAX_PERIODS` períodos (`MAX_DOWNSAMPLED_PERIODS`
+        con `max_points`).
+    """
+    if max_points is None:
+        return _production_series(tenant, products, granularity, date_from, date_to)
+
+    date_to = date_to or local_day(tenant, timezone.now())
+    # El orden de los productos cambia el de las series, así que también forma parte de la clave.
+    key_parts = (",".join(str(product.id) for product in products), granularity, date_from, date_to, max_points)
+
+    def compute():
+        result = _production_series(tenant, products, granularity, date_from, date_to, MAX_DOWNSAMPLED_PERIODS)
+        periods = result.pop("periods")
+        for serie in result["series"]:
+            serie["periods"], (serie["quantity_produced"], serie["total_cost"]) = downsample(
+                periods, [serie["quantity_produced"], serie["total_cost"]], max_points
+            )
+        result["max_points"] = max_points
+        return result
+
+    return cached_series(tenant, [product.id for product in products], key_parts, compute)
+
+
+def _production_series(tenant, products, granularity, date_from, date_to, max_periods=MAX_PERIODS):
+    rollups = ProductionRollup.objects.filter(tenant=tenant, product__in=products)
+    if date_from:
+        rollups = rollups.filter(day__gte=date_from)
+    if date_to:
+        rollups = rollups.filter(day__lte=date_to)
+    period = {DAY: F('day'), WEEK: TruncWeek('day'), MONTH: TruncMonth('day')}[granularity]
+    rows = list(
+        rollups.annotate(period=period).values('product_id', 'period')
+        .annotate(quantity=Sum('quantity_produced'), cost=Sum('total_cost')).order_by()
+    )
+
+    first_day = date_from or min((row['period'] for row in rows), default=None)
+    periods = []
+    if first_day is not None:
+        start = _period_start(first_day, granularity)
+        end = _period_start(date_to or local_day(tenant, timezone.now()), granularity)
+        while start <= end:
+            periods.append(start)
+            if len(periods) > max_periods:
+                raise ValueError(f"El rango supera los {max_periods} períodos; usa una granularidad mayor.")
+            start = _next_period(start, granularity)
+
+    values = {(row['product_id'], row['period']): row for row in rows}
+    zero = {'quantity': Decimal('0.00'), 'cost': Decimal('0.00')}
+    return {
+        "granularity": granularity,
+        "timezone": tenant.timezone,
+        "periods": [start.isoformat() for start in periods],
+        "series": [
+            {
+                "product_id": product.id,
+                "product_name": product.name,
+                "quantity_produced": [f"{values.get((product.id, start), zero)['quantity']:.2f}" for start in periods],
+                "total_cost": [f"{values.get((product.id, start), zero)['cost']:.2f}" for start in periods],
+            }
+            for product in products
+        ],
+    }
@@ -1,17 +1,25 @@
 # production/serializers.py
 
+from decimal import Decimal
 from rest_framework import serializers
-from .models import ProductionLog
+from .models import ProductionLog, ProductionConsumption, ProductionJob
+from .planning import parse_production_plan
+from .rollups import GRANULARITIES, MONTH, MAX_PERIODS
 from products.models import Product
+from inventory.fields import BulkResolvingListSerializer, TenantPrimaryKeyRelatedField
+from inventory.models import RawMaterial
 
 class ProductionRegistrationSerializer(serializers.Serializer):
     """
     Serializer para validar los datos de entrada al registrar una producción.
     Este serializer no está asociado a un modelo, solo valida el payload de entrada.
     """
-    product_id = serializers.IntegerField(
-        required=True,
-        help_text="ID del Producto Terminado que se va a producir."
+    # Limitado a la empresa del usuario; devuelve el producto ya cargado (con su receta
+    # aplanada en caché) para que el servicio no vuelva a consultarlo.
+    product_id = TenantPrimaryKeyRelatedField(
+        queryset=Product.objects.all(),
+        help_text="ID del Producto Terminado que se va a producir.",
+        error_messages={'does_not_exist': "Producto no encontrado o no pertenece a tu empresa."}
     )
     quantity_produced = serializers.DecimalField(
         required=True,
@@ -21,14 +29,59 @@ class ProductionRegistrationSerializer(serializers.Serializer):
         help_text="Cantidad de unidades del producto que se han fabricado."
     )
 
-    def validate_product_id(self, value):
-        """
-        Valida que el producto exista y pertenezca al tenant del usuario.
-        """
-        tenant = self.context['request'].user.tenant
-        if not Product.objects.filter(id=value, tenant=tenant).exists():
-            raise serializers.ValidationError("Producto no encontrado o no pertenece a tu empresa.")
-        return value
+
+class ProductionBulkItemSerializer(serializers.Serializer):
+    """
+    Una línea (producto, cantidad) dentro de un registro de producción masivo.
+    Los productos de todas las líneas se resuelven (y se verifica que sean de la
+    empresa) con una sola consulta; ver inventory/fields.py. `product_id` devuelve
+    el producto ya cargado, que los servicios reciben para no volver a consultarlo.
+    """
+    product_id = TenantPrimaryKeyRelatedField(queryset=Product.objects.all())
+    quantity_produced = serializers.DecimalField(
+        required=True,
+        max_digits=10,
+        decimal_places=2,
+        min_value=Decimal('0.01')
+    )
+
+    class Meta:
+        list_serializer_class = BulkResolvingListSerializer
+
+
+class ProductionBulkRegistrationSerializer(serializers.Serializer):
+    """
+    Serializer para validar un registro masivo de producciones (ej. cierre de turno).
+    """
+    items = ProductionBulkItemSerializer(many=True, allow_empty=False)
+
+
+class ProductionPlanSerializer(ProductionBulkRegistrationSerializer):
+    """
+    Serializer para validar un plan de producción a evaluar (no registra nada).
+
+    Acepta la lista `items` o, como `seed_db --production-plan`, un texto `plan`
+    con el formato 'product_id:cantidad,product_id2:cantidad'.
+    """
+    items = ProductionBulkItemSerializer(many=True, required=False, allow_empty=False)
+    plan = serializers.CharField(required=False, write_only=True)
+
+    def validate(self, data):
+        if 'plan' in data:
+            plan, errors = parse_production_plan(data.pop('plan'))
+            if errors or not plan or not all(key.isdigit() for key in plan):
+                raise serializers.ValidationError({
+                    "plan": "Formato inválido. Usa 'product_id:cantidad,product_id2:cantidad' (ej: '3:10,7:2.5')."
+                })
+            items = ProductionBulkItemSerializer(many=True, context=self.context, data=[
+                {'product_id': int(key), 'quantity_produced': str(quantity)} for key, quantity in plan.items()
+            ])
+            if not items.is_valid():
+                raise serializers.ValidationError({"plan": items.errors})
+            data['items'] = items.validated_data
+        elif 'items' not in data:
+            raise serializers.ValidationError({"items": "Indica 'items' o 'plan'."})
+        return data
 
 
 class ProductionLogSerializer(serializers.ModelSerializer):
@@ -48,4 +101,115 @@ class ProductionLogSerializer(serializers.ModelSerializer):
             'total_cost',
             'production_date'
         ]
-        read_only_fields = fields # Este serializer es solo para lectura
\ No newline at end of file
+        read_only_fields = fields # Este serializer es solo para lectura
+
+
+class ProductionJobSerializer(serializers.ModelSerializer):
+    """
+    Serializer de lectura de una producción encolada: su estado y, al terminar,
+    los registros de producción creados o el motivo del fallo.
+    """
+    production_logs = ProductionLogSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = ProductionJob
+        fields = [
+            'id',
+            'status',
+            'items',
+            'error',
+            'production_logs',
+            'created_at',
+            'finished_at'
+        ]
+        read_only_fields = fields
+
+
+class SeriesDownsamplingQuerySerializer(serializers.Serializer):
+    """Valida `?max_points=` de los endpoints de series (reducción con LTTB)."""
+    max_points = serializers.IntegerField(min_value=3, max_value=MAX_PERIODS, required=False)
+
+
+class ConsumptionReportQuerySerializer(serializers.Serializer):
+    """Valida los parámetros (query string) del reporte de consumos."""
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, data):
+        if data.get('date_from') and data.get('date_to') and data['date_from'] > data['date_to']:
+            raise serializers.ValidationError({"date_to": "La fecha final no puede ser anterior a la inicial."})
+        return data
+
+
+class ProductionSeriesQuerySerializer(ConsumptionReportQuerySerializer, SeriesDownsamplingQuerySerializer):
+    """
+    Valida los parámetros (query string) de las series de producción:
+    ?products=1,2,3&granularity=day|week|month&date_from=&date_to=&max_points=
+    """
+    products = serializers.CharField()
+    granularity = serializers.ChoiceField(choices=GRANULARITIES, default=MONTH)
+
+    def validate_products(self, value):
+        """
+        Convierte la lista separada por comas en productos de la empresa, con una sola
+        consulta y en el orden recibido.
+        """
+        try:
+            requested_ids = list(dict.fromkeys(int(part) for part in value.split(',') if part.strip()))
+        except ValueError:
+            raise serializers.ValidationError("Usa una lista de IDs separados por comas (ej: '1,2,3').")
+        if not requested_ids:
+            raise serializers.ValidationError("Indica al menos un producto.")
+        tenant = self.context['request'].user.tenant
+        products = Product.objects.filter(tenant=tenant, id__in=requested_ids).only('id', 'name').in_bulk()
+        missing_ids = [product_id for product_id in requested_ids if product_id not in products]
+        if missing_ids:
+            raise serializers.ValidationError(
+                f"Productos no encontrados o que no pertenecen a tu empresa: {missing_ids}."
+            )
+        return [products[product_id] for product_id in requested_ids]
+
+
+class ProductionConsumptionSerializer(serializers.ModelSerializer):
+    """
+    Serializer de lectura de una línea del libro de consumos: qué lote se usó en
+    una producción, cuánto y a qué costo.
+    """
+    raw_material_name = serializers.CharField(source='raw_material.name', read_only=True)
+    purchase_date = serializers.DateField(source='purchase_batch.purchase_date', read_only=True)
+    cost = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ProductionConsumption
+        fields = [
+            'purchase_batch',
+            'purchase_date',
+            'raw_material',
+            'raw_material_name',
+            'quantity',
+            'unit_cost',
+            'cost'
+        ]
+        read_only_fields = fields
+
+    def get_cost(self, obj):
+        return f"{(obj.quantity * obj.unit_cost).quantize(Decimal('0.01')):.2f}"
+
+
+class RecostSerializer(serializers.Serializer):
+    """
+    Valida los parámetros del recálculo retroactivo de costos de producción.
+    """
+    raw_material_ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    since = serializers.DateField(required=False)
+    dry_run = serializers.BooleanField(required=False, default=False)
+
+    def validate_raw_material_ids(self, value):
+        tenant = self.context['request'].user.tenant
+        found = set(RawMaterial.objects.filter(tenant=tenant, id__in=value).values_list('id', flat=True))
+        missing = sorted(set(value) - found)
+        if missing:
+            raise serializers.ValidationError(
+                f"Materias primas no encontradas o que no pertenecen a tu empresa: {missing}."
+            )
+        return value
@@ -1,12 +1,23 @@
 # production/services.py
 
+import random
+import time
 from decimal import Decimal
+from django.conf import settings
 from django.db import transaction
+from django.db.models import Case, F, Value, When
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 
 from products.models import Product
-from inventory.models import PurchaseBatch
-from .models import ProductionLog
+from products.services import ensure_flattened_boms, flattened_recipe
+from tenants.models import Tenant
+from inventory.models import RawMaterial, PurchaseBatch
+from .allocation import Consumption, StockConflict, consume_stock
+from .locking import OPTIMISTIC, ROWS, lock_raw_materials, locking_mode
+from .strategies import FIFO, strategy_for
+from .models import ProductionLog, ProductionConsumption
+from .rollups import record_productions
 
 
 class InsufficientStockError(Exception):
@@ -17,99 +28,340 @@ class InsufficientStockError(Exception):
         self.details = details
 
 
-@transaction.atomic
-def register_production_batch(user, product_id, quantity_to_produce: Decimal):
+def fifo_open_batches(tenant, raw_material_ids):
+    """
+    Lotes con stock de las materias primas indicadas, en orden FIFO.
+
+    El filtro y el orden coinciden con el índice parcial `purchasebatch_fifo_open_idx`,
+    de modo que el coste de la búsqueda no crece con el número de lotes agotados.
+    Para otras estrategias, ver production/strategies.py.
+    """
+    return FIFO.open_batches(tenant, raw_material_ids)
+
+
+def _split_consumptions(consumptions, item_requirements):
+    """
+    Reparte el consumo total entre las producciones: cada una toma, en orden,
+    la siguiente porción del flujo de lotes de cada materia prima. El resultado es el
+    mismo que si cada producción se hubiera registrado por separado, una tras otra.
+
+    :param consumptions: Dict {raw_material_id: [Consumption, ...]} en orden de consumo.
+    :param item_requirements: Lista de dicts {raw_material_id: cantidad} por producción.
+    :return: Lista (una por producción) de listas de Consumption.
+    """
+    streams = {rm_id: [list(c) for c in stream] for rm_id, stream in consumptions.items()}
+    positions = dict.fromkeys(streams, 0)
+    result = []
+    for requirements in item_requirements:
+        consumed = []
+        for rm_id, quantity_needed in requirements.items():
+            remaining = quantity_needed
+            stream = streams[rm_id]
+            while remaining > 0:
+                entry = stream[positions[rm_id]]
+                amount = min(remaining, entry[2])
+                consumed.append(Consumption(entry[0], rm_id, amount, entry[3]))
+                entry[2] -= amount
+                remaining -= amount
+                if entry[2] <= 0:
+                    positions[rm_id] += 1
+        result.append(consumed)
+    return result
+
+
+def _insufficient_stock_error(shortages):
+    """
+    Construye la excepción de stock insuficiente a partir de la lista de faltantes.
+
+    Los campos de la primera falta se exponen también en el nivel superior para
+    mantener el formato que ya consume el frontend.
+    """
+    names = ", ".join(s["missing_raw_material"]["name"] for s in shortages)
+    if len(shortages) == 1:
+        detail = f"No hay suficiente stock para la materia prima '{names}'."
+    else:
+        detail = f"No hay suficiente stock para las materias primas: {names}."
+    return InsufficientStockError(
+        message=f"Stock insuficiente para: {names}.",
+        details={
+            "error_code": "INSUFFICIENT_STOCK",
+            "detail": detail,
+            **shortages[0],
+            "shortages": shortages
+        }
+    )
+
+
+def sum_requirements(products, items):
+    """
+    Calcula las materias primas que necesita cada producción y su total por materia prima.
+
+    Usa la lista de materiales aplanada de cada producto, así que los sub-ensambles
+    se traducen a sus materias primas. Cada requerimiento se redondea a la precisión
+    con la que se guardan los lotes (2 decimales). Lo usan el registro de producción
+    y la evaluación de planes.
+
+    :param products: Dict {product_id: Product} con la lista de materiales aplanada
+                     ya calculada (ver `load_products`).
+    :param items: Lista de tuplas (product_id, quantity_to_produce: Decimal).
+    :return: Tupla (total_required, item_requirements): dict {raw_material_id: Decimal}
+             y lista (una por producción) de dicts {raw_material_id: Decimal}.
+    """
+    total_required = {}
+    item_requirements = []
+    for product_id, quantity_to_produce in items:
+        requirements = {}
+        for rm_id, quantity in flattened_recipe(products[product_id]).items():
+            requirements[rm_id] = (quantity * quantity_to_produce).quantize(Decimal('0.01'))
+            total_required[rm_id] = total_required.get(rm_id, Decimal('0.0')) + requirements[rm_id]
+        item_requirements.append(requirements)
+    return total_required, item_requirements
+
+
+def load_products(tenant, product_ids, save_boms=True, products=None):
+    """
+    Carga los productos indicados con su lista de materiales aplanada (una consulta si
+    está en caché) y valida que todos existan, pertenezcan a la empresa y tengan receta.
+
+    :param save_boms: Si es False, las listas recalculadas no se guardan en caché.
+    :param products: (Opcional) Dict {product_id: Product} ya cargados y validados para
+                     la empresa (p. ej. por el serializer), para no volver a consultarlos.
+    :return: Dict {product_id: Product}.
+    :raises ValueError: Si algún producto no existe o no tiene receta.
+    """
+    product_ids = set(product_ids)
+    if products is None:
+        products = Product.objects.filter(tenant=tenant, id__in=product_ids)
+    else:
+        products = products.values()
+    products = {product.id: product for product in products if product.id in product_ids}
+
+    missing_ids = sorted(product_ids - products.keys())
+    if missing_ids:
+        raise ValueError(f"Productos no encontrados o que no pertenecen a tu empresa: {missing_ids}.")
+
+    boms = ensure_flattened_boms(products.values(), save=save_boms)
+    without_recipe = sorted(p.name for p in products.values() if not boms[p.id])
+    if without_recipe:
+        raise ValueError(
+            f"Los siguientes productos no tienen una receta definida y no pueden ser producidos: "
+            f"{', '.join(without_recipe)}."
+        )
+    return products
+
+
+def _produce(tenant, products, items, locking=ROWS):
+    """
+    Núcleo compartido por el registro individual y el masivo. Debe ejecutarse
+    dentro de una transacción (ver `_produce_atomically`).
+
+    El número de consultas es constante, sin importar cuántos ingredientes o lotes
+    intervengan: un bloqueo de materias primas; un UPDATE relativo de los contadores
+    de stock; el descuento de los lotes, por cada estrategia involucrada (ver
+    production/allocation.py); un UPDATE relativo de productos, un `bulk_create` de registros, otro del
+    libro de consumos y un upsert de los resúmenes diarios.
+
+    El descuento de los lotes depende del motor:
+
+    - `window`: en PostgreSQL, un único `UPDATE ... FROM ... RETURNING`; en SQLite, un
+      SELECT con la CTE de asignación y luego el `UPDATE ... FROM` (la CTE se calcula
+      dos veces).
+    - `python`: un `SELECT ... FOR UPDATE` de los lotes con stock y un UPDATE relativo.
+    - modo optimista: un SELECT de los lotes y un UPDATE condicional.
+
+    :param tenant: Empresa sobre la que se opera.
+    :param products: Dict {product_id: Product} con las recetas ya precargadas.
+    :param items: Lista de tuplas (product_id, quantity_to_produce: Decimal).
+    :param locking: Modo de bloqueo efectivo (ver production/locking.py).
+    :return: Lista de ProductionLog creados, en el mismo orden que `items`.
+    :raises StockConflict: En modo optimista, si otro proceso consumió el stock leído.
+    """
+    # 1. Requerimientos por producción y totales por materia prima
+    total_required, item_requirements = sum_requirements(products, items)
+
+    # 2. **CRÍTICO**: Bloqueamos las materias primas (siempre en orden de id para evitar
+    # deadlocks; con filas o advisory locks, ver production/locking.py) y verificamos el
+    # stock contra su contador desnormalizado: O(1) por materia prima, sin sumar lotes.
+    # Se reportan TODAS las faltas antes de tocar nada.
+    raw_materials = lock_raw_materials(tenant, total_required.keys(), locking)
+    shortages = []
+    for rm_id in sorted(total_required):
+        raw_material = raw_materials[rm_id]
+        if raw_material.total_stock < total_required[rm_id]:
+            shortages.append({
+                "missing_raw_material": {"id": raw_material.id, "name": raw_material.name},
+                "quantity_required": f"{total_required[rm_id]:.2f}",
+                "quantity_available": f"{raw_material.total_stock:.2f}"
+            })
+    if shortages:
+        raise _insufficient_stock_error(shortages)
+
+    # 3. Descuento de todas las necesidades a la vez, en el orden de la estrategia de
+    # cada materia prima: FIFO, FEFO o LIFO (ver production/allocation.py y strategies.py).
+    # El contador de stock se escribe ANTES que los lotes, en todos los modos: es el mismo
+    # orden que `PurchaseBatch.save()`/`delete()` (materia prima y luego lote), así que
+    # editar un lote durante una producción no puede producir un deadlock. El UPDATE es
+    # relativo (en los modos advisory y optimista la fila no estaba bloqueada) y, si los
+    # lotes no cubren el descuento, la transacción se revierte entera.
+    RawMaterial.adjust_total_stock({rm_id: -quantity for rm_id, quantity in total_required.items()})
+    strategies = {rm_id: strategy_for(tenant, rm) for rm_id, rm in raw_materials.items()}
+    consumptions = consume_stock(tenant, total_required, strategies, locking)
+    for rm_id, quantity_needed in total_required.items():
+        consumed_total = sum((c.quantity for c in consumptions.get(rm_id, [])), Decimal('0.0'))
+        if consumed_total != quantity_needed:
+            # El contador no coincidía con los lotes: abortamos en lugar de producir con stock fantasma.
+            raw_material = raw_materials[rm_id]
+            raise _insufficient_stock_error([{
+                "missing_raw_material": {"id": raw_material.id, "name": raw_material.name},
+                "quantity_required": f"{quantity_needed:.2f}",
+                "quantity_available": f"{consumed_total:.2f}"
+            }])
+
+    # 4. Costo de cada producción: se reparte el consumo entre las producciones, en el
+    # orden recibido, y se valora con el costo de cada lote (FIFO) o, con costo promedio,
+    # con el promedio de cada materia prima (ya está en la fila bloqueada).
+    item_consumptions = _split_consumptions(consumptions, item_requirements)
+    if tenant.costing_method == Tenant.CostingMethod.AVERAGE:
+        item_consumptions = [
+            [c._replace(unit_cost=raw_materials[c.raw_material_id].average_unit_cost) for c in consumed]
+            for consumed in item_consumptions
+        ]
+    item_costs = [
+        sum((c.quantity * c.unit_cost for c in consumed), Decimal('0.0'))
+        for consumed in item_consumptions
+    ]
+
+    production_logs = []
+    for (product_id, quantity_to_produce), total_production_cost in zip(items, item_costs):
+        product = products[product_id]
+        product.stock += quantity_to_produce
+        production_logs.append(ProductionLog(
+            tenant=tenant,
+            product=product,
+            quantity_produced=quantity_to_produce,
+            total_cost=total_production_cost.quantize(Decimal('0.01'))
+        ))
+
+    # 5. Persistir en bloque. El stock de los productos se actualiza con un UPDATE
+    # relativo, en la misma transacción que los lotes: en los modos advisory y optimista
+    # sus filas no están bloqueadas.
+    produced = {}
+    for product_id, quantity_to_produce in items:
+        produced[product_id] = produced.get(product_id, Decimal('0.0')) + quantity_to_produce
+    Product.objects.filter(pk__in=produced).update(
+        stock=F('stock') + Case(*[When(pk=pk, then=Value(qty)) for pk, qty in produced.items()],
+                                output_field=Product._meta.get_field('stock')),
+        updated_at=timezone.now()
+    )
+    production_logs = ProductionLog.objects.bulk_create(production_logs)
+
+    # 6. Libro de consumos: qué lotes entraron en cada producción, en un solo INSERT.
+    ProductionConsumption.objects.bulk_create([
+        ProductionConsumption(
+            tenant=tenant,
+            production_log=production_log,
+            purchase_batch_id=c.batch_id,
+            raw_material_id=c.raw_material_id,
+            production_date=production_log.production_date,
+            quantity=c.quantity,
+            unit_cost=c.unit_cost
+        )
+        for production_log, consumed in zip(production_logs, item_consumptions)
+        for c in consumed
+    ])
+
+    # 7. Resúmenes diarios por producto (gráficos), en un solo upsert.
+    record_productions(tenant, production_logs)
+    return production_logs
+
+
+def _produce_atomically(tenant, products, items):
+    """
+    Ejecuta `_produce` en una transacción según `settings.PRODUCTION_LOCKING`.
+
+    En modo optimista, si otro proceso consumió el stock leído, se reintenta toda la
+    asignación (hasta `PRODUCTION_OPTIMISTIC_RETRIES` veces, con espera exponencial
+    con jitter) y, agotados los reintentos, se registra con bloqueo de filas.
+    """
+    locking = locking_mode()
+    if locking == OPTIMISTIC:
+        for attempt in range(getattr(settings, 'PRODUCTION_OPTIMISTIC_RETRIES', 3)):
+            try:
+                with transaction.atomic():
+                    return _produce(tenant, products, items, OPTIMISTIC)
+            except StockConflict:
+                time.sleep(random.uniform(0, min(0.2, 0.005 * 2 ** attempt)))
+        locking = ROWS
+    with transaction.atomic():
+        return _produce(tenant, products, items, locking)
+
+
+def register_production_batch(user, product_id, quantity_to_produce: Decimal, product=None):
     """
     Servicio principal para registrar un lote de producción. Es una operación atómica.
 
-    1. Valida que el producto y su receta existan.
+    1. Valida que el producto y su receta existan (la receta aplanada, con sus
+       sub-ensambles ya resueltos, viene en caché con el producto).
     2. Calcula las materias primas totales necesarias.
-    3. Bloquea las filas de los lotes de compra para evitar race conditions.
-    4. Verifica si hay stock suficiente para CADA materia prima.
-    5. Si hay stock, descuenta las cantidades de los lotes (FIFO) y calcula el costo.
-    6. Si todo tiene éxito, incrementa el stock del producto y crea el registro de producción.
+    3. Bloquea las materias primas para evitar race conditions. Con el motor `python`
+       también bloquea los lotes con stock; con `window`, los lotes solo se bloquean
+       al descontarlos. En modo optimista no bloquea: descuenta con UPDATE condicionales
+       y reintenta.
+    4. Verifica si hay stock suficiente para CADA materia prima (contador `total_stock`).
+    5. Si hay stock, descuenta las cantidades de los lotes (FIFO, FEFO o LIFO) y calcula el costo.
+    6. Si todo tiene éxito, incrementa el stock del producto, crea el registro de producción,
+       anota en el libro de consumos cada lote usado (`ProductionConsumption`) y suma la
+       producción al resumen diario del producto (`ProductionRollup`).
     7. Si falla en cualquier punto, toda la transacción se revierte.
 
+    El número de consultas no depende del tamaño de la receta ni de los lotes consumidos.
+
     :param user: El usuario que realiza la operación (para obtener el tenant).
     :param product_id: ID del producto a fabricar.
     :param quantity_to_produce: Cantidad (Decimal) del producto a fabricar.
+    :param product: (Opcional) El producto ya cargado y validado para la empresa (p. ej.
+                    por el serializer), para no volver a consultarlo.
     :return: La instancia del ProductionLog creado.
     :raises ValueError: Si el producto no tiene receta.
     :raises InsufficientStockError: Si no hay suficiente stock de alguna materia prima.
     """
     tenant = user.tenant
-    product = get_object_or_404(Product.objects.select_related('tenant'), id=product_id, tenant=tenant)
-    recipe_ingredients = product.recipe_ingredients.select_related('raw_material').all()
+    if product is None:
+        product = get_object_or_404(Product, id=product_id, tenant=tenant)
 
-    if not recipe_ingredients.exists():
+    if not ensure_flattened_boms([product])[product.id]:
         raise ValueError(f"El producto '{product.name}' no tiene una receta definida y no puede ser producido.")
 
-    # 1. Calcular los requerimientos totales de materias primas
-    required_materials = {}
-    for item in recipe_ingredients:
-        required_materials[item.raw_material.id] = {
-            'raw_material': item.raw_material,
-            'quantity_needed': item.quantity * quantity_to_produce
-        }
+    production_log, = _produce_atomically(tenant, {product.id: product}, [(product.id, quantity_to_produce)])
+    return production_log
 
-    total_production_cost = Decimal('0.0')
 
-    # 2. Verificar stock y descontar para cada materia prima
-    for rm_id, requirement in required_materials.items():
-        raw_material = requirement['raw_material']
-        quantity_needed = requirement['quantity_needed']
+def register_production_batches(user, items, products=None):
+    """
+    Registra varias producciones en una sola operación atómica (todo o nada).
 
-        # **CRÍTICO**: Bloqueamos los lotes relevantes para esta transacción.
-        # Esto previene que otra petición simultánea modifique el stock mientras calculamos.
-        available_batches = PurchaseBatch.objects.select_for_update().filter(
-            tenant=tenant,
-            raw_material=raw_material,
-            quantity_remaining__gt=0
-        ).order_by('purchase_date')  # Orden FIFO
-
-        total_available = sum(batch.quantity_remaining for batch in available_batches)
-
-        if total_available < quantity_needed:
-            # Lanzamos la excepción con los detalles para la respuesta de la API
-            raise InsufficientStockError(
-                message=f"Stock insuficiente para '{raw_material.name}'.",
-                details={
-                    "error_code": "INSUFFICIENT_STOCK",
-                    "detail": f"No hay suficiente stock para la materia prima '{raw_material.name}'.",
-                    "missing_raw_material": {"id": raw_material.id, "name": raw_material.name},
-                    "quantity_required": f"{quantity_needed:.2f}",
-                    "quantity_available": f"{total_available:.2f}"
-                }
-            )
-
-        # 3. Lógica de descuento FIFO y cálculo de costos
-        cost_for_this_material = Decimal('0.0')
-        remaining_to_deduct = quantity_needed
-        for batch in available_batches:
-            if remaining_to_deduct <= 0:
-                break
-
-            cost_per_unit = batch.total_cost / batch.quantity if batch.quantity > 0 else Decimal('0.0')
-
-            amount_to_take = min(remaining_to_deduct, batch.quantity_remaining)
-
-            batch.quantity_remaining -= amount_to_take
-            cost_for_this_material += amount_to_take * cost_per_unit
-            remaining_to_deduct -= amount_to_take
-
-            batch.save()
-
-        total_production_cost += cost_for_this_material
-
-    # 4. Finalizar la producción si todo fue exitoso
-    product.stock += quantity_to_produce
-    product.save()
-
-    production_log = ProductionLog.objects.create(
-        tenant=tenant,
-        product=product,
-        quantity_produced=quantity_to_produce,
-        total_cost=total_production_cost.quantize(Decimal('0.01'))
-    )
+    A diferencia de llamar a `register_production_batch` en un bucle, las materias
+    primas afectadas se bloquean UNA sola vez:
 
-    return production_log
\ No newline at end of file
+    1. Carga todos los productos y sus recetas aplanadas (en caché) en una consulta.
+    2. Suma los requerimientos de materias primas de todas las producciones.
+    3. Bloquea esas materias primas en una única consulta, siempre en orden de id
+       (según `PRODUCTION_LOCKING`; ver production/locking.py). Con el motor
+       `python` también bloquea sus lotes con stock en otra consulta.
+    4. Si falta stock, reporta TODAS las materias primas insuficientes a la vez.
+    5. Descuenta de los lotes según la estrategia de cada materia prima (FIFO, FEFO
+       o LIFO), en el orden de las producciones recibidas (con el motor `window`, un
+       `UPDATE ... FROM` calculado en la base de datos; con el motor `python`, un
+       UPDATE relativo), y persiste los registros con `bulk_create`.
+
+    :param user: El usuario que realiza la operación (para obtener el tenant).
+    :param items: Lista de tuplas (product_id, quantity_to_produce: Decimal).
+    :param products: (Opcional) Dict {product_id: Product} ya cargados y validados para
+                     la empresa (p. ej. por el serializer), para no volver a consultarlos.
+    :return: Lista de instancias ProductionLog creadas, en el mismo orden que `items`.
+    :raises ValueError: Si algún producto no existe o no tiene receta.
+    :raises InsufficientStockError: Si no hay suficiente stock de alguna materia prima.
+    """
+    tenant = user.tenant
+    products = load_products(tenant, [product_id for product_id, _ in items], products=products)
+    return _produce_atomically(tenant, products, items)
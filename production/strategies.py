@@ -0,0 +1,134 @@
+# production/strategies.py
+"""
+Estrategias de consumo de lotes: definen en qué orden la producción toma el
+stock de los lotes de compra de una materia prima.
+
+- FIFO: primero los lotes más antiguos (fecha de compra, id).
+- FEFO: primero los que vencen antes; los lotes sin vencimiento, al final.
+- LIFO: primero los lotes más recientes.
+
+Cada estrategia expone el mismo orden en tres formas (ORM, SQL y clave de orden
+en Python) para que los motores de asignación de production/allocation.py y la
+evaluación de planes en memoria (production/planning.py) se comporten igual, y
+ese orden coincide con un índice parcial de PurchaseBatch:
+`purchasebatch_fifo_open_idx` para FIFO y LIFO, y `purchasebatch_fefo_open_idx`
+para FEFO.
+
+LIFO recorre el índice FIFO hacia atrás. Para eso su consulta invierte TODAS las
+columnas, incluida la materia prima (`-raw_material_id, -purchase_date, -id`).
+Con direcciones mezcladas (materia prima ascendente y fecha descendente), una
+búsqueda de varias materias primas necesitaría ordenar aparte. El orden entre
+materias primas no afecta a la asignación, que es independiente por materia prima.
+
+El índice de FEFO es ascendente. En PostgreSQL sus NULL ya quedan al final
+(`NULLS LAST`). SQLite los guarda al principio del índice, aunque su
+planificador igual resuelve `NULLS LAST` sobre él sin ordenar aparte; el test de
+EXPLAIN lo comprueba.
+
+La estrategia se elige por materia prima (`RawMaterial.allocation_strategy`) o,
+si esta no la define, por empresa (`Tenant.allocation_strategy`).
+"""
+
+from datetime import date
+
+from django.db.models import F
+
+from inventory.models import PurchaseBatch
+from tenants.models import Tenant
+
+
+class AllocationStrategy:
+    """Orden de consumo de los lotes con stock de una materia prima."""
+
+    code = None
+    index_name = None
+    # Si `sort_key` debe aplicarse en orden inverso. En ese caso `open_batches` también
+    # invierte la materia prima, para recorrer el índice hacia atrás sin ordenar aparte.
+    descending = False
+
+    def order_by(self):
+        """Criterios de orden para el ORM, después de agrupar por materia prima."""
+        raise NotImplementedError
+
+    def sql_order(self, alias):
+        """Mismo orden como fragmento SQL, para `OVER (... ORDER BY ...)`."""
+        raise NotImplementedError
+
+    def sort_key(self, batch):
+        """Mismo orden como clave de `sorted()`, para lotes ya cargados en memoria."""
+        raise NotImplementedError
+
+    def sort_batches(self, batches):
+        """Ordena en memoria lotes de una misma materia prima."""
+        return sorted(batches, key=self.sort_key, reverse=self.descending)
+
+    def open_batches(self, tenant, raw_material_ids):
+        """
+        Lotes con stock de las materias primas indicadas, en el orden de la estrategia.
+
+        El filtro coincide con la condición de los índices parciales, de modo que el
+        coste de la búsqueda no crece con el número de lotes agotados.
+        """
+        return PurchaseBatch.objects.filter(
+            tenant=tenant,
+            raw_material_id__in=raw_material_ids,
+            quantity_remaining__gt=0
+        ).order_by('-raw_material_id' if self.descending else 'raw_material_id', *self.order_by())
+
+
+class FifoStrategy(AllocationStrategy):
+    code = Tenant.AllocationStrategy.FIFO
+    index_name = 'purchasebatch_fifo_open_idx'
+
+    def order_by(self):
+        return ['purchase_date', 'id']
+
+    def sql_order(self, alias):
+        return f"{alias}.purchase_date, {alias}.id"
+
+    def sort_key(self, batch):
+        return batch.purchase_date, batch.id
+
+
+class FefoStrategy(AllocationStrategy):
+    code = Tenant.AllocationStrategy.FEFO
+    index_name = 'purchasebatch_fefo_open_idx'
+
+    def order_by(self):
+        return [F('expiry_date').asc(nulls_last=True), 'purchase_date', 'id']
+
+    def sql_order(self, alias):
+        return f"{alias}.expiry_date ASC NULLS LAST, {alias}.purchase_date, {alias}.id"
+
+    def sort_key(self, batch):
+        return batch.expiry_date is None, batch.expiry_date or date.min, batch.purchase_date, batch.id
+
+
+class LifoStrategy(AllocationStrategy):
+    code = Tenant.AllocationStrategy.LIFO
+    index_name = 'purchasebatch_fifo_open_idx'
+    descending = True
+
+    def order_by(self):
+        return ['-purchase_date', '-id']
+
+    def sql_order(self, alias):
+        return f"{alias}.purchase_date DESC, {alias}.id DESC"
+
+    def sort_key(self, batch):
+        return batch.purchase_date, batch.id
+
+
+FIFO = FifoStrategy()
+STRATEGIES = {strategy.code: strategy for strategy in (FIFO, FefoStrategy(), LifoStrategy())}
+
+
+def strategy_for(tenant, raw_material):
+    """
+    Estrategia aplicable a una materia prima: la suya si la define, si no la de la empresa.
+
+    :param tenant: Empresa dueña de la materia prima.
+    :param raw_material: Instancia de RawMaterial.
+    :return: Instancia de AllocationStrategy.
+    """
+    return STRATEGIES[raw_material.allocation_strategy or tenant.allocation_strategy]
@@ -0,0 +1,81 @@
+# Fichero: production/tests/test_average_costing.py
+# Test Suite para el método de costeo por costo promedio ponderado.
+
+from decimal import Decimal
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.urls import reverse
+from users.models import User
+from tenants.models import Tenant
+from inventory.models import RawMaterial, PurchaseBatch
+from products.models import Product, RecipeIngredient
+from production.models import ProductionLog
+
+
+class AverageCostingTests(APITestCase):
+    """
+    Valida que el costo promedio se mantenga con cada lote y que, en modo 'average',
+    la producción se costee con él mientras las cantidades se siguen descontando en FIFO.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Tostadora Promedio")
+        self.user = User.objects.create_user(
+            email='user@promedio.com', password='password123', tenant=self.tenant,
+            first_name='Usuario', last_name='A'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.coffee = RawMaterial.objects.create(tenant=self.tenant, name="Café", unit_of_measure='kg')
+        # Lote 1: 10 kg a 10/kg. Lote 2: 10 kg a 20/kg. Promedio: 15/kg.
+        self.first = PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.coffee,
+                                                  purchase_date='2025-01-01', quantity=Decimal('10'),
+                                                  total_cost=Decimal('100'))
+        PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.coffee, purchase_date='2025-02-01',
+                                     quantity=Decimal('10'), total_cost=Decimal('200'))
+        self.product = Product.objects.create(tenant=self.tenant, name="Café Tostado")
+        RecipeIngredient.objects.create(product=self.product, raw_material=self.coffee, quantity=Decimal('1'))
+
+    def _average(self):
+        self.coffee.refresh_from_db()
+        return self.coffee.average_unit_cost
+
+    def test_average_follows_batch_create_edit_and_delete(self):
+        self.assertEqual(self._average(), Decimal('15.000000'))
+
+        # Corrección de costo del primer lote: 10 kg a 40/kg -> (400 + 200) / 20 = 30
+        self.first.total_cost = Decimal('400')
+        self.first.save()
+        self.assertEqual(self._average(), Decimal('30.000000'))
+
+        # Al borrar el lote queda solo el segundo (20/kg)
+        self.first.delete()
+        self.assertEqual(self._average(), Decimal('20.000000'))
+
+        response = self.client.get(reverse('raw-material-detail', kwargs={'pk': self.coffee.pk}))
+        self.assertEqual(Decimal(response.data['average_unit_cost']), Decimal('20'))
+
+    def test_production_uses_average_cost_and_fifo_quantities(self):
+        # Arrange
+        self.tenant.costing_method = Tenant.CostingMethod.AVERAGE
+        self.tenant.save()
+
+        # Act: 4 unidades consumen 4 kg -> FIFO costaría 40, promedio cuesta 60
+        response = self.client.post(reverse('production-log-list-create'),
+                                    {'product_id': self.product.id, 'quantity_produced': '4'}, format='json')
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(ProductionLog.objects.get().total_cost, Decimal('60.00'))
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.quantity_remaining, Decimal('6.00'))
+        # Consumir no cambia el promedio del stock restante
+        self.assertEqual(self._average(), Decimal('15.000000'))
+
+    def test_fifo_tenants_keep_batch_costs(self):
+        # Act
+        response = self.client.post(reverse('production-log-list-create'),
+                                    {'product_id': self.product.id, 'quantity_produced': '4'}, format='json')
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(ProductionLog.objects.get().total_cost, Decimal('40.00'))
@@ -0,0 +1,146 @@
+# Fichero: production/tests/test_bulk_production.py
+# Test Suite para el registro masivo de producciones (cierre de turno).
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from users.models import User
+from tenants.models import Tenant
+from inventory.models import RawMaterial, PurchaseBatch
+from products.models import Product, RecipeIngredient
+from production.models import ProductionLog
+from decimal import Decimal
+
+
+class BulkProductionRegistrationTests(APITestCase):
+    """
+    Valida que el endpoint masivo descuente FIFO entre varias producciones,
+    sea atómico y reporte todas las faltas de stock en una sola respuesta.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Taller Creativo")
+        self.user = User.objects.create_user(
+            email='taller@ejemplo.com', password='password123', tenant=self.tenant,
+            first_name='Usuario', last_name='Taller'
+        )
+        self.other_tenant = Tenant.objects.create(name="Otro Taller")
+        self.client.force_authenticate(user=self.user)
+
+        self.wood = RawMaterial.objects.create(tenant=self.tenant, name="Madera", unit_of_measure='m²')
+        self.screws = RawMaterial.objects.create(tenant=self.tenant, name="Tornillos", unit_of_measure='unidad')
+
+        # Dos lotes de madera: el más antiguo es más barato (FIFO debe usarlo primero).
+        self.old_wood = PurchaseBatch.objects.create(
+            tenant=self.tenant, raw_material=self.wood, purchase_date='2025-01-01',
+            quantity=Decimal('10'), total_cost=Decimal('100')
+        )
+        self.new_wood = PurchaseBatch.objects.create(
+            tenant=self.tenant, raw_material=self.wood, purchase_date='2025-02-01',
+            quantity=Decimal('10'), total_cost=Decimal('200')
+        )
+        self.screw_batch = PurchaseBatch.objects.create(
+            tenant=self.tenant, raw_material=self.screws, purchase_date='2025-01-15',
+            quantity=Decimal('100'), total_cost=Decimal('50')
+        )
+
+        self.chair = Product.objects.create(tenant=self.tenant, name="Silla")
+        RecipeIngredient.objects.create(product=self.chair, raw_material=self.wood, quantity=Decimal('2'))
+        RecipeIngredient.objects.create(product=self.chair, raw_material=self.screws, quantity=Decimal('10'))
+        self.table = Product.objects.create(tenant=self.tenant, name="Mesa")
+        RecipeIngredient.objects.create(product=self.table, raw_material=self.wood, quantity=Decimal('4'))
+
+        self.url = reverse('production-log-bulk-create')
+
+    def test_bulk_registration_deducts_fifo_across_items(self):
+        """
+        Tres sillas consumen 6 m² del lote antiguo; dos mesas consumen los 4 m²
+        restantes del lote antiguo y 4 m² del nuevo.
+        """
+        # Act
+        response = self.client.post(self.url, {'items': [
+            {'product_id': self.chair.id, 'quantity_produced': '3'},
+            {'product_id': self.table.id, 'quantity_produced': '2'},
+        ]}, format='json')
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 2)
+        # Silla: 6 m² x 10 + 30 tornillos x 0.5 = 75.00
+        self.assertEqual(Decimal(response.data[0]['total_cost']), Decimal('75.00'))
+        # Mesa: 4 m² x 10 + 4 m² x 20 = 120.00
+        self.assertEqual(Decimal(response.data[1]['total_cost']), Decimal('120.00'))
+
+        self.old_wood.refresh_from_db()
+        self.new_wood.refresh_from_db()
+        self.screw_batch.refresh_from_db()
+        self.assertEqual(self.old_wood.quantity_remaining, Decimal('0.00'))
+        self.assertEqual(self.new_wood.quantity_remaining, Decimal('6.00'))
+        self.assertEqual(self.screw_batch.quantity_remaining, Decimal('70.00'))
+
+        self.chair.refresh_from_db()
+        self.table.refresh_from_db()
+        self.assertEqual(self.chair.stock, Decimal('3.00'))
+        self.assertEqual(self.table.stock, Decimal('2.00'))
+        self.assertEqual(ProductionLog.objects.filter(tenant=self.tenant).count(), 2)
+
+    def test_products_are_loaded_once(self):
+        # Act
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {'items': [
+                {'product_id': self.chair.id, 'quantity_produced': '1'},
+                {'product_id': self.table.id, 'quantity_produced': '1'},
+            ]}, format='json')
+        product_selects = [q['sql'] for q in queries
+                           if q['sql'].startswith('SELECT') and 'FROM "products_product"' in q['sql']]
+
+        # Assert: el serializer los resuelve y el servicio los reutiliza
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(product_selects), 1)
+
+    def test_bulk_registration_reports_every_shortage_and_changes_nothing(self):
+        """
+        Si falta stock de varias materias primas, la respuesta las lista todas
+        y ningún lote ni producto se modifica (todo o nada).
+        """
+        # Act: 6 sillas necesitan 12 m² y 60 tornillos; 3 mesas otros 12 m² (24 > 20).
+        response = self.client.post(self.url, {'items': [
+            {'product_id': self.chair.id, 'quantity_produced': '6'},
+            {'product_id': self.table.id, 'quantity_produced': '3'},
+            {'product_id': self.chair.id, 'quantity_produced': '5'},
+        ]}, format='json')
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error_code'], 'INSUFFICIENT_STOCK')
+        shortages = {s['missing_raw_material']['id']: s for s in response.data['shortages']}
+        self.assertEqual(set(shortages), {self.wood.id, self.screws.id})
+        self.assertEqual(shortages[self.wood.id]['quantity_required'], '34.00')
+        self.assertEqual(shortages[self.wood.id]['quantity_available'], '20.00')
+        self.assertEqual(shortages[self.screws.id]['quantity_required'], '110.00')
+
+        self.old_wood.refresh_from_db()
+        self.screw_batch.refresh_from_db()
+        self.assertEqual(self.old_wood.quantity_remaining, Decimal('10.00'))
+        self.assertEqual(self.screw_batch.quantity_remaining, Decimal('100.00'))
+        self.assertFalse(ProductionLog.objects.exists())
+
+    def test_bulk_registration_rejects_products_from_other_tenant(self):
+        """
+        Un producto de otra empresa invalida toda la petición.
+        """
+        # Arrange
+        foreign_product = Product.objects.create(tenant=self.other_tenant, name="Silla Ajena")
+
+        # Act
+        response = self.client.post(self.url, {'items': [
+            {'product_id': self.chair.id, 'quantity_produced': '1'},
+            {'product_id': foreign_product.id, 'quantity_produced': '1'},
+        ]}, format='json')
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('items', response.data)
+        self.assertFalse(ProductionLog.objects.exists())
@@ -0,0 +1,127 @@
+# Fichero: production/tests/test_consumption_ledger.py
+# Test Suite para el libro de consumos (ProductionConsumption) y el reporte de costo de ventas.
+
+from datetime import timedelta
+from decimal import Decimal
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.urls import reverse
+from django.utils import timezone
+from users.models import User
+from tenants.models import Tenant
+from inventory.models import RawMaterial, PurchaseBatch
+from products.models import Product, RecipeIngredient
+from production.models import ProductionLog, ProductionConsumption
+from production.services import register_production_batch, register_production_batches
+
+
+class ConsumptionLedgerTests(APITestCase):
+    """
+    Valida que cada producción anote los lotes que consumió, que la suma del libro
+    coincida con el costo registrado y que el reporte agregue por materia prima y fecha.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Panadería Central")
+        self.user = User.objects.create_user(
+            email='user@central.com', password='password123', tenant=self.tenant,
+            first_name='Usuario', last_name='A'
+        )
+        self.other_tenant = Tenant.objects.create(name="Otra Panadería")
+        self.other_user = User.objects.create_user(
+            email='user@otra.com', password='password123', tenant=self.other_tenant,
+            first_name='Usuario', last_name='B'
+        )
+        self.client.force_authenticate(user=self.user)
+
+        # Harina: lote 1 de 5 kg a 2/kg y lote 2 de 10 kg a 3/kg. Sal: un lote de 10 kg a 1/kg.
+        self.flour = RawMaterial.objects.create(tenant=self.tenant, name="Harina", unit_of_measure='kg')
+        self.salt = RawMaterial.objects.create(tenant=self.tenant, name="Sal", unit_of_measure='kg')
+        self.flour_old = PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.flour,
+                                                      purchase_date='2025-01-01', quantity=Decimal('5'),
+                                                      total_cost=Decimal('10'))
+        self.flour_new = PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.flour,
+                                                      purchase_date='2025-02-01', quantity=Decimal('10'),
+                                                      total_cost=Decimal('30'))
+        self.salt_batch = PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.salt,
+                                                       purchase_date='2025-01-01', quantity=Decimal('10'),
+                                                       total_cost=Decimal('10'))
+        self.bread = Product.objects.create(tenant=self.tenant, name="Pan")
+        RecipeIngredient.objects.create(product=self.bread, raw_material=self.flour, quantity=Decimal('2'))
+        RecipeIngredient.objects.create(product=self.bread, raw_material=self.salt, quantity=Decimal('0.5'))
+
+    def test_production_records_consumed_batches(self):
+        # Act: 4 panes = 8 kg de harina (5 del lote viejo + 3 del nuevo) y 2 kg de sal
+        production_log = register_production_batch(self.user, self.bread.id, Decimal('4'))
+
+        # Assert
+        lines = sorted(
+            (c.purchase_batch_id, c.quantity, c.unit_cost) for c in production_log.consumptions.all()
+        )
+        self.assertEqual(lines, sorted([
+            (self.flour_old.id, Decimal('5.00'), Decimal('2')),
+            (self.flour_new.id, Decimal('3.00'), Decimal('3')),
+            (self.salt_batch.id, Decimal('2.00'), Decimal('1')),
+        ]))
+        ledger_cost = sum(c.quantity * c.unit_cost for c in production_log.consumptions.all())
+        self.assertEqual(ledger_cost, production_log.total_cost)
+
+    def test_bulk_production_splits_ledger_per_log(self):
+        # Act: dos producciones en una operación; la segunda empieza donde terminó la primera
+        first, second = register_production_batches(
+            self.user, [(self.bread.id, Decimal('2')), (self.bread.id, Decimal('2'))]
+        )
+
+        # Assert
+        flour_lines = lambda log: [(c.purchase_batch_id, c.quantity) for c in
+                                   log.consumptions.filter(raw_material=self.flour).order_by('id')]
+        self.assertEqual(flour_lines(first), [(self.flour_old.id, Decimal('4.00'))])
+        self.assertEqual(flour_lines(second), [(self.flour_old.id, Decimal('1.00')),
+                                               (self.flour_new.id, Decimal('3.00'))])
+
+    def test_log_consumptions_endpoint_is_tenant_isolated(self):
+        # Arrange
+        production_log = register_production_batch(self.user, self.bread.id, Decimal('1'))
+        url = reverse('production-log-consumptions', args=[production_log.id])
+
+        # Act
+        response = self.client.get(url)
+        self.client.force_authenticate(user=self.other_user)
+        other_response = self.client.get(url)
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(line['raw_material_name'], line['cost']) for line in response.data],
+                         [("Harina", "4.00"), ("Sal", "0.50")])
+        self.assertEqual(other_response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_consumption_report_aggregates_by_material_and_date(self):
+        # Arrange: una producción de hoy y otra movida a hace 40 días
+        register_production_batch(self.user, self.bread.id, Decimal('1'))
+        old_log = register_production_batch(self.user, self.bread.id, Decimal('3'))
+        old_date = timezone.now() - timedelta(days=40)
+        ProductionLog.objects.filter(id=old_log.id).update(production_date=old_date)
+        ProductionConsumption.objects.filter(production_log=old_log).update(production_date=old_date)
+        today = timezone.localdate()
+
+        # Act
+        response = self.client.get(reverse('production-consumption-report'), {
+            'date_from': (today - timedelta(days=7)).isoformat(), 'date_to': today.isoformat()
+        })
+        full_response = self.client.get(reverse('production-consumption-report'))
+
+        # Assert: solo la producción de hoy (2 kg de harina a 2/kg y 0.5 kg de sal a 1/kg)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_cost'], "4.50")
+        self.assertEqual([(m['raw_material']['name'], m['quantity'], m['cost']) for m in response.data['materials']],
+                         [("Harina", "2.00", "4.00"), ("Sal", "0.50", "0.50")])
+        # Sin rango: 8 kg de harina (5 × 2 + 3 × 3) y 2 kg de sal
+        self.assertEqual(full_response.data['total_cost'], "21.00")
+
+    def test_consumption_report_rejects_inverted_range(self):
+        # Act
+        response = self.client.get(reverse('production-consumption-report'),
+                                   {'date_from': '2025-02-01', 'date_to': '2025-01-01'})
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,147 @@
+# Fichero: production/tests/test_fifo_allocation.py
+# Test Suite para los motores de asignación (funciones de ventana vs. Python) y sus estrategias.
+
+from unittest import skipUnless
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from tenants.models import Tenant
+from inventory.models import RawMaterial, PurchaseBatch
+from production.allocation import consume_stock, supports_window_allocation
+from production.strategies import STRATEGIES, strategy_for
+from decimal import Decimal
+
+
+class FifoAllocationEngineTests(TestCase):
+    """
+    Ambos motores deben tomar exactamente las mismas cantidades de los mismos
+    lotes, en orden FIFO, y dejar el mismo stock restante.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Taller Creativo")
+        self.other_tenant = Tenant.objects.create(name="Otro Taller")
+        self.wood = RawMaterial.objects.create(tenant=self.tenant, name="Madera", unit_of_measure='m²')
+        self.varnish = RawMaterial.objects.create(tenant=self.tenant, name="Barniz", unit_of_measure='litro')
+
+        # Madera: dos lotes del mismo día (desempata el id) y uno posterior.
+        self.wood_a = self._batch(self.wood, '2025-01-01', '3.50', '35.00')
+        self.wood_b = self._batch(self.wood, '2025-01-01', '2.00', '30.00')
+        self.wood_c = self._batch(self.wood, '2025-02-01', '10.00', '200.00')
+        # Barniz: un lote agotado (debe ignorarse) y uno abierto.
+        self.varnish_empty = self._batch(self.varnish, '2024-12-01', '5.00', '50.00')
+        PurchaseBatch.objects.filter(pk=self.varnish_empty.pk).update(quantity_remaining=Decimal('0'))
+        self.varnish_open = self._batch(self.varnish, '2025-03-01', '4.00', '48.00')
+
+    def _batch(self, material, purchase_date, quantity, total_cost):
+        return PurchaseBatch.objects.create(
+            tenant=self.tenant, raw_material=material, purchase_date=purchase_date,
+            quantity=Decimal(quantity), total_cost=Decimal(total_cost)
+        )
+
+    def _run(self):
+        consumptions = consume_stock(self.tenant, {self.wood.id: Decimal('6.25'), self.varnish.id: Decimal('1.75')})
+        remaining = dict(PurchaseBatch.objects.values_list('id', 'quantity_remaining'))
+        return consumptions, remaining
+
+    def _assert_expected(self, consumptions, remaining):
+        wood = [(c.batch_id, c.quantity) for c in consumptions[self.wood.id]]
+        self.assertEqual(wood, [
+            (self.wood_a.id, Decimal('3.50')), (self.wood_b.id, Decimal('2.00')), (self.wood_c.id, Decimal('0.75'))
+        ])
+        self.assertEqual(consumptions[self.varnish.id][0].unit_cost, Decimal('12'))
+        self.assertEqual([(c.batch_id, c.quantity) for c in consumptions[self.varnish.id]],
+                         [(self.varnish_open.id, Decimal('1.75'))])
+        self.assertEqual(remaining[self.wood_a.id], Decimal('0.00'))
+        self.assertEqual(remaining[self.wood_c.id], Decimal('9.25'))
+        self.assertEqual(remaining[self.varnish_empty.id], Decimal('0.00'))
+        self.assertEqual(remaining[self.varnish_open.id], Decimal('2.25'))
+
+    @override_settings(PRODUCTION_FIFO_ENGINE='python')
+    def test_python_engine(self):
+        self._assert_expected(*self._run())
+
+    @override_settings(PRODUCTION_FIFO_ENGINE='window')
+    def test_window_engine_matches_python_engine(self):
+        if not supports_window_allocation():
+            self.skipTest("La base de datos no soporta funciones de ventana con UPDATE ... FROM.")
+        self._assert_expected(*self._run())
+
+    @override_settings(PRODUCTION_FIFO_ENGINE='window')
+    def test_window_engine_ignores_other_tenants(self):
+        if not supports_window_allocation():
+            self.skipTest("La base de datos no soporta funciones de ventana con UPDATE ... FROM.")
+        foreign = PurchaseBatch.objects.create(
+            tenant=self.other_tenant, raw_material=self.wood, purchase_date='2020-01-01',
+            quantity=Decimal('100'), total_cost=Decimal('1')
+        )
+        self._assert_expected(*self._run())
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.quantity_remaining, Decimal('100.00'))
+
+
+
+class AllocationStrategyTests(TestCase):
+    """
+    FEFO y LIFO deben tomar los lotes en su propio orden, con ambos motores, y la
+    estrategia de la materia prima debe prevalecer sobre la de la empresa.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Lácteos del Valle", allocation_strategy='fefo')
+        self.milk = RawMaterial.objects.create(tenant=self.tenant, name="Leche", unit_of_measure='litro')
+        self.oldest = self._batch('2025-01-01', '2025-03-01')
+        self.expires_first = self._batch('2025-01-10', '2025-02-01')
+        self.newest_undated = self._batch('2025-02-15', None)
+
+    def _batch(self, purchase_date, expiry_date):
+        return PurchaseBatch.objects.create(
+            tenant=self.tenant, raw_material=self.milk, purchase_date=purchase_date, expiry_date=expiry_date,
+            quantity=Decimal('5.00'), total_cost=Decimal('10.00')
+        )
+
+    def _assert_takes(self, expected):
+        engines = ['python', 'window'] if supports_window_allocation() else ['python']
+        self.milk.refresh_from_db()
+        strategies = {self.milk.id: strategy_for(self.tenant, self.milk)}
+        for engine in engines:
+            with self.subTest(engine=engine), override_settings(PRODUCTION_FIFO_ENGINE=engine), \
+                    transaction.atomic():
+                consumptions = consume_stock(self.tenant, {self.milk.id: Decimal('12.00')}, strategies)
+                self.assertEqual([(c.batch_id, c.quantity) for c in consumptions[self.milk.id]], expected)
+                transaction.set_rollback(True)
+
+    def test_fefo_takes_earliest_expiry_first_and_undated_last(self):
+        self._assert_takes([
+            (self.expires_first.id, Decimal('5.00')),
+            (self.oldest.id, Decimal('5.00')),
+            (self.newest_undated.id, Decimal('2.00')),
+        ])
+
+    def test_raw_material_strategy_overrides_tenant(self):
+        RawMaterial.objects.filter(pk=self.milk.pk).update(allocation_strategy='lifo')
+        self._assert_takes([
+            (self.newest_undated.id, Decimal('5.00')),
+            (self.expires_first.id, Decimal('5.00')),
+            (self.oldest.id, Decimal('2.00')),
+        ])
+
+    @skipUnless(connection.vendor == 'sqlite', "El formato de EXPLAIN depende del motor.")
+    def test_each_strategy_lookup_uses_a_partial_index(self):
+        for code, strategy in STRATEGIES.items():
+            with self.subTest(strategy=code):
+                plan = strategy.open_batches(self.tenant, [self.milk.id]).explain()
+                self.assertIn(strategy.index_name, plan)
+
+    @skipUnless(connection.vendor == 'sqlite', "El formato de EXPLAIN depende del motor.")
+    def test_multi_material_lookup_needs_no_extra_sort(self):
+        # Arrange: varias materias primas a la vez (como en una producción masiva)
+        butter = RawMaterial.objects.create(tenant=self.tenant, name="Mantequilla", unit_of_measure='kg')
+
+        for code, strategy in STRATEGIES.items():
+            with self.subTest(strategy=code):
+                # Act
+                plan = strategy.open_batches(self.tenant, [self.milk.id, butter.id]).explain()
+
+                # Assert: el índice da el orden completo (LIFO lo recorre hacia atrás), sin ordenar aparte
+                self.assertIn(strategy.index_name, plan)
+                self.assertNotIn('TEMP B-TREE', plan)
@@ -0,0 +1,42 @@
+# Fichero: production/tests/test_fifo_lookup.py
+# Test Suite para la búsqueda FIFO de lotes con stock y su índice parcial.
+
+from unittest import skipUnless
+from django.db import connection
+from django.test import TestCase
+from tenants.models import Tenant
+from inventory.models import RawMaterial, PurchaseBatch
+from production.services import fifo_open_batches
+from decimal import Decimal
+
+
+class FifoOpenBatchLookupTests(TestCase):
+    """
+    Valida que la búsqueda FIFO ignore los lotes agotados y use el índice parcial.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Taller Creativo")
+        self.material = RawMaterial.objects.create(tenant=self.tenant, name="Madera", unit_of_measure='m²')
+        self.depleted = PurchaseBatch.objects.create(
+            tenant=self.tenant, raw_material=self.material, purchase_date='2024-01-01',
+            quantity=Decimal('5'), total_cost=Decimal('50')
+        )
+        PurchaseBatch.objects.filter(pk=self.depleted.pk).update(quantity_remaining=Decimal('0'))
+        self.newer = PurchaseBatch.objects.create(
+            tenant=self.tenant, raw_material=self.material, purchase_date='2025-03-01',
+            quantity=Decimal('5'), total_cost=Decimal('50')
+        )
+        self.older = PurchaseBatch.objects.create(
+            tenant=self.tenant, raw_material=self.material, purchase_date='2025-01-01',
+            quantity=Decimal('5'), total_cost=Decimal('50')
+        )
+
+    def test_lookup_returns_only_open_batches_in_fifo_order(self):
+        batches = list(fifo_open_batches(self.tenant, [self.material.id]))
+        self.assertEqual(batches, [self.older, self.newer])
+
+    @skipUnless(connection.vendor == 'sqlite', "El formato de EXPLAIN depende del motor.")
+    def test_lookup_uses_partial_index(self):
+        plan = fifo_open_batches(self.tenant, [self.material.id]).explain()
+        self.assertIn('purchasebatch_fifo_open_idx', plan)
@@ -0,0 +1,147 @@
+# Fichero: production/tests/test_idempotency.py
+# Test Suite para la cabecera Idempotency-Key en los POST de producción y de lotes de compra.
+
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.urls import reverse
+from django.utils import timezone
+from users.models import User
+from tenants.models import Tenant, IdempotencyRecord
+from inventory.models import RawMaterial, PurchaseBatch
+from products.models import Product, RecipeIngredient
+from production.models import ProductionLog
+from production.services import register_production_batch
+
+
+class IdempotencyKeyTests(APITestCase):
+    """
+    Valida que un reintento con la misma clave devuelva la respuesta original sin
+    volver a descontar stock, y que los errores y las claves vencidas no se reutilicen.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Taller Creativo")
+        self.user = User.objects.create_user(
+            email='user@taller.com', password='password123', tenant=self.tenant,
+            first_name='Usuario', last_name='A'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('production-log-list-create')
+
+        self.wood = RawMaterial.objects.create(tenant=self.tenant, name="Madera", unit_of_measure='m²')
+        PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.wood, purchase_date='2025-01-01',
+                                     quantity=Decimal('10'), total_cost=Decimal('20'))
+        self.chair = Product.objects.create(tenant=self.tenant, name="Silla")
+        RecipeIngredient.objects.create(product=self.chair, raw_material=self.wood, quantity=Decimal('2'))
+
+    def _produce(self, key, quantity='1'):
+        return self.client.post(self.url, {'product_id': self.chair.id, 'quantity_produced': quantity},
+                                format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def _stock(self):
+        self.wood.refresh_from_db()
+        return self.wood.total_stock
+
+    def test_retry_returns_original_response_without_deducting_again(self):
+        # Act
+        first = self._produce('turno-1-silla')
+        retry = self._produce('turno-1-silla')
+
+        # Assert
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(ProductionLog.objects.filter(tenant=self.tenant).count(), 1)
+        self.assertEqual(self._stock(), Decimal('8.00'))
+
+    def test_same_key_with_different_payload_is_rejected(self):
+        # Arrange
+        self._produce('turno-1-silla')
+
+        # Act
+        response = self._produce('turno-1-silla', quantity='2')
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(self._stock(), Decimal('8.00'))
+
+    def test_error_response_releases_the_key(self):
+        # Arrange: se piden 6 sillas (12 m²) y solo hay 10 m²
+        failed = self._produce('turno-2-silla', quantity='6')
+        PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.wood, purchase_date='2025-02-01',
+                                     quantity=Decimal('10'), total_cost=Decimal('20'))
+
+        # Act: el reintento con la misma clave vuelve a ejecutar el servicio
+        retry = self._produce('turno-2-silla', quantity='6')
+
+        # Assert
+        self.assertEqual(failed.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self._stock(), Decimal('8.00'))
+
+    def test_expired_key_runs_the_request_again(self):
+        # Arrange
+        self._produce('turno-3-silla')
+        IdempotencyRecord.objects.filter(key='turno-3-silla').update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        # Act
+        response = self._produce('turno-3-silla')
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(ProductionLog.objects.filter(tenant=self.tenant).count(), 2)
+
+    def test_key_in_progress_returns_409_until_its_lease_expires(self):
+        # Arrange: una reserva sin respuesta, como la de una petición en curso (o cuyo
+        # proceso murió antes de guardar la respuesta)
+        self._produce('turno-4-silla')
+        claim = IdempotencyRecord.objects.filter(key='turno-4-silla')
+        claim.update(status_code=None, response_body=None)
+
+        # Act: reintento mientras la reserva está vigente, y luego con la reserva abandonada
+        conflict = self._produce('turno-4-silla')
+        claim.update(created_at=timezone.now() - timedelta(minutes=5))
+        retry = self._produce('turno-4-silla')
+
+        # Assert
+        self.assertEqual(conflict.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(ProductionLog.objects.filter(tenant=self.tenant).count(), 2)
+        self.assertEqual(claim.get().status_code, status.HTTP_201_CREATED)
+
+    def test_original_request_rolls_back_if_its_claim_was_replaced(self):
+        # Arrange: mientras la petición original corre, un reintento da su reserva por
+        # abandonada y la elimina
+        def replaced_during_service(*args, **kwargs):
+            IdempotencyRecord.objects.filter(key='turno-5-silla').delete()
+            return register_production_batch(*args, **kwargs)
+
+        # Act
+        with patch('production.views.register_production_batch', side_effect=replaced_during_service):
+            response = self._produce('turno-5-silla')
+
+        # Assert: la ejecución original no se confirma
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(ProductionLog.objects.filter(tenant=self.tenant).count(), 0)
+        self.assertEqual(self._stock(), Decimal('10.00'))
+
+    def test_purchase_batch_retry_does_not_duplicate_purchase(self):
+        # Arrange
+        payload = {'raw_material': self.wood.pk, 'purchase_date': '2025-03-01', 'quantity': '5', 'total_cost': '15'}
+
+        # Act
+        first = self.client.post(reverse('purchase-batch-list'), payload, format='json',
+                                 HTTP_IDEMPOTENCY_KEY='compra-77')
+        retry = self.client.post(reverse('purchase-batch-list'), payload, format='json',
+                                 HTTP_IDEMPOTENCY_KEY='compra-77')
+
+        # Assert
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data['id'], first.data['id'])
+        self.assertEqual(PurchaseBatch.objects.filter(raw_material=self.wood).count(), 2)
+        self.assertEqual(self._stock(), Decimal('15.00'))
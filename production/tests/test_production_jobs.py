@@ -0,0 +1,110 @@
+# Fichero: production/tests/test_production_jobs.py
+# Test Suite para la cola de producción persistente (ProductionJob) y su worker.
+
+from io import StringIO
+from decimal import Decimal
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.core.management import call_command
+from django.urls import reverse
+from users.models import User
+from tenants.models import Tenant
+from inventory.models import RawMaterial, PurchaseBatch
+from products.models import Product, RecipeIngredient
+from production.jobs import process_next_job
+from production.models import ProductionJob, ProductionLog
+
+
+class ProductionJobQueueTests(APITestCase):
+    """
+    Valida que las producciones encoladas se acepten sin tocar el stock, que el worker
+    las registre en orden de llegada y que los fallos queden anotados en la solicitud.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Taller Creativo")
+        self.user = User.objects.create_user(
+            email='user@taller.com', password='password123', tenant=self.tenant,
+            first_name='Usuario', last_name='A'
+        )
+        self.other_tenant = Tenant.objects.create(name="Otro Taller")
+        self.other_user = User.objects.create_user(
+            email='user@otro.com', password='password123', tenant=self.other_tenant,
+            first_name='Usuario', last_name='B'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('production-job-create')
+
+        # Madera: lote 1 de 4 m² a 2/m² y lote 2 de 10 m² a 3/m²
+        self.wood = RawMaterial.objects.create(tenant=self.tenant, name="Madera", unit_of_measure='m²')
+        PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.wood, purchase_date='2025-01-01',
+                                     quantity=Decimal('4'), total_cost=Decimal('8'))
+        PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.wood, purchase_date='2025-02-01',
+                                     quantity=Decimal('10'), total_cost=Decimal('30'))
+        self.chair = Product.objects.create(tenant=self.tenant, name="Silla")
+        RecipeIngredient.objects.create(product=self.chair, raw_material=self.wood, quantity=Decimal('2'))
+
+    def _enqueue(self, quantity):
+        return self.client.post(self.url, {'items': [{'product_id': self.chair.id, 'quantity_produced': quantity}]},
+                                format='json')
+
+    def _stock(self):
+        self.wood.refresh_from_db()
+        return self.wood.total_stock
+
+    def test_enqueued_production_is_registered_by_the_worker(self):
+        # Act
+        response = self._enqueue('2')
+        stock_before_worker = self._stock()
+        process_next_job()
+        detail = self.client.get(reverse('production-job-detail', args=[response.data['id']]))
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], ProductionJob.Status.PENDING)
+        self.assertEqual(stock_before_worker, Decimal('14.00'))
+        self.assertEqual(detail.data['status'], ProductionJob.Status.DONE)
+        self.assertEqual([(log['product_name'], log['total_cost']) for log in detail.data['production_logs']],
+                         [("Silla", "8.00")])
+        self.assertEqual(self._stock(), Decimal('10.00'))
+
+    def test_failed_production_is_recorded_without_touching_stock(self):
+        # Arrange: 8 sillas necesitan 16 m² y solo hay 14 m²
+        job_id = self._enqueue('8').data['id']
+
+        # Act
+        process_next_job()
+
+        # Assert
+        job = ProductionJob.objects.get(pk=job_id)
+        self.assertEqual(job.status, ProductionJob.Status.FAILED)
+        self.assertEqual(job.error['error_code'], "INSUFFICIENT_STOCK")
+        self.assertFalse(ProductionLog.objects.filter(tenant=self.tenant).exists())
+        self.assertEqual(self._stock(), Decimal('14.00'))
+        # La cola queda vacía: el fallo no se reintenta indefinidamente
+        self.assertIsNone(process_next_job())
+
+    def test_job_detail_is_tenant_isolated(self):
+        # Arrange
+        job_id = self._enqueue('1').data['id']
+
+        # Act
+        self.client.force_authenticate(user=self.other_user)
+        response = self.client.get(reverse('production-job-detail', args=[job_id]))
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_worker_command_processes_jobs_in_arrival_order(self):
+        # Arrange: la primera solicitud agota el lote viejo; la segunda usa el nuevo
+        first_id = self._enqueue('2').data['id']
+        second_id = self._enqueue('2').data['id']
+        out = StringIO()
+
+        # Act
+        call_command('run_production_worker', '--workers', '1', '--exit-when-idle', stdout=out)
+
+        # Assert
+        costs = [ProductionJob.objects.get(pk=pk).production_logs.get().total_cost for pk in (first_id, second_id)]
+        self.assertEqual(costs, [Decimal('8.00'), Decimal('12.00')])
+        self.assertIn('Processed 2 production job(s)', out.getvalue())
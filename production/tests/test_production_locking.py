@@ -0,0 +1,212 @@
+# Fichero: production/tests/test_production_locking.py
+# Test Suite para los modos de bloqueo de la producción (filas, advisory locks y optimista).
+
+import re
+from decimal import Decimal
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import patch
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from users.models import User
+from tenants.models import Tenant
+from inventory.models import RawMaterial, PurchaseBatch
+from products.models import Product, RecipeIngredient
+from production import services
+from production.allocation import StockConflict, consume_stock
+from production.locking import ADVISORY, OPTIMISTIC, ROWS, advisory_key, uses_advisory_locks
+from production.services import register_production_batch
+from production.strategies import FIFO
+
+
+class ProductionLockingTests(TestCase):
+    """
+    Valida que el modo 'advisory' bloquee por materia prima en orden ascendente en
+    PostgreSQL, y que en otros motores use el camino por filas sin cambiar el resultado.
+    En todos los modos, el contador de stock se escribe antes que los lotes.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Carpintería Norte")
+        self.user = User.objects.create_user(
+            email='user@norte.com', password='password123', tenant=self.tenant,
+            first_name='Usuario', last_name='A'
+        )
+        self.screws = RawMaterial.objects.create(tenant=self.tenant, name="Tornillos", unit_of_measure='u')
+        self.varnish = RawMaterial.objects.create(tenant=self.tenant, name="Barniz", unit_of_measure='litro')
+        for material in (self.screws, self.varnish):
+            PurchaseBatch.objects.create(tenant=self.tenant, raw_material=material, purchase_date='2025-01-01',
+                                         quantity=Decimal('10'), total_cost=Decimal('10'))
+        self.product = Product.objects.create(tenant=self.tenant, name="Mesa")
+        # Ingredientes creados en orden inverso al id: el bloqueo debe ordenarlos igualmente.
+        RecipeIngredient.objects.create(product=self.product, raw_material=self.varnish, quantity=Decimal('1'))
+        RecipeIngredient.objects.create(product=self.product, raw_material=self.screws, quantity=Decimal('4'))
+
+    @override_settings(PRODUCTION_LOCKING='advisory')
+    def test_advisory_mode_registers_production(self):
+        # Act
+        with CaptureQueriesContext(connection) as queries:
+            register_production_batch(self.user, self.product.id, Decimal('2'))
+
+        # Assert
+        self.screws.refresh_from_db()
+        self.varnish.refresh_from_db()
+        self.assertEqual(self.screws.total_stock, Decimal('2.00'))
+        self.assertEqual(self.varnish.total_stock, Decimal('8.00'))
+
+        sql = [query['sql'] for query in queries.captured_queries]
+        lock_statements = [statement for statement in sql if 'pg_advisory_xact_lock' in statement]
+        if connection.vendor == 'postgresql':
+            self.assertTrue(uses_advisory_locks())
+            self.assertEqual(len(lock_statements), 1)
+            expected_order = f"CAST({self.screws.id} AS integer)), " \
+                             f"pg_advisory_xact_lock(CAST({self.tenant.id} AS integer), CAST({self.varnish.id} AS integer))"
+            self.assertIn(expected_order, lock_statements[0])
+            self.assertFalse(any('FOR UPDATE' in statement for statement in sql))
+        else:
+            # Fallback documentado: sin advisory locks, camino por filas.
+            self.assertFalse(uses_advisory_locks())
+            self.assertEqual(lock_statements, [])
+
+
+    def test_advisory_keys_fit_in_integer(self):
+        # Act
+        small = advisory_key(self.tenant.id, self.screws.id)
+        large = advisory_key(2 ** 31, 2 ** 40 + 5)
+
+        # Assert: los ids pequeños se conservan; los grandes se pliegan al rango de int4
+        self.assertEqual(small, (self.tenant.id, self.screws.id))
+        self.assertEqual(large, (-2 ** 31, 5))
+
+    def test_stock_counter_is_written_before_batches_in_every_mode(self):
+        # Arrange: `PurchaseBatch.save()` escribe la materia prima y luego el lote; la
+        # producción debe tomar los bloqueos en el mismo orden para no producir deadlocks
+        counter = re.compile(r'UPDATE "?inventory_rawmaterial\b')
+        batches = re.compile(r'UPDATE "?inventory_purchasebatch\b|inventory_purchasebatch.*FOR UPDATE', re.S)
+
+        for mode in (ROWS, ADVISORY, OPTIMISTIC):
+            for engine in ('window', 'python'):
+                with self.subTest(mode=mode, engine=engine), \
+                        override_settings(PRODUCTION_LOCKING=mode, PRODUCTION_FIFO_ENGINE=engine):
+                    # Act
+                    with CaptureQueriesContext(connection) as queries:
+                        register_production_batch(self.user, self.product.id, Decimal('0.25'))
+
+                    # Assert
+                    sql = [query['sql'] for query in queries.captured_queries]
+                    counter_at = next(i for i, statement in enumerate(sql) if counter.search(statement))
+                    batches_at = next(i for i, statement in enumerate(sql) if batches.search(statement))
+                    self.assertLess(counter_at, batches_at)
+
+    @override_settings(PRODUCTION_FIFO_ENGINE='python')
+    def test_python_engine_deducts_relative_to_concurrent_edits(self):
+        # Arrange: sin bloqueo de lotes (advisory), otro proceso edita el lote tras leerlo
+        batch = PurchaseBatch.objects.get(raw_material=self.screws)
+        stale_batches = list(FIFO.open_batches(self.tenant, [self.screws.id]))
+        PurchaseBatch.objects.filter(pk=batch.pk).update(quantity_remaining=Decimal('9'))
+
+        # Act
+        with patch.object(FIFO, 'open_batches', return_value=stale_batches), transaction.atomic():
+            consume_stock(self.tenant, {self.screws.id: Decimal('4')}, locking=ADVISORY)
+
+        # Assert: se descuenta sobre el valor actual, sin pisar la edición (9 - 4, no 10 - 4)
+        batch.refresh_from_db()
+        self.assertEqual(batch.quantity_remaining, Decimal('5.00'))
+
+
+@skipUnless(connection.vendor == 'postgresql',
+            "SQLite serializa a todos los escritores: sin concurrencia real no hay nada que comparar.")
+class ConcurrentProductionStressTests(TransactionTestCase):
+    """
+    Ejecuta `stress_production` con varios hilos y valida que ningún modo de bloqueo
+    produzca deadlocks ni pierda producciones, aunque cada receta liste los mismos
+    ingredientes en otro orden.
+    """
+
+    def test_no_mode_deadlocks_under_contention(self):
+        # Act
+        out = StringIO()
+        call_command('stress_production', workers=6, productions=10, materials=4, products=5, batches=20,
+                     stdout=out)
+
+        # Assert: una fila por modo con ok | deadlocks | errors
+        rows = {}
+        for line in out.getvalue().splitlines():
+            columns = [column.strip() for column in line.split('|')]
+            if columns[0] in (ROWS, ADVISORY, OPTIMISTIC):
+                rows[columns[0]] = tuple(int(value) for value in columns[1:4])
+        self.assertEqual(rows, {mode: (60, 0, 0) for mode in (ROWS, ADVISORY, OPTIMISTIC)})
+
+
+class OptimisticDeductionTests(TestCase):
+    """
+    Valida el modo optimista: descuento con UPDATE condicional, reintento ante un
+    conflicto y, agotados los reintentos, registro con bloqueo de filas.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Panadería Sur")
+        self.user = User.objects.create_user(
+            email='user@sur.com', password='password123', tenant=self.tenant,
+            first_name='Usuario', last_name='A'
+        )
+        self.flour = RawMaterial.objects.create(tenant=self.tenant, name="Harina", unit_of_measure='kg')
+        self.old_batch = PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.flour,
+                                                      purchase_date='2025-01-01', quantity=Decimal('5'),
+                                                      total_cost=Decimal('10'))
+        self.new_batch = PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.flour,
+                                                      purchase_date='2025-02-01', quantity=Decimal('5'),
+                                                      total_cost=Decimal('20'))
+        self.product = Product.objects.create(tenant=self.tenant, name="Pan")
+        RecipeIngredient.objects.create(product=self.product, raw_material=self.flour, quantity=Decimal('1'))
+
+    @override_settings(PRODUCTION_LOCKING='optimistic')
+    def test_deducts_with_conditional_update(self):
+        # Act
+        with CaptureQueriesContext(connection) as queries:
+            production_log = register_production_batch(self.user, self.product.id, Decimal('7'))
+
+        # Assert: FIFO, sin FOR UPDATE
+        self.assertEqual(production_log.total_cost, Decimal('18.00'))
+        self.old_batch.refresh_from_db()
+        self.new_batch.refresh_from_db()
+        self.assertEqual(self.old_batch.quantity_remaining, Decimal('0.00'))
+        self.assertEqual(self.new_batch.quantity_remaining, Decimal('3.00'))
+        self.assertFalse(any('FOR UPDATE' in query['sql'] for query in queries.captured_queries))
+
+    def test_stale_read_raises_conflict(self):
+        # Arrange: leemos los lotes y otro proceso consume el antiguo antes del UPDATE
+        stale_batches = list(FIFO.open_batches(self.tenant, [self.flour.id]))
+        PurchaseBatch.objects.filter(pk=self.old_batch.pk).update(quantity_remaining=Decimal('1'))
+
+        # Act / Assert: el UPDATE condicional no afecta al lote y nada se descuenta
+        with patch.object(FIFO, 'open_batches', return_value=stale_batches):
+            with self.assertRaises(StockConflict), transaction.atomic():
+                consume_stock(self.tenant, {self.flour.id: Decimal('3')}, locking=OPTIMISTIC)
+        self.new_batch.refresh_from_db()
+        self.assertEqual(self.new_batch.quantity_remaining, Decimal('5.00'))
+
+    @override_settings(PRODUCTION_LOCKING='optimistic', PRODUCTION_OPTIMISTIC_RETRIES=3)
+    def test_conflicts_retry_with_backoff_then_fall_back_to_row_locks(self):
+        # Arrange: todos los intentos optimistas pierden la carrera
+        attempts = []
+
+        def always_conflicting(tenant, products, items, locking=ROWS):
+            attempts.append(locking)
+            if locking == OPTIMISTIC:
+                raise StockConflict()
+            return real_produce(tenant, products, items, locking)
+
+        real_produce = services._produce
+
+        # Act
+        with patch.object(services, '_produce', side_effect=always_conflicting), \
+                patch('production.services.time.sleep') as sleep:
+            production_log = register_production_batch(self.user, self.product.id, Decimal('3'))
+
+        # Assert
+        self.assertEqual(attempts, [OPTIMISTIC, OPTIMISTIC, OPTIMISTIC, ROWS])
+        self.assertEqual(sleep.call_count, 3)
+        self.assertEqual(production_log.total_cost, Decimal('6.00'))
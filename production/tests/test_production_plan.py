@@ -0,0 +1,98 @@
+# Fichero: production/tests/test_production_plan.py
+# Test Suite para la evaluación de planes de producción (MRP) en /api/v1/production-logs/plan/.
+
+from decimal import Decimal
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from users.models import User
+from tenants.models import Tenant
+from inventory.models import RawMaterial, PurchaseBatch
+from products.models import Product, RecipeIngredient
+from production.models import ProductionLog
+from production.planning import parse_production_plan
+
+
+class ProductionPlanTests(APITestCase):
+    """
+    Valida los requerimientos agregados, faltantes y costo estimado de un plan, y que
+    la evaluación no modifique el inventario ni dependa del número de materias primas.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Taller Creativo")
+        self.user = User.objects.create_user(
+            email='user@taller.com', password='password123', tenant=self.tenant,
+            first_name='Usuario', last_name='A'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('production-plan')
+
+        self.wood = RawMaterial.objects.create(tenant=self.tenant, name="Madera", unit_of_measure='m²')
+        self.varnish = RawMaterial.objects.create(tenant=self.tenant, name="Barniz", unit_of_measure='litro')
+        # Madera: 10 a 2/u y luego 10 a 3/u. Barniz: solo 1 litro.
+        PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.wood, purchase_date='2025-01-01',
+                                     quantity=Decimal('10'), total_cost=Decimal('20'))
+        PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.wood, purchase_date='2025-02-01',
+                                     quantity=Decimal('10'), total_cost=Decimal('30'))
+        PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.varnish, purchase_date='2025-01-01',
+                                     quantity=Decimal('1'), total_cost=Decimal('5'))
+
+        self.chair = Product.objects.create(tenant=self.tenant, name="Silla")
+        RecipeIngredient.objects.create(product=self.chair, raw_material=self.wood, quantity=Decimal('2'))
+        RecipeIngredient.objects.create(product=self.chair, raw_material=self.varnish, quantity=Decimal('0.25'))
+        self.table = Product.objects.create(tenant=self.tenant, name="Mesa")
+        RecipeIngredient.objects.create(product=self.table, raw_material=self.wood, quantity=Decimal('4'))
+
+    def test_plan_reports_requirements_shortfall_and_fifo_cost(self):
+        # Act: 6 sillas (12 madera, 1.5 barniz) + 1 mesa (4 madera)
+        response = self.client.post(self.url, {'plan': f'{self.chair.id}:6,{self.table.id}:1'}, format='json')
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['feasible'])
+        varnish, wood = response.data['materials']
+        self.assertEqual((wood['quantity_required'], wood['quantity_available'], wood['shortfall']),
+                         ('16.00', '20.00', '0.00'))
+        # FIFO: 10 x 2 + 6 x 3
+        self.assertEqual(wood['estimated_cost'], '38.00')
+        self.assertEqual((varnish['quantity_required'], varnish['shortfall'], varnish['estimated_cost']),
+                         ('1.50', '0.50', '5.00'))
+        self.assertEqual(response.data['estimated_cost'], '43.00')
+
+        # Nada se modificó
+        self.assertFalse(ProductionLog.objects.exists())
+        self.wood.refresh_from_db()
+        self.assertEqual(self.wood.total_stock, Decimal('20.00'))
+
+    def test_query_count_does_not_grow_with_materials(self):
+        # Arrange: una receta con muchos ingredientes
+        for i in range(20):
+            material = RawMaterial.objects.create(tenant=self.tenant, name=f"Material {i}", unit_of_measure='u')
+            PurchaseBatch.objects.create(tenant=self.tenant, raw_material=material, purchase_date='2025-01-01',
+                                         quantity=Decimal('5'), total_cost=Decimal('5'))
+            RecipeIngredient.objects.create(product=self.table, raw_material=material, quantity=Decimal('1'))
+
+        # Act
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {'items': [
+                {'product_id': self.table.id, 'quantity_produced': '2'}
+            ]}, format='json')
+
+        # Assert: validación, productos + recetas, materias primas, lotes
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['feasible'])
+        self.assertEqual(len(response.data['materials']), 21)
+        self.assertLessEqual(len(queries), 5)
+
+    def test_invalid_plan_is_rejected(self):
+        response = self.client.post(self.url, {'plan': 'silla:diez'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('plan', response.data)
+
+    def test_parse_production_plan(self):
+        plan, errors = parse_production_plan('silla:10, sofa:2.5,silla:1,roto,mesa:-1')
+        self.assertEqual(plan, {'silla': Decimal('11'), 'sofa': Decimal('2.5')})
+        self.assertEqual(errors, ['roto', 'mesa:-1'])
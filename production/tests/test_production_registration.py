@@ -0,0 +1,103 @@
+# Fichero: production/tests/test_production_registration.py
+# Test Suite para el registro individual de producción (POST /api/v1/production-logs/).
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from users.models import User
+from tenants.models import Tenant
+from inventory.models import RawMaterial, PurchaseBatch
+from products.models import Product, RecipeIngredient
+from decimal import Decimal
+
+
+class ProductionRegistrationTests(APITestCase):
+    """
+    Valida el descuento FIFO del registro individual y que el número de consultas
+    no crezca con el tamaño de la receta ni con el número de lotes consumidos.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Taller Creativo")
+        self.user = User.objects.create_user(
+            email='taller@ejemplo.com', password='password123', tenant=self.tenant,
+            first_name='Usuario', last_name='Taller'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('production-log-list-create')
+
+    def _create_product_with_recipe(self, name, ingredient_count, batches_per_material=2):
+        """
+        Crea un producto cuya receta usa `ingredient_count` materias primas, cada una
+        con `batches_per_material` lotes de 1 unidad (producir 1 unidad los agota todos).
+        """
+        product = Product.objects.create(tenant=self.tenant, name=name)
+        for i in range(ingredient_count):
+            material = RawMaterial.objects.create(
+                tenant=self.tenant, name=f"{name} - Material {i}", unit_of_measure='u'
+            )
+            for day in range(1, batches_per_material + 1):
+                PurchaseBatch.objects.create(
+                    tenant=self.tenant, raw_material=material, purchase_date=f'2025-01-{day:02d}',
+                    quantity=Decimal('1'), total_cost=Decimal(day)
+                )
+            RecipeIngredient.objects.create(
+                product=product, raw_material=material, quantity=Decimal(batches_per_material)
+            )
+        return product
+
+    def _count_registration_queries(self, product):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                self.url, {'product_id': product.id, 'quantity_produced': '1'}, format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return len(context.captured_queries)
+
+    def test_registration_deducts_fifo_and_computes_cost(self):
+        # Arrange: 2 lotes de 1 unidad a 1.00 y 2.00
+        product = self._create_product_with_recipe("Silla", ingredient_count=1)
+
+        # Act
+        response = self.client.post(self.url, {'product_id': product.id, 'quantity_produced': '1'}, format='json')
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['product_name'], "Silla")
+        self.assertEqual(Decimal(response.data['total_cost']), Decimal('3.00'))
+        self.assertFalse(PurchaseBatch.objects.filter(quantity_remaining__gt=0).exists())
+        product.refresh_from_db()
+        self.assertEqual(product.stock, Decimal('1.00'))
+
+    def test_insufficient_stock_keeps_single_material_error_format(self):
+        # Arrange
+        product = self._create_product_with_recipe("Mesa", ingredient_count=1)
+
+        # Act: se necesitan 4 unidades y solo hay 2
+        response = self.client.post(self.url, {'product_id': product.id, 'quantity_produced': '2'}, format='json')
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error_code'], 'INSUFFICIENT_STOCK')
+        self.assertEqual(response.data['missing_raw_material']['name'], "Mesa - Material 0")
+        self.assertEqual(response.data['quantity_required'], '4.00')
+        self.assertEqual(response.data['quantity_available'], '2.00')
+
+    def test_query_count_does_not_depend_on_recipe_size(self):
+        """
+        Una receta de 3 ingredientes (6 lotes) y otra de 25 ingredientes (75 lotes)
+        deben registrarse con el mismo número fijo de consultas.
+        """
+        # Arrange
+        small = self._create_product_with_recipe("Taburete", ingredient_count=3)
+        large = self._create_product_with_recipe("Sofá", ingredient_count=25, batches_per_material=3)
+
+        # Act
+        small_queries = self._count_registration_queries(small)
+        large_queries = self._count_registration_queries(large)
+
+        # Assert
+        self.assertEqual(small_queries, large_queries)
+        self.assertLessEqual(large_queries, 11)
@@ -0,0 +1,164 @@
+# Fichero: production/tests/test_production_rollups.py
+# Test Suite para los resúmenes diarios de producción (ProductionRollup) y las series para gráficos.
+
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.db.models import Sum
+from django.urls import reverse
+from users.models import User
+from tenants.models import Tenant
+from inventory.models import RawMaterial, PurchaseBatch
+from products.models import Product, RecipeIngredient
+from production.models import ProductionLog, ProductionConsumption, ProductionRollup
+from production.recost import recost_production
+from production.rollups import rebuild_rollups
+from production.services import register_production_batch, register_production_batches
+
+
+class ProductionRollupTests(APITestCase):
+    """
+    Valida que cada producción se sume al resumen de su día local, que la serie
+    agrupe varios productos por día, semana o mes y que el recálculo de costos
+    mantenga los resúmenes al día.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Panadería Central")
+        self.user = User.objects.create_user(
+            email='user@central.com', password='password123', tenant=self.tenant,
+            first_name='Usuario', last_name='A'
+        )
+        self.other_tenant = Tenant.objects.create(name="Otra Panadería")
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('production-series')
+
+        # Harina: lote 1 de 5 kg a 2/kg y lote 2 de 20 kg a 3/kg
+        self.flour = RawMaterial.objects.create(tenant=self.tenant, name="Harina", unit_of_measure='kg')
+        self.flour_old = PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.flour,
+                                                      purchase_date='2025-01-01', quantity=Decimal('5'),
+                                                      total_cost=Decimal('10'))
+        PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.flour, purchase_date='2025-02-01',
+                                     quantity=Decimal('20'), total_cost=Decimal('60'))
+        self.bread = Product.objects.create(tenant=self.tenant, name="Pan")
+        self.cake = Product.objects.create(tenant=self.tenant, name="Pastel")
+        RecipeIngredient.objects.create(product=self.bread, raw_material=self.flour, quantity=Decimal('1'))
+        RecipeIngredient.objects.create(product=self.cake, raw_material=self.flour, quantity=Decimal('2'))
+
+    def _rollup(self, product, day, quantity):
+        ProductionRollup.objects.create(tenant=self.tenant, product=product, day=day,
+                                        quantity_produced=Decimal(quantity), total_cost=Decimal(quantity) * 2,
+                                        production_count=1)
+
+    def test_productions_are_added_to_their_daily_rollup(self):
+        # Act: dos producciones de pan (una individual y otra masiva) y una de pastel
+        register_production_batch(self.user, self.bread.id, Decimal('2'))
+        register_production_batches(self.user, [(self.bread.id, Decimal('1')), (self.cake.id, Decimal('1'))])
+
+        # Assert
+        bread = ProductionRollup.objects.get(product=self.bread)
+        self.assertEqual((bread.quantity_produced, bread.total_cost, bread.production_count),
+                         (Decimal('3.00'), Decimal('6.00'), 2))
+        self.assertEqual(ProductionRollup.objects.get(product=self.cake).total_cost, Decimal('4.00'))
+
+    def test_days_follow_the_tenant_time_zone(self):
+        # Arrange: 03:30 UTC del 1 de marzo son las 21:30 del 28 de febrero en Managua
+        production_log = register_production_batch(self.user, self.bread.id, Decimal('1'))
+        ProductionLog.objects.filter(pk=production_log.pk).update(
+            production_date=datetime(2025, 3, 1, 3, 30, tzinfo=dt_timezone.utc)
+        )
+
+        # Act
+        rebuild_rollups(self.tenant)
+        local = ProductionRollup.objects.get(product=self.bread).day
+        self.tenant.timezone = 'UTC'
+        self.tenant.save()
+        rebuild_rollups(self.tenant)
+
+        # Assert
+        self.assertEqual(local, date(2025, 2, 28))
+        self.assertEqual(ProductionRollup.objects.get(product=self.bread).day, date(2025, 3, 1))
+
+    def test_consumption_report_uses_the_same_days_as_the_series(self):
+        # Arrange: 20:00 UTC del 1 de marzo ya es 2 de marzo en Tokio (y 1 de marzo en Managua)
+        self.tenant.timezone = 'Asia/Tokyo'
+        self.tenant.save()
+        production_log = register_production_batch(self.user, self.bread.id, Decimal('1'))
+        moment = datetime(2025, 3, 1, 20, 0, tzinfo=dt_timezone.utc)
+        ProductionLog.objects.filter(pk=production_log.pk).update(production_date=moment)
+        ProductionConsumption.objects.filter(production_log=production_log).update(production_date=moment)
+        rebuild_rollups(self.tenant)
+        day = {'date_from': '2025-03-02', 'date_to': '2025-03-02'}
+
+        # Act
+        report = self.client.get(reverse('production-consumption-report'), day)
+        series = self.client.get(self.url, {'products': str(self.bread.id), 'granularity': 'day', **day})
+
+        # Assert
+        self.assertEqual(series.data['series'][0]['total_cost'], ['2.00'])
+        self.assertEqual(report.data['total_cost'], '2.00')
+
+    def test_weekly_series_for_several_products(self):
+        # Arrange: lunes 6, miércoles 8 y lunes 20 de enero
+        self._rollup(self.bread, date(2025, 1, 6), '2')
+        self._rollup(self.bread, date(2025, 1, 8), '1')
+        self._rollup(self.bread, date(2025, 1, 20), '4')
+        self._rollup(self.cake, date(2025, 1, 14), '5')
+
+        # Act
+        response = self.client.get(self.url, {
+            'products': f'{self.cake.id},{self.bread.id}', 'granularity': 'week',
+            'date_from': '2025-01-07', 'date_to': '2025-01-26'
+        })
+
+        # Assert: semanas completas desde el lunes, con ceros en las vacías
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['periods'], ['2025-01-06', '2025-01-13', '2025-01-20'])
+        self.assertEqual([(s['product_name'], s['quantity_produced']) for s in response.data['series']], [
+            ("Pastel", ['0.00', '5.00', '0.00']),
+            ("Pan", ['1.00', '0.00', '4.00']),
+        ])
+
+    def test_monthly_series_and_foreign_products(self):
+        # Arrange
+        self._rollup(self.bread, date(2025, 1, 31), '2')
+        self._rollup(self.bread, date(2025, 3, 1), '3')
+        foreign = Product.objects.create(tenant=self.other_tenant, name="Ajeno")
+
+        # Act
+        response = self.client.get(self.url, {'products': str(self.bread.id), 'date_to': '2025-03-31'})
+        foreign_response = self.client.get(self.url, {'products': f'{self.bread.id},{foreign.id}'})
+
+        # Assert
+        self.assertEqual(response.data['periods'], ['2025-01-01', '2025-02-01', '2025-03-01'])
+        self.assertEqual(response.data['series'][0]['total_cost'], ['4.00', '0.00', '6.00'])
+        self.assertEqual(foreign_response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_recost_updates_rollup_costs(self):
+        # Arrange: 3 panes a 2/kg; luego la factura del lote viejo se corrige a 3/kg
+        register_production_batch(self.user, self.bread.id, Decimal('3'))
+        self.flour_old.total_cost = Decimal('15')
+        self.flour_old.save()
+
+        # Act
+        recost_production(self.tenant)
+
+        # Assert
+        logs_total = ProductionLog.objects.filter(tenant=self.tenant).aggregate(total=Sum('total_cost'))['total']
+        self.assertEqual(ProductionRollup.objects.get(product=self.bread).total_cost, Decimal('9.00'))
+        self.assertEqual(logs_total, Decimal('9.00'))
+
+    def test_stock_evolution_reads_monthly_rollups(self):
+        # Arrange
+        self._rollup(self.bread, date(2025, 1, 10), '2')
+        self._rollup(self.bread, date(2025, 1, 20), '1')
+        self._rollup(self.bread, date(2025, 3, 5), '4')
+
+        # Act
+        response = self.client.get(reverse('products-stock-evolution', args=[self.bread.id]))
+
+        # Assert: stock acumulado por mes
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"labels": ["Jan 2025", "Mar 2025"],
+                                         "data": [Decimal('3.00'), Decimal('7.00')]})
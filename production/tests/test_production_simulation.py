@@ -0,0 +1,86 @@
+# Fichero: production/tests/test_production_simulation.py
+# Test Suite para la simulación de costos de producción (/api/v1/production-logs/simulate/).
+
+from decimal import Decimal
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from users.models import User
+from tenants.models import Tenant
+from inventory.models import RawMaterial, PurchaseBatch
+from products.models import Product, RecipeIngredient
+from production.models import ProductionLog
+
+
+class ProductionSimulationTests(APITestCase):
+    """
+    La simulación debe costar igual que el registro real, sin bloqueos ni escrituras.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Tapicería Central")
+        self.user = User.objects.create_user(
+            email='user@tapiceria.com', password='password123', tenant=self.tenant,
+            first_name='Usuario', last_name='A'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('production-simulate')
+
+        self.linen = RawMaterial.objects.create(tenant=self.tenant, name="Lino", unit_of_measure='m')
+        self.first_batch = PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.linen,
+                                                        purchase_date='2025-01-01', quantity=Decimal('15'),
+                                                        total_cost=Decimal('45'))
+        PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.linen, purchase_date='2025-02-01',
+                                     quantity=Decimal('20'), total_cost=Decimal('80'))
+        self.sofa = Product.objects.create(tenant=self.tenant, name="Sofá")
+        RecipeIngredient.objects.create(product=self.sofa, raw_material=self.linen, quantity=Decimal('10'))
+
+    def _items(self, *quantities):
+        return {'items': [{'product_id': self.sofa.id, 'quantity_produced': q} for q in quantities]}
+
+    def test_simulation_matches_real_registration_without_writing(self):
+        # Act: dos sofás, luego uno más (cruza de lote)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, self._items('1', '2'), format='json')
+
+        # Assert: 10 x 3 = 30; luego 5 x 3 + 15 x 4 = 75
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['total_cost'] for item in response.data['items']], ['30.00', '75.00'])
+        self.assertEqual(response.data['total_cost'], '105.00')
+        second_batches = response.data['items'][1]['materials'][0]['batches']
+        self.assertEqual([(b['batch_id'], b['quantity'], b['unit_cost']) for b in second_batches],
+                         [(self.first_batch.id, '5.00', '3.000000'), (self.first_batch.id + 1, '15.00', '4.000000')])
+        self.assertFalse(any('FOR UPDATE' in q['sql'] or q['sql'].startswith(('UPDATE', 'INSERT'))
+                             for q in queries.captured_queries))
+        self.first_batch.refresh_from_db()
+        self.assertEqual(self.first_batch.quantity_remaining, Decimal('15.00'))
+
+        # El registro real produce los mismos costos
+        bulk = self.client.post(reverse('production-log-bulk-create'), self._items('1', '2'), format='json')
+        self.assertEqual(bulk.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([log.total_cost for log in ProductionLog.objects.order_by('id')],
+                         [Decimal('30.00'), Decimal('75.00')])
+
+    def test_simulation_reports_shortfall_instead_of_failing(self):
+        response = self.client.post(self.url, self._items('4'), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['feasible'])
+        self.assertEqual(response.data['items'][0]['materials'][0]['shortfall'], '5.00')
+
+    def test_average_costing_breakdown_uses_the_average_cost(self):
+        # Arrange: los dos lotes cuestan 3 y 4 por metro; se valora al promedio
+        self.tenant.costing_method = 'average'
+        self.tenant.save()
+        self.linen.refresh_from_db()
+        average = self.linen.average_unit_cost
+
+        # Act
+        response = self.client.post(self.url, self._items('2'), format='json')
+
+        # Assert: cada lote se muestra al costo promedio con el que se valoró el total
+        material = response.data['items'][0]['materials'][0]
+        self.assertEqual([b['unit_cost'] for b in material['batches']], [f"{average:.6f}"] * 2)
+        self.assertEqual(material['cost'], f"{(20 * average).quantize(Decimal('0.01')):.2f}")
@@ -0,0 +1,124 @@
+# Fichero: production/tests/test_recost.py
+# Test Suite para el recálculo retroactivo de costos tras corregir el costo de un lote.
+
+from io import StringIO
+from decimal import Decimal
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.core.management import call_command
+from django.urls import reverse
+from users.models import User
+from tenants.models import Tenant
+from inventory.models import RawMaterial, PurchaseBatch
+from products.models import Product, RecipeIngredient
+from production.models import ProductionLog, ProductionConsumption
+from production.services import register_production_batch
+
+
+class RecostProductionTests(APITestCase):
+    """
+    Valida que corregir el costo de un lote ya consumido se propague a los registros
+    de producción que lo usaron (y solo a ellos), vía API y vía comando.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Panadería Central")
+        self.user = User.objects.create_user(
+            email='user@central.com', password='password123', tenant=self.tenant,
+            first_name='Usuario', last_name='A'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('production-recost')
+
+        # Harina: lote 1 de 5 kg a 2/kg y lote 2 de 10 kg a 3/kg. Sal: 10 kg a 1/kg.
+        self.flour = RawMaterial.objects.create(tenant=self.tenant, name="Harina", unit_of_measure='kg')
+        self.salt = RawMaterial.objects.create(tenant=self.tenant, name="Sal", unit_of_measure='kg')
+        self.flour_old = PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.flour,
+                                                      purchase_date='2025-01-01', quantity=Decimal('5'),
+                                                      total_cost=Decimal('10'))
+        PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.flour, purchase_date='2025-02-01',
+                                     quantity=Decimal('10'), total_cost=Decimal('30'))
+        PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.salt, purchase_date='2025-01-01',
+                                     quantity=Decimal('10'), total_cost=Decimal('10'))
+        bread = Product.objects.create(tenant=self.tenant, name="Pan")
+        RecipeIngredient.objects.create(product=bread, raw_material=self.flour, quantity=Decimal('2'))
+        RecipeIngredient.objects.create(product=bread, raw_material=self.salt, quantity=Decimal('0.5'))
+
+        # Producción 1: 4 kg del lote viejo (8.00) + 1 kg de sal = 9.00
+        # Producción 2: 1 kg del viejo (2.00) + 3 kg del nuevo (9.00) + 1 kg de sal = 12.00
+        # Producción 3: 4 kg del nuevo (12.00) + 1 kg de sal = 13.00 (no usa el lote viejo)
+        self.logs = [register_production_batch(self.user, bread.id, Decimal('2')) for _ in range(3)]
+
+    def _correct_old_invoice(self):
+        # La factura del lote viejo se corrige: 5 kg por 15.00 (3/kg en lugar de 2/kg)
+        self.flour_old.total_cost = Decimal('15')
+        self.flour_old.save()
+
+    def _costs(self):
+        return [ProductionLog.objects.get(pk=log.pk).total_cost for log in self.logs]
+
+    def test_recost_updates_only_logs_that_used_the_corrected_batch(self):
+        # Arrange
+        self._correct_old_invoice()
+
+        # Act
+        response = self.client.post(self.url, {}, format='json')
+
+        # Assert: +4.00 en la primera producción, +1.00 en la segunda
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['recosted'], 2)
+        self.assertEqual(response.data['total_difference'], "5.00")
+        self.assertEqual(self._costs(), [Decimal('13.00'), Decimal('13.00'), Decimal('13.00')])
+        # El libro queda al día: repetir el recálculo no encuentra nada
+        self.assertEqual(self.client.post(self.url, {}, format='json').data['recosted'], 0)
+
+    def test_dry_run_and_filters_do_not_touch_other_logs(self):
+        # Arrange
+        self._correct_old_invoice()
+
+        # Act
+        dry_run = self.client.post(self.url, {'dry_run': True}, format='json')
+        only_salt = self.client.post(self.url, {'raw_material_ids': [self.salt.id]}, format='json')
+
+        # Assert
+        self.assertEqual([c['new_cost'] for c in dry_run.data['production_logs']], ["13.00", "13.00"])
+        self.assertEqual(only_salt.data['recosted'], 0)
+        self.assertEqual(self._costs(), [Decimal('9.00'), Decimal('12.00'), Decimal('13.00')])
+
+    def test_large_values_do_not_overflow(self):
+        # Arrange: costo y cantidad cuyo producto en la escala entera no cabe en int64
+        huge_cost = Decimal('99999999.5')
+        PurchaseBatch.objects.filter(pk=self.flour_old.pk).update(unit_cost=huge_cost)
+        ProductionConsumption.objects.filter(production_log=self.logs[0], purchase_batch=self.flour_old).update(
+            quantity=Decimal('100000')
+        )
+
+        # Act
+        response = self.client.post(self.url, {'dry_run': True}, format='json')
+
+        # Assert: 100000 kg al costo corregido + 1 kg de sal, exacto
+        expected = (Decimal('100000') * huge_cost + Decimal('1')).quantize(Decimal('0.01'))
+        self.assertEqual(response.data['production_logs'][0]['new_cost'], f"{expected:.2f}")
+
+    def test_average_costing_tenant_is_rejected(self):
+        # Arrange
+        self.tenant.costing_method = Tenant.CostingMethod.AVERAGE
+        self.tenant.save()
+
+        # Act
+        response = self.client.post(self.url, {}, format='json')
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_management_command_recosts_tenant(self):
+        # Arrange
+        self._correct_old_invoice()
+        out = StringIO()
+
+        # Act
+        call_command('recost_production', '--tenant', str(self.tenant.id), stdout=out)
+
+        # Assert
+        self.assertIn('Re-costed 2 production log(s)', out.getvalue())
+        self.assertEqual(self._costs(), [Decimal('13.00'), Decimal('13.00'), Decimal('13.00')])
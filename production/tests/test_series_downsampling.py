@@ -0,0 +1,134 @@
+# Fichero: production/tests/test_series_downsampling.py
+# Test Suite para la reducción de series largas (?max_points=, LTTB) y su caché.
+
+from datetime import date, timedelta
+from decimal import Decimal
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from users.models import User
+from tenants.models import Tenant
+from inventory.models import RawMaterial, PurchaseBatch
+from products.models import Product, RecipeIngredient
+from production.downsampling import lttb_indices
+from production.models import ProductionRollup
+from production.services import register_production_batch
+
+
+class SeriesDownsamplingTests(APITestCase):
+    """
+    Valida que las series largas se reduzcan a `max_points` conservando extremos y
+    picos, y que el resultado se sirva desde caché hasta la siguiente producción.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.tenant = Tenant.objects.create(name="Panadería Central")
+        self.user = User.objects.create_user(
+            email='user@central.com', password='password123', tenant=self.tenant,
+            first_name='Usuario', last_name='A'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('production-series')
+
+        self.flour = RawMaterial.objects.create(tenant=self.tenant, name="Harina", unit_of_measure='kg')
+        PurchaseBatch.objects.create(tenant=self.tenant, raw_material=self.flour, purchase_date='2020-01-01',
+                                     quantity=Decimal('100'), total_cost=Decimal('200'))
+        self.bread = Product.objects.create(tenant=self.tenant, name="Pan")
+        self.cake = Product.objects.create(tenant=self.tenant, name="Pastel")
+        RecipeIngredient.objects.create(product=self.bread, raw_material=self.flour, quantity=Decimal('1'))
+
+    def _daily_rollups(self, product, first_day, days, spike_day=None):
+        ProductionRollup.objects.bulk_create([
+            ProductionRollup(tenant=self.tenant, product=product, day=first_day + timedelta(days=i),
+                             quantity_produced=Decimal('90') if i == spike_day else Decimal(i % 7),
+                             total_cost=Decimal(i % 7) * 2, production_count=1)
+            for i in range(days)
+        ])
+
+    def test_lttb_keeps_ends_and_peaks(self):
+        # Arrange: serie plana con un pico
+        values = [Decimal('1')] * 1000
+        values[613] = Decimal('50')
+
+        # Act
+        indices = lttb_indices(values, 20)
+
+        # Assert
+        self.assertEqual(len(indices), 20)
+        self.assertEqual((indices[0], indices[-1]), (0, 999))
+        self.assertIn(613, indices)
+        self.assertEqual(lttb_indices(values[:10], 20), list(range(10)))
+
+    def test_daily_series_are_reduced_per_product(self):
+        # Arrange: casi dos años de datos diarios (más que el límite sin reducción)
+        self._daily_rollups(self.bread, date(2023, 1, 1), 700, spike_day=400)
+        self._daily_rollups(self.cake, date(2023, 6, 1), 100)
+        params = {'products': f'{self.bread.id},{self.cake.id}', 'granularity': 'day',
+                  'date_from': '2022-01-01', 'date_to': '2024-12-31'}
+
+        # Act
+        response = self.client.get(self.url, {**params, 'max_points': 60})
+        full_response = self.client.get(self.url, params)
+
+        # Assert: cada serie trae sus propios períodos, con el inicio, el final y el pico
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('periods', response.data)
+        bread, cake = response.data['series']
+        self.assertEqual(len(bread['periods']), 60)
+        self.assertEqual(len(bread['quantity_produced']), len(bread['total_cost']))
+        self.assertEqual((bread['periods'][0], bread['periods'][-1]), ('2022-01-01', '2024-12-31'))
+        self.assertIn('2024-02-05', bread['periods'])
+        self.assertIn('90.00', bread['quantity_produced'])
+        self.assertLessEqual(len(cake['periods']), 60)
+        self.assertEqual(full_response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_reduced_series_are_cached_until_the_next_production(self):
+        # Arrange
+        self._daily_rollups(self.bread, date(2025, 1, 1), 200)
+        params = {'products': str(self.bread.id), 'granularity': 'day', 'date_from': '2025-01-01',
+                  'date_to': '2025-12-31', 'max_points': 20}
+        first = self.client.get(self.url, params)
+
+        # Act: la segunda lectura sale de caché; luego otro proceso (sin pasar por esta
+        # caché) corrige un día y registra una producción
+        with CaptureQueriesContext(connection) as queries:
+            cached = self.client.get(self.url, params)
+        # Se copian ya: las peticiones siguientes reinician el registro de consultas.
+        rollup_queries = [q['sql'] for q in queries if 'production_productionrollup' in q['sql']]
+        ProductionRollup.objects.filter(product=self.bread, day=date(2025, 3, 1)).update(
+            quantity_produced=Decimal('500')
+        )
+        register_production_batch(self.user, self.bread.id, Decimal('1'))
+        refreshed = self.client.get(self.url, params)
+
+        # Assert: la lectura en caché solo consulta la huella (sin agrupar por período),
+        # y la huella cambia con las escrituras de la base de datos
+        self.assertEqual(cached.data, first.data)
+        self.assertEqual(len(rollup_queries), 1)
+        self.assertNotIn('GROUP BY', rollup_queries[0])
+        self.assertNotIn('500.00', first.data['series'][0]['quantity_produced'])
+        self.assertIn('500.00', refreshed.data['series'][0]['quantity_produced'])
+
+    def test_stock_evolution_with_max_points(self):
+        # Arrange: cinco años de producción mensual
+        ProductionRollup.objects.bulk_create([
+            ProductionRollup(tenant=self.tenant, product=self.bread, day=date(2020 + i // 12, i % 12 + 1, 1),
+                             quantity_produced=Decimal('1'), total_cost=Decimal('2'), production_count=1)
+            for i in range(60)
+        ])
+        url = reverse('products-stock-evolution', args=[self.bread.id])
+
+        # Act
+        response = self.client.get(url, {'max_points': 12})
+        invalid = self.client.get(url, {'max_points': 2})
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['labels']), 12)
+        self.assertEqual((response.data['labels'][0], response.data['labels'][-1]), ("Jan 2020", "Dec 2024"))
+        self.assertEqual(response.data['data'][-1], Decimal('60.00'))
+        self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
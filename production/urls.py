@@ -1,8 +1,21 @@
 # production/urls.py
 
 from django.urls import path
-from .views import ProductionLogListCreateView
+from .views import (
+    ProductionLogListCreateView, ProductionLogBulkCreateView, ProductionPlanView,
+    ProductionSimulationView, ProductionLogConsumptionsView, ConsumptionReportView,
+    ProductionRecostView, ProductionJobCreateView, ProductionJobDetailView, ProductionSeriesView
+)
 
 urlpatterns = [
     path('', ProductionLogListCreateView.as_view(), name='production-log-list-create'),
+    path('bulk/', ProductionLogBulkCreateView.as_view(), name='production-log-bulk-create'),
+    path('plan/', ProductionPlanView.as_view(), name='production-plan'),
+    path('simulate/', ProductionSimulationView.as_view(), name='production-simulate'),
+    path('<int:pk>/consumptions/', ProductionLogConsumptionsView.as_view(), name='production-log-consumptions'),
+    path('consumption-report/', ConsumptionReportView.as_view(), name='production-consumption-report'),
+    path('recost/', ProductionRecostView.as_view(), name='production-recost'),
+    path('series/', ProductionSeriesView.as_view(), name='production-series'),
+    path('jobs/', ProductionJobCreateView.as_view(), name='production-job-create'),
+    path('jobs/<int:pk>/', ProductionJobDetailView.as_view(), name='production-job-detail'),
 ]
\ No newline at end of file
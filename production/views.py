@@ -6,10 +6,31 @@ from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.pagination import PageNumberPagination
 from rest_framework import filters
+from django.shortcuts import get_object_or_404
 
-from .serializers import ProductionRegistrationSerializer, ProductionLogSerializer
-from .services import register_production_batch, InsufficientStockError
-from .models import ProductionLog
+from .serializers import (
+    ProductionRegistrationSerializer, ProductionBulkRegistrationSerializer, ProductionPlanSerializer,
+    ProductionLogSerializer, ConsumptionReportQuerySerializer, ProductionConsumptionSerializer,
+    RecostSerializer, ProductionJobSerializer, ProductionSeriesQuerySerializer
+)
+from .planning import evaluate_production_plan, simulate_production
+from .jobs import enqueue_production
+from .recost import recost_production
+from .reports import consumption_report
+from .rollups import production_series
+from .services import register_production_batch, register_production_batches, InsufficientStockError
+from .models import ProductionLog, ProductionJob
+from tenants.idempotency import idempotent
+
+
+def _production_items(validated_items):
+    """
+    Tuplas (product_id, cantidad) de las líneas validadas y el dict {product_id: Product}
+    con los productos que el serializer ya cargó, para que el servicio no los vuelva a consultar.
+    """
+    items = [(item['product_id'].id, item['quantity_produced']) for item in validated_items]
+    products = {item['product_id'].id: item['product_id'] for item in validated_items}
+    return items, products
 
 
 class ProductionLogListCreateView(APIView):
@@ -35,6 +56,7 @@ class ProductionLogListCreateView(APIView):
         serializer = ProductionLogSerializer(paginated_logs, many=True)
         return paginator.get_paginated_response(serializer.data)
 
+    @idempotent
     def post(self, request, *args, **kwargs):
         # ... tu método post está perfecto, sin cambios ...
         registration_serializer = ProductionRegistrationSerializer(
@@ -44,18 +66,215 @@ class ProductionLogListCreateView(APIView):
         registration_serializer.is_valid(raise_exception=True)
 
         validated_data = registration_serializer.validated_data
-        product_id = validated_data['product_id']
+        product = validated_data['product_id']
         quantity_to_produce = validated_data['quantity_produced']
 
         try:
             production_log = register_production_batch(
                 user=request.user,
-                product_id=product_id,
-                quantity_to_produce=quantity_to_produce
+                product_id=product.id,
+                quantity_to_produce=quantity_to_produce,
+                product=product
             )
             response_serializer = ProductionLogSerializer(production_log)
             return Response(response_serializer.data, status=status.HTTP_201_CREATED)
         except InsufficientStockError as e:
             return Response(e.details, status=status.HTTP_400_BAD_REQUEST)
         except ValueError as e:
-            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ProductionLogBulkCreateView(APIView):
+    """
+    Registra varias producciones en una sola petición (todo o nada).
+
+    Payload: {"items": [{"product_id": 1, "quantity_produced": "10.00"}, ...]}
+    Si falta stock, la respuesta incluye TODAS las materias primas insuficientes.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        registration_serializer = ProductionBulkRegistrationSerializer(
+            data=request.data,
+            context={'request': request}
+        )
+        registration_serializer.is_valid(raise_exception=True)
+
+        items, products = _production_items(registration_serializer.validated_data['items'])
+
+        try:
+            production_logs = register_production_batches(user=request.user, items=items, products=products)
+            response_serializer = ProductionLogSerializer(production_logs, many=True)
+            return Response(response_serializer.data, status=status.HTTP_201_CREATED)
+        except InsufficientStockError as e:
+            return Response(e.details, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ProductionJobCreateView(APIView):
+    """
+    Encola una o varias producciones para registrarlas en segundo plano
+    (`python manage.py run_production_worker`) y responde al instante con 202.
+
+    Payload: el mismo que el registro masivo ({"items": [...]}).
+    El estado se consulta en `jobs/<id>/`; las producciones de una empresa se
+    procesan de a una, en orden de llegada.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        registration_serializer = ProductionBulkRegistrationSerializer(
+            data=request.data,
+            context={'request': request}
+        )
+        registration_serializer.is_valid(raise_exception=True)
+
+        items, _ = _production_items(registration_serializer.validated_data['items'])
+        job = enqueue_production(user=request.user, items=items)
+        return Response(ProductionJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class ProductionJobDetailView(APIView):
+    """
+    Estado de una producción encolada: pendiente, completada (con sus registros de
+    producción) o fallida (con el mismo error que devolvería el registro síncrono).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk, *args, **kwargs):
+        job = get_object_or_404(
+            ProductionJob.objects.prefetch_related('production_logs__product'),
+            pk=pk, tenant=request.user.tenant
+        )
+        return Response(ProductionJobSerializer(job).data)
+
+
+class ProductionPlanView(APIView):
+    """
+    Evalúa un plan de producción (MRP) sin bloquear ni modificar el inventario.
+
+    Payload: {"items": [{"product_id": 1, "quantity_produced": "10.00"}, ...]}
+             o {"plan": "1:10,2:3"}
+    Devuelve los requerimientos agregados por materia prima, el stock actual, el
+    faltante y el costo estimado según la estrategia y el método de costeo vigentes.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        plan_serializer = ProductionPlanSerializer(data=request.data, context={'request': request})
+        plan_serializer.is_valid(raise_exception=True)
+
+        items, products = _production_items(plan_serializer.validated_data['items'])
+
+        try:
+            return Response(evaluate_production_plan(request.user.tenant, items, products), status=status.HTTP_200_OK)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ProductionSimulationView(APIView):
+    """
+    Simula el costo de producir (cotización) a los precios de los lotes actuales,
+    sin bloquear ni modificar el inventario.
+
+    Payload: el mismo que el de los planes ({"items": [...]} o {"plan": "1:200"}).
+    Devuelve el costo total y, por producción, el desglose por materia prima y lote.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        simulation_serializer = ProductionPlanSerializer(data=request.data, context={'request': request})
+        simulation_serializer.is_valid(raise_exception=True)
+
+        items, products = _production_items(simulation_serializer.validated_data['items'])
+
+        try:
+            return Response(simulate_production(request.user.tenant, items, products), status=status.HTTP_200_OK)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ProductionLogConsumptionsView(APIView):
+    """
+    Trazabilidad de un registro de producción: los lotes de compra consumidos,
+    con su cantidad y costo unitario (libro de consumos).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk, *args, **kwargs):
+        production_log = get_object_or_404(ProductionLog, pk=pk, tenant=request.user.tenant)
+        consumptions = production_log.consumptions.select_related(
+            'raw_material', 'purchase_batch'
+        ).order_by('raw_material__name', 'id')
+        return Response(ProductionConsumptionSerializer(consumptions, many=True).data)
+
+
+class ConsumptionReportView(APIView):
+    """
+    Consumo y costo de ventas (COGS) por materia prima en un rango de fechas,
+    agregados en SQL sobre el libro de consumos.
+
+    Parámetros: ?date_from=AAAA-MM-DD&date_to=AAAA-MM-DD (opcionales, incluidos).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        query_serializer = ConsumptionReportQuerySerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        return Response(consumption_report(
+            request.user.tenant,
+            query_serializer.validated_data.get('date_from'),
+            query_serializer.validated_data.get('date_to')
+        ))
+
+
+class ProductionSeriesView(APIView):
+    """
+    Series de producción (cantidad y costo) de varios productos por día, semana o
+    mes, en la zona horaria de la empresa, leídas de los resúmenes diarios.
+
+    Parámetros: ?products=1,2,3&granularity=day|week|month (por defecto 'month')
+    &date_from=AAAA-MM-DD&date_to=AAAA-MM-DD (opcionales, incluidos)
+    &max_points=N (opcional: reduce cada serie con LTTB y la guarda en caché).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        query_serializer = ProductionSeriesQuerySerializer(data=request.query_params, context={'request': request})
+        query_serializer.is_valid(raise_exception=True)
+        data = query_serializer.validated_data
+
+        try:
+            return Response(production_series(
+                request.user.tenant, data['products'], data['granularity'],
+                data.get('date_from'), data.get('date_to'), data.get('max_points')
+            ))
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ProductionRecostView(APIView):
+    """
+    Recalcula el costo de las producciones que consumieron lotes cuyo costo se
+    corrigió después (ej. una factura de proveedor corregida). Solo costeo FIFO.
+
+    Payload: {"raw_material_ids": [1, 2], "since": "2025-01-01", "dry_run": true}
+    (todos opcionales). Con `dry_run` devuelve los cambios sin guardarlos.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        recost_serializer = RecostSerializer(data=request.data, context={'request': request})
+        recost_serializer.is_valid(raise_exception=True)
+        data = recost_serializer.validated_data
+
+        try:
+            result = recost_production(
+                request.user.tenant, data.get('raw_material_ids'), data.get('since'), data['dry_run']
+            )
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_200_OK)
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_allocation_strategies'),
+        ('products', '0002_recipeingredient'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='flattened_bom',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='Lista de Materiales Aplanada'),
+        ),
+        migrations.AddField(
+            model_name='recipeingredient',
+            name='component_product',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='used_in_recipes', to='products.product', verbose_name='Producto Componente'),
+        ),
+        migrations.AlterField(
+            model_name='recipeingredient',
+            name='raw_material',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='product_recipes', to='inventory.rawmaterial', verbose_name='Materia Prima'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipeingredient',
+            constraint=models.CheckConstraint(condition=models.Q(models.Q(('component_product__isnull', True), ('raw_material__isnull', False)), models.Q(('component_product__isnull', False), ('raw_material__isnull', True)), _connector='OR'), name='recipeingredient_material_xor_component'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipeingredient',
+            constraint=models.UniqueConstraint(condition=models.Q(('component_product__isnull', False)), fields=('product', 'component_product'), name='recipeingredient_unique_component'),
+        ),
+    ]
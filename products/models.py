@@ -1,6 +1,6 @@
 # products/models.py
 
-from django.db import models
+from django.db import models, transaction
 from tenants.models import Tenant
 from inventory.models import RawMaterial # Importación confirmada
 
@@ -17,6 +17,12 @@ class Product(models.Model):
         max_digits=10, decimal_places=2, default=0.00,
         verbose_name="Stock Disponible"
     )
+    # // Lista de materiales aplanada (caché): {raw_material_id: cantidad por unidad},
+    # // resolviendo recursivamente los sub-ensambles de la receta. Se recalcula al
+    # // cambiar cualquier receta de su árbol; NULL = pendiente de calcular
+    # // (ver products/services.py).
+    flattened_bom = models.JSONField(null=True, blank=True, editable=False,
+                                     verbose_name="Lista de Materiales Aplanada")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -32,7 +38,9 @@ class Product(models.Model):
 # --- NUEVO MODELO PARA HU-05 ---
 class RecipeIngredient(models.Model):
     """
-    Representa un ingrediente en la receta de un Producto Terminado.
+    Representa un ingrediente en la receta de un Producto Terminado: una materia
+    prima o, para recetas de varios niveles, otro producto (sub-ensamble) que se
+    fabrica con su propia receta.
     """
     product = models.ForeignKey(
         Product,
@@ -44,8 +52,19 @@ class RecipeIngredient(models.Model):
         RawMaterial,
         on_delete=models.PROTECT, # Seguridad: No permitir borrar una materia prima si está en una receta
         related_name="product_recipes",
+        null=True,
+        blank=True,
         verbose_name="Materia Prima"
     )
+    # // Sub-ensamble (ej. el cojín de un sofá). Excluyente con 'raw_material'.
+    component_product = models.ForeignKey(
+        Product,
+        on_delete=models.PROTECT,
+        related_name="used_in_recipes",
+        null=True,
+        blank=True,
+        verbose_name="Producto Componente"
+    )
     quantity = models.DecimalField(
         max_digits=10,
         decimal_places=2,
@@ -56,6 +75,36 @@ class RecipeIngredient(models.Model):
         unique_together = ('product', 'raw_material')
         verbose_name = "Ingrediente de Receta"
         verbose_name_plural = "Ingredientes de Receta"
+        constraints = [
+            models.CheckConstraint(
+                condition=(
+                    models.Q(raw_material__isnull=False, component_product__isnull=True)
+                    | models.Q(raw_material__isnull=True, component_product__isnull=False)
+                ),
+                name='recipeingredient_material_xor_component',
+            ),
+            models.UniqueConstraint(
+                fields=['product', 'component_product'],
+                condition=models.Q(component_product__isnull=False),
+                name='recipeingredient_unique_component',
+            ),
+        ]
 
     def __str__(self):
-        return f"{self.quantity} de {self.raw_material.name} para {self.product.name}"
+        component = self.raw_material or self.component_product
+        return f"{self.quantity} de {component.name} para {self.product.name}"
+
+    # La lista de materiales aplanada del producto y de todos los que lo usan como
+    # sub-ensamble cambia con cualquier cambio en la receta.
+    def save(self, *args, **kwargs):
+        from .services import refresh_flattened_boms
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            refresh_flattened_boms([self.product_id])
+
+    def delete(self, *args, **kwargs):
+        from .services import refresh_flattened_boms
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            refresh_flattened_boms([self.product_id])
+            return result
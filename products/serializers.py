@@ -1,6 +1,9 @@
 # products/serializers.py
+from django.db import transaction
 from rest_framework import serializers
 from .models import Product, RecipeIngredient
+from .services import RecipeCycleError, check_recipe_cycle, refresh_flattened_boms
+from inventory.fields import BulkResolvingListSerializer, TenantPrimaryKeyRelatedField
 from inventory.models import RawMaterial
 from tenants.models import Tenant
 
@@ -8,19 +11,45 @@ from tenants.models import Tenant
 class RecipeIngredientSerializer(serializers.ModelSerializer):
     # Para ESCRITURA: El frontend enviará el ID de la materia prima.
     # Cambiamos el source para que 'validated_data' contenga 'raw_material'
-    raw_material = serializers.PrimaryKeyRelatedField(
+    # Limitado a la empresa del usuario y resuelto en bloque para toda la receta.
+    raw_material = TenantPrimaryKeyRelatedField(
         queryset=RawMaterial.objects.all(),
-        write_only=True
+        write_only=True,
+        required=False,
+        allow_null=True
+    )
+    # O, en recetas de varios niveles, el ID de otro producto (sub-ensamble).
+    component_product = TenantPrimaryKeyRelatedField(
+        queryset=Product.objects.all(),
+        write_only=True,
+        required=False,
+        allow_null=True
     )
-    # Para LECTURA: El frontend recibirá detalles útiles de la materia prima.
-    id = serializers.IntegerField(source='raw_material.id', read_only=True)
-    name = serializers.CharField(source='raw_material.name', read_only=True)
-    unit_of_measure = serializers.CharField(source='raw_material.unit_of_measure', read_only=True)
+    # Para LECTURA: El frontend recibirá detalles útiles de la materia prima
+    # (nulos si el ingrediente es un sub-ensamble; ver 'component').
+    id = serializers.IntegerField(source='raw_material.id', read_only=True, allow_null=True)
+    name = serializers.CharField(source='raw_material.name', read_only=True, allow_null=True)
+    unit_of_measure = serializers.CharField(source='raw_material.unit_of_measure', read_only=True, allow_null=True)
+    component = serializers.SerializerMethodField()
 
     class Meta:
         model = RecipeIngredient
-        # 'raw_material' se usa para escribir, los otros para leer.
-        fields = ['id', 'raw_material', 'name', 'unit_of_measure', 'quantity']
+        # 'raw_material' y 'component_product' se usan para escribir, los otros para leer.
+        fields = ['id', 'raw_material', 'component_product', 'name', 'unit_of_measure', 'component', 'quantity']
+        # Un solo 'WHERE id IN (...) AND tenant_id = ...' por campo para toda la lista.
+        list_serializer_class = BulkResolvingListSerializer
+
+    def get_component(self, obj):
+        if obj.component_product_id is None:
+            return None
+        return {"id": obj.component_product_id, "name": obj.component_product.name}
+
+    def validate(self, data):
+        if (data.get('raw_material') is None) == (data.get('component_product') is None):
+            raise serializers.ValidationError(
+                "Cada ingrediente debe indicar una materia prima o un producto componente, no ambos."
+            )
+        return data
 
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -48,6 +77,12 @@ class ProductSerializer(serializers.ModelSerializer):
             )
         ]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # El listado del catálogo puede omitir la receta (ver ProductViewSet._include_recipe).
+        if not self.context.get('include_recipe', True):
+            self.fields.pop('recipe_ingredients')
+
     def validate_sale_price(self, value):
         if value is not None and value < 0:
             raise serializers.ValidationError("El precio de venta no puede ser negativo.")
@@ -57,32 +92,94 @@ class ProductSerializer(serializers.ModelSerializer):
         tenant = self.context['request'].user.tenant
         if not tenant:
             raise serializers.ValidationError("El usuario no tiene una empresa asociada.")
+        # La pertenencia a la empresa ya la garantizan los campos (TenantPrimaryKeyRelatedField).
+        component_ids = []
+        raw_material_ids = set()
         for ingredient in ingredients_data:
-            raw_material = ingredient['raw_material']
-            if raw_material.tenant != tenant:
-                raise serializers.ValidationError(
-                    f"La materia prima '{raw_material.name}' no pertenece a tu empresa."
-                )
+            raw_material = ingredient.get('raw_material')
+            if raw_material is not None:
+                if raw_material.id in raw_material_ids:
+                    raise serializers.ValidationError(
+                        f"La materia prima '{raw_material.name}' aparece más de una vez en la receta."
+                    )
+                raw_material_ids.add(raw_material.id)
+            component = ingredient.get('component_product')
+            if component is not None:
+                if component.id in component_ids:
+                    raise serializers.ValidationError(
+                        f"El producto '{component.name}' aparece más de una vez en la receta."
+                    )
+                component_ids.append(component.id)
+        try:
+            check_recipe_cycle(self.instance, component_ids)
+        except RecipeCycleError as exc:
+            raise serializers.ValidationError(str(exc))
         return ingredients_data
 
+    @staticmethod
+    def _ingredient_key(raw_material_id, component_product_id):
+        """Un ingrediente se identifica por su materia prima o por su sub-ensamble."""
+        if raw_material_id is not None:
+            return ('raw_material', raw_material_id)
+        return ('component', component_product_id)
+
+    def _sync_recipe(self, product, ingredients_data):
+        """
+        Aplica la receta recibida como diferencia contra las filas actuales: un
+        borrado filtrado, un `bulk_update` y un `bulk_create`. Los ingredientes que
+        siguen en la receta conservan su fila (y su id); solo se escriben los que
+        cambiaron de cantidad.
+
+        :return: True si la receta cambió.
+        """
+        current = {
+            self._ingredient_key(ingredient.raw_material_id, ingredient.component_product_id): ingredient
+            for ingredient in product.recipe_ingredients.all()
+        }
+        to_create, to_update = [], []
+        for ingredient_data in ingredients_data:
+            raw_material = ingredient_data.get('raw_material')
+            component = ingredient_data.get('component_product')
+            existing = current.pop(self._ingredient_key(
+                raw_material.id if raw_material else None, component.id if component else None
+            ), None)
+            if existing is None:
+                # 'ingredient_data' trae las instancias (raw_material / component_product)
+                # gracias a los PrimaryKeyRelatedField.
+                to_create.append(RecipeIngredient(product=product, **ingredient_data))
+            elif existing.quantity != ingredient_data['quantity']:
+                existing.quantity = ingredient_data['quantity']
+                to_update.append(existing)
+
+        # Primero el borrado: libera las restricciones únicas antes de insertar.
+        if current:
+            RecipeIngredient.objects.filter(id__in=[ingredient.id for ingredient in current.values()]).delete()
+        if to_update:
+            RecipeIngredient.objects.bulk_update(to_update, ['quantity'])
+        if to_create:
+            RecipeIngredient.objects.bulk_create(to_create)
+        return bool(current or to_update or to_create)
+
+    @transaction.atomic
     def create(self, validated_data):
         ingredients_data = validated_data.pop('recipe_ingredients', [])
         product = Product.objects.create(**validated_data)
-        for ingredient_data in ingredients_data:
-            RecipeIngredient.objects.create(product=product, **ingredient_data)
+        # Alta en bloque: la receta aplanada se calcula una sola vez al final.
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(product=product, **ingredient_data) for ingredient_data in ingredients_data
+        ])
+        refresh_flattened_boms([product.id])
         return product
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients_data = validated_data.pop('recipe_ingredients', None)
 
         instance = super().update(instance, validated_data)
 
-        if ingredients_data is not None:
-            instance.recipe_ingredients.all().delete()
-            for ingredient_data in ingredients_data:
-                # La clave en 'ingredient_data' es 'raw_material' gracias al PrimaryKeyRelatedField.
-                # El modelo espera 'raw_material' (la instancia) o 'raw_material_id' (el ID).
-                # Como 'ingredient_data' contiene la instancia del modelo, esto funciona.
-                RecipeIngredient.objects.create(product=instance, **ingredient_data)
+        if ingredients_data is not None and self._sync_recipe(instance, ingredients_data):
+            # Ni las escrituras en bloque ni el borrado filtrado pasan por
+            # RecipeIngredient.save() / delete().
+            refresh_flattened_boms([instance.id])
 
         return instance
\ No newline at end of file
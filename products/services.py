@@ -0,0 +1,173 @@
+# products/services.py
+
+from decimal import Decimal, ROUND_DOWN
+
+from inventory.models import RawMaterial
+from .models import Product, RecipeIngredient
+
+
+class RecipeCycleError(ValueError):
+    """La receta incluiría, directa o indirectamente, al propio producto."""
+
+
+def recipe_ancestor_ids(product_ids):
+    """
+    Ids de los productos indicados y de todos los que los usan, directa o
+    indirectamente, como sub-ensamble. Una consulta por nivel del árbol.
+    """
+    found = set(product_ids)
+    frontier = set(product_ids)
+    while frontier:
+        parents = set(RecipeIngredient.objects.filter(
+            component_product_id__in=frontier
+        ).values_list('product_id', flat=True))
+        frontier = parents - found
+        found |= frontier
+    return found
+
+
+def refresh_flattened_boms(product_ids):
+    """
+    Recalcula y guarda la lista de materiales aplanada de los productos indicados y
+    de todos sus ancestros. Debe llamarse tras cualquier cambio de receta que no pase
+    por `RecipeIngredient.save()` / `delete()` (p. ej. borrados o altas en bloque).
+
+    :raises RecipeCycleError: Si el cambio dejó un ciclo entre recetas.
+    """
+    products = list(Product.objects.filter(id__in=recipe_ancestor_ids(product_ids)))
+    for product in products:
+        product.flattened_bom = None
+    ensure_flattened_boms(products)
+
+
+def check_recipe_cycle(product, component_ids):
+    """
+    :raises RecipeCycleError: Si algún componente es el producto o uno de sus ancestros.
+    """
+    if product is None or not component_ids:
+        return
+    cyclic = set(component_ids) & recipe_ancestor_ids([product.id])
+    if cyclic:
+        raise RecipeCycleError(
+            "Un producto no puede incluirse a sí mismo (directa o indirectamente) en su receta."
+        )
+
+
+def _bom_to_json(totals):
+    return {str(rm_id): f"{quantity.normalize():f}" for rm_id, quantity in totals.items()}
+
+
+def flattened_recipe(product):
+    """Receta aplanada ya calculada: {raw_material_id: Decimal} por unidad de producto."""
+    return {int(rm_id): Decimal(quantity) for rm_id, quantity in (product.flattened_bom or {}).items()}
+
+
+def ensure_flattened_boms(products, save=True):
+    """
+    Garantiza que los productos indicados tengan su lista de materiales aplanada.
+
+    Las recetas guardadas con `RecipeIngredient.save()` o el API ya la dejan calculada;
+    solo falta (NULL) tras altas en bloque. Si todas están en caché no hace ninguna
+    consulta. Si no, carga las recetas del
+    árbol nivel a nivel (una consulta por nivel), las aplana en memoria y guarda
+    en bloque el resultado de cada producto recalculado, incluidos los sub-ensambles.
+
+    :param products: Iterable de Product (se actualiza su atributo `flattened_bom`).
+    :param save: Si es False, el resultado no se guarda (para lecturas sin escrituras).
+    :return: Dict {product_id: {raw_material_id: Decimal}}.
+    """
+    products = list(products)
+    stale = [product for product in products if product.flattened_bom is None]
+    if stale:
+        # 1. Recetas de todo el árbol de los productos obsoletos
+        rows = {}
+        loaded = set()
+        frontier = {product.id for product in stale}
+        while frontier:
+            loaded |= frontier
+            for product_id, rm_id, component_id, quantity in RecipeIngredient.objects.filter(
+                product_id__in=frontier
+            ).values_list('product_id', 'raw_material_id', 'component_product_id', 'quantity'):
+                rows.setdefault(product_id, []).append((rm_id, component_id, quantity))
+            frontier = {
+                component_id for product_id in frontier for _, component_id, _ in rows.get(product_id, [])
+                if component_id is not None
+            } - loaded
+
+        # 2. Aplanado recursivo con memoria
+        flattened = {}
+
+        def flatten(product_id, path=()):
+            if product_id in path:
+                raise RecipeCycleError("Se detectó un ciclo en las recetas de los productos.")
+            if product_id not in flattened:
+                totals = {}
+                for rm_id, component_id, quantity in rows.get(product_id, []):
+                    if rm_id is not None:
+                        totals[rm_id] = totals.get(rm_id, Decimal('0')) + quantity
+                    else:
+                        for sub_rm_id, sub_quantity in flatten(component_id, path + (product_id,)).items():
+                            totals[sub_rm_id] = totals.get(sub_rm_id, Decimal('0')) + quantity * sub_quantity
+                flattened[product_id] = totals
+            return flattened[product_id]
+
+        for product in stale:
+            product.flattened_bom = _bom_to_json(flatten(product.id))
+        if not save:
+            return {product.id: flattened_recipe(product) for product in products}
+        # También se guardan los sub-ensambles recalculados por el camino.
+        to_save = {product.id: product for product in stale}
+        for product_id, totals in flattened.items():
+            if product_id not in to_save:
+                to_save[product_id] = Product(id=product_id, flattened_bom=_bom_to_json(totals))
+        Product.objects.bulk_update(to_save.values(), ['flattened_bom'])
+    return {product.id: flattened_recipe(product) for product in products}
+
+
+def compute_production_capacity(tenant, products):
+    """
+    Calcula cuántas unidades de cada producto se pueden fabricar con el stock actual:
+    min(stock / cantidad en la receta aplanada) entre sus materias primas.
+
+    Con las listas de materiales aplanadas ya calculadas usa exactamente dos consultas, sin
+    importar cuántos productos haya: los productos y los contadores de stock de las
+    materias primas que aparecen en sus recetas. El mínimo se evalúa en una sola pasada
+    en memoria. Es una lectura: las listas que falten se aplanan sin guardarlas.
+
+    :param tenant: Empresa sobre la que se opera.
+    :param products: Queryset de productos a evaluar (ya filtrado por tenant).
+    :return: Lista de dicts, uno por producto con receta, ordenada por nombre.
+    """
+    products = list(products.order_by('name', 'id'))
+    boms = ensure_flattened_boms(products, save=False)
+    material_ids = {rm_id for bom in boms.values() for rm_id in bom}
+    materials = {
+        rm_id: (name, stock)
+        for rm_id, name, stock in RawMaterial.objects.filter(
+            tenant=tenant, id__in=material_ids
+        ).values_list('id', 'name', 'total_stock')
+    } if material_ids else {}
+
+    capacity = []
+    for product in products:
+        if not boms[product.id]:
+            continue
+        entry = {
+            "product_id": product.id,
+            "product_name": product.name,
+            "max_quantity": None,
+            "limiting_raw_material": None,
+        }
+        for rm_id, quantity in boms[product.id].items():
+            if quantity <= 0:
+                continue  # Un ingrediente sin cantidad no limita la producción.
+            name, stock = materials[rm_id]
+            producible = max(stock, Decimal('0')) / quantity
+            if entry["max_quantity"] is None or producible < entry["max_quantity"]:
+                entry["max_quantity"] = producible
+                entry["limiting_raw_material"] = {"id": rm_id, "name": name}
+        if entry["max_quantity"] is not None:
+            # Redondeamos hacia abajo: nunca prometer más de lo que se puede fabricar.
+            entry["max_quantity"] = f"{entry['max_quantity'].quantize(Decimal('0.01'), rounding=ROUND_DOWN):.2f}"
+        capacity.append(entry)
+    return capacity
@@ -0,0 +1,121 @@
+# Fichero: products/tests/test_multilevel_recipes.py
+# Test Suite para recetas de varios niveles (sub-ensambles) y su lista de materiales aplanada.
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.urls import reverse
+from users.models import User
+from tenants.models import Tenant
+from inventory.models import RawMaterial, PurchaseBatch
+from products.models import Product, RecipeIngredient
+from production.services import register_production_batch
+from decimal import Decimal
+
+
+class MultiLevelRecipeTests(APITestCase):
+    """
+    Valida que un sub-ensamble se traduzca a sus materias primas al producir, que
+    la caché de la receta aplanada se recalcule hacia arriba y que se rechacen ciclos.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Muebles del Valle")
+        self.user = User.objects.create_user(
+            email='user@valle.com', password='password123', tenant=self.tenant,
+            first_name='Usuario', last_name='A'
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.fabric = RawMaterial.objects.create(tenant=self.tenant, name="Tela", unit_of_measure='m')
+        self.foam = RawMaterial.objects.create(tenant=self.tenant, name="Espuma", unit_of_measure='kg')
+        self.wood = RawMaterial.objects.create(tenant=self.tenant, name="Madera", unit_of_measure='m²')
+        for material in (self.fabric, self.foam, self.wood):
+            PurchaseBatch.objects.create(tenant=self.tenant, raw_material=material, purchase_date='2025-01-01',
+                                         quantity=Decimal('100'), total_cost=Decimal('200'))
+
+        # Cojín = 1 tela + 2 espuma; Sofá = 3 cojines + 4 madera + 1 tela
+        self.cushion = Product.objects.create(tenant=self.tenant, name="Cojín")
+        RecipeIngredient.objects.create(product=self.cushion, raw_material=self.fabric, quantity=Decimal('1'))
+        RecipeIngredient.objects.create(product=self.cushion, raw_material=self.foam, quantity=Decimal('2'))
+        self.sofa = Product.objects.create(tenant=self.tenant, name="Sofá")
+        RecipeIngredient.objects.create(product=self.sofa, component_product=self.cushion, quantity=Decimal('3'))
+        RecipeIngredient.objects.create(product=self.sofa, raw_material=self.wood, quantity=Decimal('4'))
+        RecipeIngredient.objects.create(product=self.sofa, raw_material=self.fabric, quantity=Decimal('1'))
+
+    def test_production_consumes_flattened_raw_materials(self):
+        # Act
+        register_production_batch(self.user, self.sofa.id, Decimal('2'))
+
+        # Assert: 2 × (3 × (1 tela + 2 espuma) + 4 madera + 1 tela)
+        for material, used in ((self.fabric, '8'), (self.foam, '12'), (self.wood, '8')):
+            material.refresh_from_db()
+            self.assertEqual(material.total_stock, Decimal('100') - Decimal(used))
+        self.cushion.refresh_from_db()
+        self.assertEqual(self.cushion.stock, Decimal('0'))  # El sub-ensamble se fabrica, no se toma de stock.
+        self.sofa.refresh_from_db()
+        self.assertEqual(self.sofa.flattened_bom, {
+            str(self.fabric.id): '4', str(self.foam.id): '6', str(self.wood.id): '4'
+        })
+
+    def test_sub_assembly_change_refreshes_parent_cache(self):
+        # Arrange
+        register_production_batch(self.user, self.sofa.id, Decimal('1'))
+        url = reverse('products-detail', args=[self.cushion.id])
+
+        # Act: el cojín pasa a llevar 5 de espuma
+        response = self.client.patch(url, {'recipe_ingredients': [
+            {'raw_material': self.fabric.id, 'quantity': '1'},
+            {'raw_material': self.foam.id, 'quantity': '5'},
+        ]}, format='json')
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.sofa.refresh_from_db()
+        self.assertEqual(self.sofa.flattened_bom[str(self.foam.id)], '15')
+        register_production_batch(self.user, self.sofa.id, Decimal('1'))
+        self.foam.refresh_from_db()
+        self.assertEqual(self.foam.total_stock, Decimal('100') - Decimal('6') - Decimal('15'))
+
+    def test_recipe_cycle_is_rejected(self):
+        # Arrange
+        url = reverse('products-detail', args=[self.cushion.id])
+
+        # Act: el cojín no puede llevar sofás, que a su vez llevan cojines
+        response = self.client.patch(url, {'recipe_ingredients': [
+            {'component_product': self.sofa.id, 'quantity': '1'},
+        ]}, format='json')
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('recipe_ingredients', response.data)
+        self.assertEqual(self.cushion.recipe_ingredients.count(), 2)
+
+    def test_ingredient_requires_exactly_one_component(self):
+        # Act
+        response = self.client.patch(reverse('products-detail', args=[self.sofa.id]), {'recipe_ingredients': [
+            {'raw_material': self.wood.id, 'component_product': self.cushion.id, 'quantity': '1'},
+        ]}, format='json')
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_duplicate_raw_material_is_rejected(self):
+        # Act
+        response = self.client.patch(reverse('products-detail', args=[self.cushion.id]), {'recipe_ingredients': [
+            {'raw_material': self.foam.id, 'quantity': '1'},
+            {'raw_material': self.foam.id, 'quantity': '2'},
+        ]}, format='json')
+
+        # Assert: 400 en lugar del IntegrityError de unique_together
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('recipe_ingredients', response.data)
+        self.assertEqual(self.cushion.recipe_ingredients.count(), 2)
+
+    def test_sub_assembly_in_use_cannot_be_deleted(self):
+        # Act
+        response = self.client.delete(reverse('products-detail', args=[self.cushion.id]))
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertIn("sub-ensamble", response.data['detail'])
+        self.assertTrue(Product.objects.filter(pk=self.cushion.pk).exists())
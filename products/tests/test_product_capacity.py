@@ -0,0 +1,92 @@
+# Fichero: products/tests/test_product_capacity.py
+# Test Suite para el endpoint de capacidad de producción (/api/v1/products/capacity/).
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from users.models import User
+from tenants.models import Tenant
+from inventory.models import RawMaterial, PurchaseBatch
+from products.models import Product, RecipeIngredient
+from decimal import Decimal
+
+
+class ProductCapacityTests(APITestCase):
+    """
+    Valida el cálculo de min(stock / cantidad en receta), el aislamiento por tenant
+    y que el número de consultas no dependa del número de productos.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Carpintería Norte")
+        self.user = User.objects.create_user(
+            email='user@norte.com', password='password123', tenant=self.tenant,
+            first_name='Usuario', last_name='A'
+        )
+        self.other_tenant = Tenant.objects.create(name="Otra Empresa")
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('products-capacity')
+
+        self.wood = RawMaterial.objects.create(tenant=self.tenant, name="Madera", unit_of_measure='m²')
+        self.screws = RawMaterial.objects.create(tenant=self.tenant, name="Tornillos", unit_of_measure='u')
+        for material, quantity in ((self.wood, '10'), (self.screws, '25')):
+            PurchaseBatch.objects.create(tenant=self.tenant, raw_material=material, purchase_date='2025-01-01',
+                                         quantity=Decimal(quantity), total_cost=Decimal('1'))
+
+    def _product(self, name, tenant=None, **recipe):
+        product = Product.objects.create(tenant=tenant or self.tenant, name=name)
+        for material, quantity in recipe.items():
+            RecipeIngredient.objects.create(product=product, raw_material=getattr(self, material),
+                                            quantity=Decimal(quantity))
+        return product
+
+    def test_capacity_is_min_over_ingredients(self):
+        # Arrange: mesa limitada por tornillos (25 / 8), silla por madera (10 / 3)
+        self._product("Mesa", wood='2', screws='8')
+        self._product("Silla", wood='3', screws='4')
+        self._product("Sin Receta")
+        self._product("Ajeno", tenant=self.other_tenant)
+
+        # Act
+        response = self.client.get(self.url)
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(p['product_name'], p['max_quantity'], p['limiting_raw_material']['name'])
+                          for p in response.data],
+                         [("Mesa", "3.12", "Tornillos"), ("Silla", "3.33", "Madera")])
+
+    def test_query_count_does_not_grow_with_products(self):
+        # Arrange
+        for i in range(30):
+            self._product(f"Producto {i}", wood='1', screws='1')
+
+        # Act
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+
+        # Assert: usuario/autenticación aparte, stock y recetas en dos consultas
+        self.assertEqual(len(response.data), 30)
+        self.assertLessEqual(len(queries), 2)
+
+    def test_capacity_is_read_only_and_loads_only_recipe_materials(self):
+        # Arrange: listas de materiales sin calcular (como tras un alta en bloque)
+        # y una materia prima que no está en ninguna receta
+        product = self._product("Mesa", wood='2', screws='8')
+        Product.objects.filter(pk=product.pk).update(flattened_bom=None)
+        RawMaterial.objects.create(tenant=self.tenant, name="Pintura", unit_of_measure='l')
+
+        # Act
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+
+        # Assert: un GET no escribe, y solo se leen las materias primas de las recetas
+        self.assertEqual(response.data[0]['max_quantity'], "3.12")
+        statements = [q['sql'] for q in queries]
+        self.assertFalse([sql for sql in statements if sql.startswith(('UPDATE', 'INSERT', 'DELETE'))])
+        lookup, = [sql for sql in statements if 'FROM "inventory_rawmaterial"' in sql]
+        self.assertIn(' IN (', lookup)
+        product.refresh_from_db()
+        self.assertIsNone(product.flattened_bom)
@@ -0,0 +1,89 @@
+# Fichero: products/tests/test_product_listing_queries.py
+# Test Suite para el listado de productos con la receta precargada (sin consultas N+1).
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from users.models import User
+from tenants.models import Tenant
+from inventory.models import RawMaterial
+from products.models import Product, RecipeIngredient
+from decimal import Decimal
+
+
+class ProductListingQueryTests(APITestCase):
+    """
+    Valida que el listado y el detalle de productos carguen las recetas con un número
+    fijo de consultas y que el catálogo omita la receta salvo con `?include=recipe`.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Carpintería Norte")
+        self.user = User.objects.create_user(
+            email='user@norte.com', password='password123', tenant=self.tenant,
+            first_name='Usuario', last_name='A'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('products-list')
+
+        self.materials = [
+            RawMaterial.objects.create(tenant=self.tenant, name=f"Material {i}", unit_of_measure='u')
+            for i in range(3)
+        ]
+        self.base = Product.objects.create(tenant=self.tenant, name="Base")
+        RecipeIngredient.objects.create(product=self.base, raw_material=self.materials[0], quantity=Decimal('1'))
+
+    def _create_products(self, count, start=0):
+        for i in range(start, start + count):
+            product = Product.objects.create(tenant=self.tenant, name=f"Producto {i:02d}")
+            for material in self.materials:
+                RecipeIngredient.objects.create(product=product, raw_material=material, quantity=Decimal('2'))
+            RecipeIngredient.objects.create(product=product, component_product=self.base, quantity=Decimal('1'))
+
+    def _count_queries(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries), response
+
+    def test_list_with_recipe_uses_fixed_queries_per_page(self):
+        # Arrange
+        self._create_products(2)
+        small_count, _ = self._count_queries(self.url, {'include': 'recipe'})
+        self._create_products(4, start=2)
+
+        # Act: la página (6 productos, 4 ingredientes cada uno) sale con las mismas consultas
+        full_count, response = self._count_queries(self.url, {'include': 'recipe'})
+
+        # Assert: COUNT de la paginación + productos + ingredientes (con materia prima y componente)
+        self.assertEqual(full_count, 3)
+        self.assertEqual(small_count, full_count)
+        product = response.data['results'][1]
+        self.assertEqual([(i['name'], i['component']) for i in product['recipe_ingredients']][-1],
+                         (None, {"id": self.base.id, "name": "Base"}))
+
+    def test_catalogue_listing_skips_ingredients(self):
+        # Arrange
+        self._create_products(5)
+
+        # Act
+        query_count, response = self._count_queries(self.url, {})
+
+        # Assert
+        self.assertEqual(query_count, 2)
+        self.assertNotIn('recipe_ingredients', response.data['results'][0])
+
+    def test_detail_always_includes_recipe(self):
+        # Arrange
+        self._create_products(1)
+        product = Product.objects.get(name="Producto 00")
+
+        # Act
+        query_count, response = self._count_queries(reverse('products-detail', args=[product.id]), {})
+
+        # Assert
+        self.assertEqual(query_count, 2)
+        self.assertEqual([i['name'] for i in response.data['recipe_ingredients']],
+                         ["Material 0", "Material 1", "Material 2", None])
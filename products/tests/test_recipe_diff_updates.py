@@ -0,0 +1,94 @@
+# Fichero: products/tests/test_recipe_diff_updates.py
+# Test Suite para la actualización de recetas por diferencias (sin borrar y recrear).
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from users.models import User
+from tenants.models import Tenant
+from inventory.models import RawMaterial
+from products.models import Product, RecipeIngredient
+from decimal import Decimal
+
+
+class RecipeDiffUpdateTests(APITestCase):
+    """
+    Valida que al editar una receta los ingredientes que se mantienen conserven su
+    fila, que solo se escriba lo que cambió y que la receta aplanada quede al día.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Muebles del Valle")
+        self.user = User.objects.create_user(
+            email='user@valle.com', password='password123', tenant=self.tenant,
+            first_name='Usuario', last_name='A'
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.fabric = RawMaterial.objects.create(tenant=self.tenant, name="Tela", unit_of_measure='m')
+        self.foam = RawMaterial.objects.create(tenant=self.tenant, name="Espuma", unit_of_measure='kg')
+        self.wood = RawMaterial.objects.create(tenant=self.tenant, name="Madera", unit_of_measure='m²')
+        self.cushion = Product.objects.create(tenant=self.tenant, name="Cojín")
+        RecipeIngredient.objects.create(product=self.cushion, raw_material=self.foam, quantity=Decimal('2'))
+
+        self.sofa = Product.objects.create(tenant=self.tenant, name="Sofá")
+        self.fabric_line = RecipeIngredient.objects.create(product=self.sofa, raw_material=self.fabric,
+                                                           quantity=Decimal('1'))
+        self.wood_line = RecipeIngredient.objects.create(product=self.sofa, raw_material=self.wood,
+                                                         quantity=Decimal('4'))
+        self.foam_line = RecipeIngredient.objects.create(product=self.sofa, raw_material=self.foam,
+                                                         quantity=Decimal('1'))
+        self.url = reverse('products-detail', args=[self.sofa.id])
+
+    def _patch_recipe(self, recipe):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.url, {'recipe_ingredients': recipe}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [q['sql'] for q in queries if 'products_recipeingredient' in q['sql']]
+
+    def test_update_keeps_unchanged_rows_and_applies_diff(self):
+        # Act: la tela se mantiene, la madera cambia, la espuma sale y entra el cojín
+        self._patch_recipe([
+            {'raw_material': self.fabric.id, 'quantity': '1'},
+            {'raw_material': self.wood.id, 'quantity': '5'},
+            {'component_product': self.cushion.id, 'quantity': '3'},
+        ])
+
+        # Assert
+        lines = RecipeIngredient.objects.filter(product=self.sofa)
+        self.assertEqual(lines.get(raw_material=self.fabric).pk, self.fabric_line.pk)
+        self.assertEqual(lines.get(raw_material=self.wood).pk, self.wood_line.pk)
+        self.assertEqual(lines.get(raw_material=self.wood).quantity, Decimal('5'))
+        self.assertFalse(RecipeIngredient.objects.filter(pk=self.foam_line.pk).exists())
+        self.assertEqual(lines.get(component_product=self.cushion).quantity, Decimal('3'))
+        # 1 tela + 5 madera + 3 × 2 espuma (del cojín)
+        self.sofa.refresh_from_db()
+        self.assertEqual(self.sofa.flattened_bom, {
+            str(self.fabric.id): '1', str(self.wood.id): '5', str(self.foam.id): '6'
+        })
+
+    def test_diff_is_written_with_one_statement_per_kind(self):
+        # Act
+        statements = self._patch_recipe([
+            {'raw_material': self.fabric.id, 'quantity': '2'},
+            {'raw_material': self.wood.id, 'quantity': '5'},
+            {'component_product': self.cushion.id, 'quantity': '3'},
+        ])
+
+        # Assert: un DELETE, un UPDATE (las dos cantidades) y un INSERT
+        writes = [sql.split()[0] for sql in statements if not sql.startswith('SELECT')]
+        self.assertEqual(sorted(writes), ['DELETE', 'INSERT', 'UPDATE'])
+
+    def test_unchanged_recipe_writes_nothing(self):
+        # Act
+        statements = self._patch_recipe([
+            {'raw_material': self.fabric.id, 'quantity': '1.00'},
+            {'raw_material': self.wood.id, 'quantity': '4'},
+            {'raw_material': self.foam.id, 'quantity': '1'},
+        ])
+
+        # Assert
+        self.assertTrue(all(sql.startswith('SELECT') for sql in statements))
+        self.assertEqual(RecipeIngredient.objects.filter(product=self.sofa).count(), 3)
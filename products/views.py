@@ -5,7 +5,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 # --- NUEVAS IMPORTACIONES PARA LA HU-7.1 ---
-from django.db.models import Sum
+from django.db.models import Prefetch, Sum
 from django.db.models.functions import TruncMonth
 from decimal import Decimal
 # --- FIN DE NUEVAS IMPORTACIONES ---
@@ -15,8 +15,11 @@ from decimal import Decimal
 from .serializers import ProductSerializer, serializers
 # --- FIN DE LIMPIEZA ---
 
-from .models import Product
+from .models import Product, RecipeIngredient
+from .services import compute_production_capacity
 from inventory.views import BaseTenantViewSet
+from production.rollups import cached_series, downsample
+from production.serializers import SeriesDownsamplingQuerySerializer
 
 
 class ProductViewSet(BaseTenantViewSet):
@@ -25,19 +28,43 @@ class ProductViewSet(BaseTenantViewSet):
     """
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    protected_delete_message = (
+        "No se puede eliminar el producto: tiene historial de producción o es sub-ensamble de otra receta."
+    )
 
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'description', 'category']
     ordering_fields = ['name', 'sale_price', 'stock', 'created_at']
     ordering = ['name']
 
+    def _include_recipe(self):
+        """
+        El detalle siempre incluye la receta; el listado del catálogo solo con
+        `?include=recipe`, para no cargar los ingredientes de cada producto.
+        """
+        if self.action != 'list':
+            return True
+        return 'recipe' in self.request.query_params.get('include', '').split(',')
+
     def get_queryset(self):
         queryset = super().get_queryset()
         category = self.request.query_params.get('category')
         if category:
             queryset = queryset.filter(category__iexact=category)
+        if self.action in ('list', 'retrieve') and self._include_recipe():
+            # Una sola consulta para los ingredientes de toda la página (con su materia
+            # prima o sub-ensamble), en lugar de una por producto y otra por ingrediente.
+            queryset = queryset.prefetch_related(Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related('raw_material', 'component_product')
+            ))
         return queryset
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['include_recipe'] = self._include_recipe()
+        return context
+
     @action(detail=False, methods=['get'])
     def categories(self, request):
         """Devuelve una lista de nombres de categorías únicas."""
@@ -45,6 +72,17 @@ class ProductViewSet(BaseTenantViewSet):
         categories = qs.order_by('category').values_list('category', flat=True).distinct()
         return Response(categories)
 
+    @action(detail=False, methods=['get'])
+    def capacity(self, request):
+        """
+        Cantidad máxima fabricable de cada producto con receta, con el stock actual.
+
+        Respeta los filtros del listado (búsqueda y categoría). Para cada producto
+        indica también la materia prima que limita la producción.
+        """
+        products = self.filter_queryset(self.get_queryset())
+        return Response(compute_production_capacity(request.user.tenant, products))
+
     def create(self, request, *args, **kwargs):
         data = request.data.copy()
         if hasattr(request.user, 'tenant') and request.user.tenant is not None:
@@ -78,32 +116,46 @@ class ProductViewSet(BaseTenantViewSet):
             instance._prefetched_objects_cache = {}
         return Response(serializer.data)
 
-    def destroy(self, request, *args, **kwargs):
-        instance = self.get_object()
-        self.perform_destroy(instance)
-        return Response(status=status.HTTP_204_NO_CONTENT)
-
-    def perform_destroy(self, instance):
-        instance.delete()
-
     # --- NUEVA ACCIÓN PARA HU-7.1: GRÁFICO DE EVOLUCIÓN DE STOCK ---
     @action(detail=True, methods=['get'])
     def stock_evolution(self, request, pk=None):
         """
         Calcula la evolución del stock acumulado de un producto a lo largo del tiempo.
 
-        Agrupa los registros de producción por mes y devuelve una serie de datos
-        lista para ser consumida por una librería de gráficos.
+        Agrupa por mes los resúmenes diarios de producción (ver production/rollups.py;
+        meses en la zona horaria de la empresa) y devuelve una serie de datos lista
+        para ser consumida por una librería de gráficos. Para varios productos o
+        granularidad diaria/semanal, ver /api/v1/production-logs/series/.
+
+        Con ?max_points=N la serie se reduce con LTTB a lo sumo a N puntos y el
+        resultado se guarda en caché por (producto, N).
         """
+        query_serializer = SeriesDownsamplingQuerySerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        max_points = query_serializer.validated_data.get('max_points')
+
         # PRINCIPIO: Reutilizamos get_object() para obtener el producto.
         # Esto asegura que se aplique el filtro de tenant, previniendo
         # que un usuario pueda ver datos de un producto que no le pertenece.
         product = self.get_object()
+        if max_points is None:
+            return Response(self._stock_evolution(product), status=status.HTTP_200_OK)
+
+        def compute():
+            evolution = self._stock_evolution(product)
+            evolution["labels"], (evolution["data"],) = downsample(evolution["labels"], [evolution["data"]], max_points)
+            return evolution
 
-        # Realizamos una única y eficiente consulta a la base de datos.
-        monthly_production = product.production_logs.annotate(
-            # Truncamos la fecha al primer día del mes para poder agrupar.
-            month=TruncMonth('production_date')
+        response_data = cached_series(request.user.tenant, [product.id], ('stock-evolution', max_points), compute)
+        return Response(response_data, status=status.HTTP_200_OK)
+
+    def _stock_evolution(self, product):
+        """Stock acumulado del producto por mes: {"labels": [...], "data": [...]}."""
+        # Realizamos una única y eficiente consulta sobre los resúmenes diarios
+        # (a lo sumo ~31 filas por mes, en lugar de todos los registros de producción).
+        monthly_production = product.production_rollups.annotate(
+            # Truncamos el día al primero del mes para poder agrupar.
+            month=TruncMonth('day')
         ).values(
             # Agrupamos por el mes truncado.
             'month'
@@ -126,10 +178,8 @@ class ProductViewSet(BaseTenantViewSet):
             labels.append(item['month'].strftime('%b %Y'))
             data.append(cumulative_stock)
 
-        response_data = {
+        return {
             "labels": labels,
             "data": data
         }
-
-        return Response(response_data, status=status.HTTP_200_OK)
     # --- FIN DE NUEVA ACCIÓN ---
\ No newline at end of file
@@ -0,0 +1,135 @@
+# tenants/idempotency.py
+"""
+Soporte de la cabecera `Idempotency-Key` para los POST que modifican stock
+(registro de producción y compras de lotes).
+
+El primer POST con una clave la reserva para la empresa (fila de
+`IdempotencyRecord` sin respuesta), ejecuta la vista y guarda la respuesta si fue
+exitosa (2xx) en la misma transacción que el servicio: o se confirman los cambios
+de stock junto con la respuesta, o no se confirma ninguno de los dos. Las
+repeticiones con la misma clave y el mismo contenido reciben esa respuesta
+guardada, con la cabecera `Idempotent-Replayed: true`, sin volver a ejecutar el
+servicio ni tomar bloqueos. Una respuesta de error revierte la transacción y
+libera la clave, así que reintentar es seguro.
+
+- Misma clave con otro contenido (ruta o cuerpo): 422.
+- Misma clave mientras la original aún se procesa: 409. La petición en curso
+  mantiene bloqueada su reserva hasta confirmar; una reserva sin respuesta con más
+  de `settings.IDEMPOTENCY_IN_PROGRESS_LEASE` segundos (60 por defecto) y sin
+  bloquear es de un proceso que murió (SIGKILL, timeout del servidor) sin confirmar
+  nada, y el reintento la reemplaza en lugar de recibir 409 hasta que venza la
+  clave. Si aun así la petición original llega al final sin su reserva, revierte
+  su trabajo y responde 409: nunca se confirman dos ejecuciones de la misma clave.
+- Las claves expiran a los `settings.IDEMPOTENCY_KEY_TTL` segundos (24 h por defecto);
+  `python manage.py purge_idempotency_keys` elimina las vencidas.
+"""
+
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyRecord
+
+HEADER = 'Idempotency-Key'
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f"{request.method} {request.path}\n{body}".encode()).hexdigest()
+
+
+def _claim(tenant, key, fingerprint):
+    """
+    Reserva la clave para esta petición.
+
+    :return: Tupla (record, created). Si la clave ya existía (y no ha vencido),
+             `created` es False y `record` es el registro existente (o None si
+             desapareció entre medio porque la petición original falló).
+    """
+    now = timezone.now()
+    lease = timedelta(seconds=getattr(settings, 'IDEMPOTENCY_IN_PROGRESS_LEASE', 60))
+    # Claves vencidas y reservas abandonadas (sin respuesta tras el plazo y sin el
+    # bloqueo de la petición que las creó: su trabajo no pudo haberse confirmado).
+    with transaction.atomic():
+        stale = IdempotencyRecord.objects.select_for_update(skip_locked=True).filter(
+            Q(expires_at__lte=now) | Q(status_code__isnull=True, created_at__lte=now - lease),
+            tenant=tenant, key=key
+        )
+        IdempotencyRecord.objects.filter(pk__in=list(stale.values_list('pk', flat=True))).delete()
+    try:
+        # Savepoint propio: el choque con la restricción única no debe romper una transacción externa.
+        with transaction.atomic():
+            record = IdempotencyRecord.objects.create(
+                tenant=tenant, key=key, request_fingerprint=fingerprint,
+                expires_at=now + timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+            )
+        return record, True
+    except IntegrityError:
+        return IdempotencyRecord.objects.filter(tenant=tenant, key=key).first(), False
+
+
+def _in_progress():
+    return Response({"detail": "Una petición con esta clave de idempotencia se está procesando."},
+                    status=status.HTTP_409_CONFLICT)
+
+
+def idempotent(handler):
+    """
+    Decorador para métodos POST de vistas DRF (`post` o `create`). Sin cabecera
+    `Idempotency-Key`, o si el usuario no tiene empresa, la vista se ejecuta igual que siempre.
+    """
+
+    @functools.wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        tenant = getattr(request.user, 'tenant', None)
+        if not key or tenant is None:
+            return handler(self, request, *args, **kwargs)
+        if len(key) > IdempotencyRecord._meta.get_field('key').max_length:
+            return Response({"detail": f"La cabecera {HEADER} no puede superar los 255 caracteres."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = _fingerprint(request)
+        record, created = _claim(tenant, key, fingerprint)
+        if not created:
+            if record is not None and record.request_fingerprint != fingerprint:
+                return Response({"detail": f"La {HEADER} ya se usó con una petición distinta."},
+                                status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+            if record is None or record.status_code is None:
+                return _in_progress()
+            return Response(record.response_body, status=record.status_code,
+                            headers={'Idempotent-Replayed': 'true'})
+
+        response = None
+        try:
+            with transaction.atomic():
+                # La reserva queda bloqueada hasta confirmar: otro reintento no la da por abandonada.
+                if IdempotencyRecord.objects.select_for_update().filter(pk=record.pk).first() is not None:
+                    response = handler(self, request, *args, **kwargs)
+                    if status.is_success(response.status_code):
+                        # Sin fila que actualizar, otra petición reemplazó la reserva.
+                        stored = IdempotencyRecord.objects.filter(pk=record.pk).update(
+                            status_code=response.status_code, response_body=response.data
+                        )
+                        if not stored:
+                            response = None
+                if response is None or not status.is_success(response.status_code):
+                    transaction.set_rollback(True)
+        except BaseException:
+            record.delete()
+            raise
+        if response is None:
+            return _in_progress()
+        if not status.is_success(response.status_code):
+            record.delete()
+        return response
+
+    return wrapper
@@ -0,0 +1,13 @@
+# tenants/management/commands/purge_idempotency_keys.py
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tenants.models import IdempotencyRecord
+
+
+class Command(BaseCommand):
+    help = 'Deletes expired Idempotency-Key records (see settings.IDEMPOTENCY_KEY_TTL).'
+
+    def handle(self, *args, **options):
+        deleted, _ = IdempotencyRecord.objects.filter(expires_at__lte=timezone.now()).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired idempotency record(s).'))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tenant',
+            name='costing_method',
+            field=models.CharField(choices=[('fifo', 'FIFO (Primero en Entrar, Primero en Salir)'), ('average', 'Costo Promedio Ponderado')], default='fifo', max_length=10, verbose_name='Método de Costeo'),
+        ),
+    ]
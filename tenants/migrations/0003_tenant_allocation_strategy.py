@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0002_tenant_costing_method'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tenant',
+            name='allocation_strategy',
+            field=models.CharField(choices=[('fifo', 'FIFO (Primero en Entrar, Primero en Salir)'), ('fefo', 'FEFO (Primero en Vencer, Primero en Salir)'), ('lifo', 'LIFO (Último en Entrar, Primero en Salir)')], default='fifo', max_length=10, verbose_name='Estrategia de Consumo de Lotes'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:51
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0003_tenant_allocation_strategy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, verbose_name='Clave de Idempotencia')),
+                ('request_fingerprint', models.CharField(max_length=64, verbose_name='Huella de la Petición')),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Código de Estado')),
+                ('response_body', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='Respuesta')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Expira')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='idempotency_records', to='tenants.tenant', verbose_name='Empresa')),
+            ],
+            options={
+                'verbose_name': 'Registro de Idempotencia',
+                'verbose_name_plural': 'Registros de Idempotencia',
+                'constraints': [models.UniqueConstraint(fields=('tenant', 'key'), name='idempotencyrecord_unique_key')],
+            },
+        ),
+    ]
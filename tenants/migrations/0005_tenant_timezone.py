@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:05
+
+import tenants.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0004_idempotencyrecord'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tenant',
+            name='timezone',
+            field=models.CharField(default='America/Managua', max_length=64, validators=[tenants.models.validate_timezone], verbose_name='Zona Horaria'),
+        ),
+    ]
@@ -1,10 +1,95 @@
+import zoneinfo
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
+
+def validate_timezone(value):
+    """Valida que el valor sea un nombre de zona horaria IANA (ej. 'America/Managua')."""
+    try:
+        zoneinfo.ZoneInfo(value)
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+        raise ValidationError(f"'{value}' no es una zona horaria válida.")
+
+
 class Tenant(models.Model):
+    class CostingMethod(models.TextChoices):
+        FIFO = 'fifo', 'FIFO (Primero en Entrar, Primero en Salir)'
+        AVERAGE = 'average', 'Costo Promedio Ponderado'
+
+    class AllocationStrategy(models.TextChoices):
+        FIFO = 'fifo', 'FIFO (Primero en Entrar, Primero en Salir)'
+        FEFO = 'fefo', 'FEFO (Primero en Vencer, Primero en Salir)'
+        LIFO = 'lifo', 'LIFO (Último en Entrar, Primero en Salir)'
+
     name = models.CharField(max_length=255, unique=True, verbose_name="Nombre de la Empresa")
+    # // Cómo se valora el consumo de materias primas en la producción. En ambos casos
+    # // las cantidades se descuentan de los lotes en orden FIFO; solo cambia el costo.
+    costing_method = models.CharField(
+        max_length=10,
+        choices=CostingMethod.choices,
+        default=CostingMethod.FIFO,
+        verbose_name="Método de Costeo"
+    )
+    # // Orden en que la producción consume los lotes de compra. Cada materia prima
+    # // puede sobrescribirlo (ver RawMaterial.allocation_strategy).
+    allocation_strategy = models.CharField(
+        max_length=10,
+        choices=AllocationStrategy.choices,
+        default=AllocationStrategy.FIFO,
+        verbose_name="Estrategia de Consumo de Lotes"
+    )
+    # // Zona horaria de la empresa: define a qué día, semana o mes pertenece cada
+    # // producción en los reportes y gráficos (ver production/rollups.py).
+    timezone = models.CharField(
+        max_length=64,
+        default=settings.TIME_ZONE,
+        validators=[validate_timezone],
+        verbose_name="Zona Horaria"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
+    @property
+    def tzinfo(self):
+        """Zona horaria de la empresa como objeto `ZoneInfo`."""
+        return zoneinfo.ZoneInfo(self.timezone)
+
+
+class IdempotencyRecord(models.Model):
+    """
+    Respuesta guardada de una petición POST con cabecera `Idempotency-Key`, por empresa.
+
+    Si el cliente repite la petición con la misma clave (p. ej. reintentos por una red
+    inestable), se devuelve esta respuesta sin volver a ejecutar el servicio ni tomar
+    bloqueos. Ver tenants/idempotency.py.
+    """
+    tenant = models.ForeignKey(
+        Tenant,
+        on_delete=models.CASCADE,
+        related_name="idempotency_records",
+        verbose_name="Empresa"
+    )
+    key = models.CharField(max_length=255, verbose_name="Clave de Idempotencia")
+    # // Huella (SHA-256) de la ruta y el cuerpo: la misma clave con otro contenido es un error.
+    request_fingerprint = models.CharField(max_length=64, verbose_name="Huella de la Petición")
+    # // NULL mientras la petición original se está procesando.
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name="Código de Estado")
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder, verbose_name="Respuesta")
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True, verbose_name="Expira")
+
+    class Meta:
+        verbose_name = "Registro de Idempotencia"
+        verbose_name_plural = "Registros de Idempotencia"
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'key'], name='idempotencyrecord_unique_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.tenant})"
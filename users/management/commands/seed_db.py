@@ -17,6 +17,7 @@ from finance.models import Income, Expense
 
 # Importamos nuestro servicio de producción para reutilizar la lógica de negocio
 from production.services import register_production_batch
+from production.planning import parse_production_plan
 
 # Helpers
 def qd(value):
@@ -166,18 +167,11 @@ class Command(BaseCommand):
             RecipeIngredient.objects.bulk_create(ri_objs)
 
         # --- 4. Parse plan de producción ---
-        plan_raw = {}
-        plan_input = options.get('production-plan') or 'silla:10,sofa:3'
-        if isinstance(plan_input, str):
-            parts = [x.strip() for x in plan_input.split(',') if x.strip()]
-            for part in parts:
-                try:
-                    slug, cantidad = part.split(':')
-                    plan_raw[slug.strip()] = int(cantidad.strip())
-                except Exception:
-                    self.stdout.write(self.style.WARNING(f'Could not parse plan part "{part}", ignoring.'))
+        plan_raw, plan_errors = parse_production_plan(options.get('production_plan') or 'silla:10,sofa:3')
+        for part in plan_errors:
+            self.stdout.write(self.style.WARNING(f'Could not parse plan part "{part}", ignoring.'))
         if not plan_raw:
-            plan_raw = {'silla': 10, 'sofa': 3}
+            plan_raw = {'silla': Decimal('10'), 'sofa': Decimal('3')}
         self.stdout.write(self.style.NOTICE(f'Production plan: {plan_raw}'))
 
         # --- 5. Calcular materiales necesarios y crear PurchaseBatches ---